@@ -6,13 +6,18 @@
     is appendSprot2goa() method which invokes other the methods 
     that are also defined in this module:
 
-    appendSprot2goa(fh_sprot, goa_file_name, taxon_id, fh_merged_go):
+    appendSprot2goa(fh_sprot, goa_file_name, taxon_id, fh_merged_go,
+                    snapshot=None, jobs=1):
         fh_sport: file handle to a UniProtKB/SwissProt file.
         goa_file_name: file name of a UniProt-GOA file.
         taxon_id: a taxonomy id for an organism.
         fh_merged_go: file handle to the output file which already has 
             all the records copied into from the UniProt-GOA file named 
             goa_file_name.
+        snapshot: a GOASnapshot of goa_file_name. When it is given, the 
+            annotations of goa_file_name are read from the snapshot.
+        jobs: the number of processes that parse the UniProtKB/SwissProt
+            file and convert its records (default: 1).
         This method goes over each record in fh_sprot file, checks
         whether that record is already in the UniProt-GOA file
         goa_file_name, and if it is NOT found there, the method
@@ -20,6 +25,49 @@
         by invoking swissProt2GOA and then appends the newly formed 
         UniProt-GOA record at the end of the output file.
 
+    mergeSprot2goa(fh_sprot, goa_file_name, taxon_id, fh_merged_go,
+                   snapshot=None, jobs=1, cache=None, index_dir=None):
+        This method writes the records of the UniProt-GOA file
+        goa_file_name to fh_merged_go with their DB_Object_IDs replaced
+        by primary accessions, and then appends the new GO annotations of
+        the UniProtKB/SwissProt file fh_sprot, as appendSprot2goa does.
+        It reads each of the two files only once. With the SprotCache
+        cache of fh_sprot, fh_sprot is not read at all. Otherwise, the
+        SprotIndex of fh_sprot is kept in index_dir (default: next to
+        fh_sprot, see SprotIndex.index_dirname).
+
+    mergeSprot2goa_by_taxon(fh_sprot, goa_file_name, taxa, writer,
+                            snapshot=None, jobs=1, cache=None,
+                            index_dir=None):
+        This method does the work of mergeSprot2goa for every taxonomy id
+        of the set taxa (or for all taxonomy ids, if taxa is None) in one
+        pass over each file, and writes the merged lines of a taxonomy
+        id with writer.write(taxon, line).
+
+    taxa_goa_lines(taxa, goa_anns, GAFFIELDS, rec):
+        This method returns the taxonomy ids of rec that are in taxa,
+        together with the new_goa_lines of rec.
+
+    GOAAnnotations():
+        The set of the (DB_Object_ID, GO_ID, Evidence, Aspect) annotations
+        of a UniProt-GOA file, kept as packed integer keys:
+            add(protName, goID, evidence, aspect):
+                adds an annotation.
+            protName in goa_anns:
+                tells whether the protein has an annotation.
+            has_annotation(protName, goID, evidence, aspect):
+                tells whether the annotation is in the set.
+
+    new_goa_lines(goa_anns, GAFFIELDS, rec):
+        This method converts the GO annotations of the UniProtKB/SwissProt
+        record rec that are not in goa_anns to UniProt-GOA records and
+        returns them as GAF lines. The entry-level fields of rec are formatted
+        only once, by goa_line_template.
+
+    cached_goa_lines(goa_anns, GAFFIELDS, accessions, goaLines):
+        This method returns the GAF lines goaLines of a SwissProt entry,
+        as kept by SprotCache, that are not in goa_anns.
+
     create_iterator: 
         It returns an iterator object for an input UniProt-GOA file along
         with a list of all fieldnames of the UniProt-GOA file. 
@@ -31,6 +79,21 @@
         the different fields from the SwissProt record. At the end,
         it returns the newly constructed UniProt-GOA record.
 
+    entry2GOA(sprotRec, fields=GOAParser.GAF20FIELDS):
+        This method constructs the fields of a UniProt-GOA record that
+        are the same for every GO term of a UniProtKB/SwissProt record.
+
+    crossref2GOA(crossRef):
+        This method returns the values of the fields CROSSREF_FIELDS
+        (GO_ID, Evidence, Aspect, DB_Object_Name, Assigned_By) for the
+        GO term information crossRef of a UniProtKB/SwissProt record.
+
+    goa_line_template(sprotRec, fields=GOAParser.GAF20FIELDS):
+        This method returns a template of the GAF lines of the GO terms
+        of a UniProtKB/SwissProt record, with the entry2GOA fields
+        already formatted and a replacement field for each of
+        CROSSREF_FIELDS.
+
     The following methods facilitate swissProt2GOA method to construct the
     UniProt-GOA record by extracting information from a UniProtKB/SwissProt
     record: 
@@ -73,6 +136,7 @@
         This method extracts information from the SwissProt record that is
         equivalent to 'Date' field of UniProt-GOA file and then returns it.
 '''
+import functools
 import os
 import sys
 import subprocess
@@ -81,13 +145,20 @@ import calendar
 from datetime import datetime
 from dateutil import relativedelta
 
-from Bio import SwissProt as sp
+import CompressedIO as cio
 import GOAParser
 import GOAParser_cafa as gc
+import SprotIndex as si
+import SwissProtScanner as sps
 
 Months = ['', 'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', \
               'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
 
+# The fields of a UniProt-GOA record that are taken from the GO term
+# information of a SwissProt record, in the order of crossref2GOA:
+CROSSREF_FIELDS = ['GO_ID', 'Evidence', 'Aspect', 'DB_Object_Name',
+                   'Assigned_By']
+
 def assignSymbol(sprotRec): 
     symbol = ''
 # scenario 1: gene_name=> Name=DBP5; Synonyms=RAT8; OrderedLocusNames=YOR046C;
@@ -139,12 +210,15 @@ def assignDB_REF(sprotRec, crossRef):
     the rules described in: 
         ftp://ftp.ebi.ac.uk/pub/databases/GO/goa/UNIPROT/README
     """
-    if (find_pubmed(sprotRec) is not None):
-        return 'PMID' + ':' + find_pubmed(sprotRec)
-    elif (find_doi(sprotRec) is not None):
-        return 'DOI' + ':' + find_doi(sprotRec)
-    elif (find_reactome_id(sprotRec) is not None):
-        return 'Reactome' + ':' + find_reactome_id(sprotRec)
+    pubmed = find_pubmed(sprotRec)
+    if (pubmed is not None):
+        return 'PMID' + ':' + pubmed
+    doi = find_doi(sprotRec)
+    if (doi is not None):
+        return 'DOI' + ':' + doi
+    reactome_id = find_reactome_id(sprotRec)
+    if (reactome_id is not None):
+        return 'Reactome' + ':' + reactome_id
     else:
         return assignGO_REF(sprotRec, crossRef)
      
@@ -192,58 +266,191 @@ def assignDate(sprotRec):
         date = yy_1 + str(Months.index(mm_1)) + dd_1
     return date
 
-def swissProt2GOA(sprotRec, crossRef, fields=GOAParser.GAF20FIELDS):
+def entry2GOA(sprotRec, fields=GOAParser.GAF20FIELDS):
     """
-     This method takes a SwissProt record and GO term information
-     (crossRef) as input arguments. It then constructs a GOA
-     dictionary using the 'fields' as keys and values taken from
-     sprotRec, and then returns the constructed GOA record.
+     This method constructs the fields of a UniProt-GOA record that are
+     the same for every GO term of the SwissProt record sprotRec, i.e.
+     all the fields except CROSSREF_FIELDS, and returns them as a
+     dictionary.
     """
     # 15 fields are defined for GAF10FIELDS (GAF 1.0):
     goaRec = {'DB':'SwissProt', # 'SwissProt' is assigned to DB
               'DB_Object_ID': sprotRec.accessions[0],
               'DB_Object_Symbol': assignSymbol(sprotRec),
               'Qualifier': [''], # is assinged an empty list
-              'GO_ID': crossRef[1],
-              'DB:Reference': assignDB_REF(sprotRec, crossRef),
-              'Evidence': (crossRef[3].split(':'))[0],
+              'DB:Reference': assignDB_REF(sprotRec, None),
               'With': [''],
-              'Aspect': (crossRef[2].split(':'))[0],
-              'DB_Object_Name' : (crossRef[2].split(':'))[1],
               'Synonym': assignSynonym(sprotRec),
               'DB_Object_Type': 'protein',
               'Taxon_ID': assignTaxoId(sprotRec),
-              'Date': assignDate(sprotRec),
-              'Assigned_By': (crossRef[3].split(':'))[1]
+              'Date': assignDate(sprotRec)
               }
-#    print goaRec['DB:Reference']
     # Two extra fields are defined for GAF20FIELDS (GAF 2.0):
     if len(fields) == 17:
         goaRec['Annotation_Extension'] = '' 
         goaRec['Gene_Product_Form_ID'] = '' 
     return goaRec
 
+def crossref2GOA(crossRef):
+    """
+     This method returns the values of CROSSREF_FIELDS, in that order,
+     for the GO term information crossRef of a SwissProt record.
+    """
+    term = crossRef[2].split(':')
+    evidence = crossRef[3].split(':')
+    return (crossRef[1], evidence[0], term[0], term[1], evidence[1])
+
+def swissProt2GOA(sprotRec, crossRef, fields=GOAParser.GAF20FIELDS):
+    """
+     This method takes a SwissProt record and GO term information
+     (crossRef) as input arguments. It then constructs a GOA
+     dictionary using the 'fields' as keys and values taken from
+     sprotRec, and then returns the constructed GOA record.
+    """
+    goaRec = entry2GOA(sprotRec, fields)
+    goaRec.update(zip(CROSSREF_FIELDS, crossref2GOA(crossRef)))
+    return goaRec
+
+def goa_line_template(sprotRec, fields=GOAParser.GAF20FIELDS):
+    """
+     This method returns a template of the GAF lines of the GO terms of
+     the SwissProt record sprotRec: the fields of entry2GOA are already
+     formatted and the fields CROSSREF_FIELDS are replacement fields, so
+     template.format(*crossref2GOA(crossRef)) is the GAF line of the GO
+     term crossRef, as formatted by GOAParser.formatrec.
+    """
+    entryRec = entry2GOA(sprotRec, fields)
+    values = []
+    for field in fields:
+        if field in CROSSREF_FIELDS:
+            values.append('{' + str(CROSSREF_FIELDS.index(field)) + '}')
+        else:
+            value = entryRec[field]
+            if isinstance(value, list):
+                value = '|'.join(value)
+            values.append(value.replace('{', '{{').replace('}', '}}'))
+    return '\t'.join(values) + '\n'
+
 def create_iterator(infile):
     """
     It returns an iterator object for an input uniprot-goa file 
     along with a list of all fieldnames contained in the 
     uniprot-goa file.
     """ 
-    infile_handle = open(infile, 'r')
-    iter_handle = GOAParser.gafiterator(infile_handle)
-    for ingen in iter_handle:
-        if len(ingen) == 17:
-            GAFFIELDS = GOAParser.GAF20FIELDS
+    infile_handle = cio.open_input(infile)
+    return GOAParser.gafiterator_with_fields(infile_handle)
+
+class GOAAnnotations(object):
+    """
+    The set of the (DB_Object_ID, GO_ID, Evidence, Aspect) annotations of
+    a UniProt-GOA file. Every protein, GO term and (Evidence, Aspect) pair
+    gets an integer code, and an annotation is kept as one integer that
+    packs its three codes. Looking up an annotation is a single hash
+    lookup, however many annotations its protein has.
+    """
+    __slots__ = ('_proteins', '_terms', '_pairs', '_keys')
+
+    def __init__(self):
+        self._proteins = {}
+        self._terms = {}
+        self._pairs = {}
+        self._keys = set()
+
+    def add(self, protName, goID, evidence, aspect):
+        prot = self._proteins.setdefault(protName, len(self._proteins))
+        term = self._terms.setdefault(goID, len(self._terms))
+        pair = self._pairs.setdefault((evidence, aspect), len(self._pairs))
+        self._keys.add(((prot << 32) | term) << 16 | pair)
+
+    def __contains__(self, protName):
+        return protName in self._proteins
+
+    def __len__(self):
+        return len(self._keys)
+
+    def has_annotation(self, protName, goID, evidence, aspect):
+        prot = self._proteins.get(protName)
+        term = self._terms.get(goID)
+        pair = self._pairs.get((evidence, aspect))
+        if prot is None or term is None or pair is None:
+            return False
+        return (((prot << 32) | term) << 16 | pair) in self._keys
+
+def new_goa_lines(goa_anns, GAFFIELDS, rec):
+    """
+     This method takes the GOAAnnotations goa_anns of the UniProt-GOA
+     file and a SwissProt record rec. It converts every GO annotation of
+     rec that is not in goa_anns to a UniProt-GOA record
+     with swissProt2GOA and returns the list of the records as lines in
+     the GAF format with the fields GAFFIELDS.
+    """
+    # Going over each of the entries of the accessions list:
+    for ac in range(len(rec.accessions)):
+        # knownProt is an indicator to detect whether the
+        # current sprot protein is already in GOA file:
+        knownProt = ""
+        if rec.accessions[ac] in goa_anns:
+            # If the current sprot protein is already in the GOA
+            # file, the sprot protein is assigned to knownProt:
+            knownProt = rec.accessions[ac]
             break
-        else:
-            GAFFIELDS = GOAParser.GAF10FIELDS
+    goaLines = []
+    # The template of the GAF lines of rec, made at its first new
+    # GO annotation:
+    template = None
+    # Going over the list of GO information:
+    for crossRef in rec.cross_references:
+        # Consider the cross_reference entries that relate to GO DB:
+        if crossRef[0] == 'GO':
+            # goList is a list of GO ID, Evidence, and Aspect:
+            goList = [crossRef[1], (crossRef[3].split(':'))[0], \
+                      crossRef[2][0]]
+            # Checking whether a new GO annotaion found:
+            if (not knownProt) or (knownProt and \
+                not goa_anns.has_annotation(knownProt, *goList)):
+                # A new GO annotation is found in two situations:
+                # 1. if knownProt is empty  (not knownProt) or
+                # 2. if knownProt is not empty but the GO annotation
+                #    is not found in the GOA file
+
+                # Convert the sprot record to a GOA record:
+                if template is None:
+                    template = goa_line_template(rec, GAFFIELDS)
+                goaLines.append(template.format(*crossref2GOA(crossRef)))
+    return goaLines
+
+def cached_goa_lines(goa_anns, GAFFIELDS, accessions, goaLines):
+    """
+     This method takes the GOAAnnotations goa_anns of the UniProt-GOA
+     file, and the accessions and the GAF 2.0 lines (without their
+     newlines) of the GO annotations of a SwissProt entry, as kept by
+     SprotCache. It returns the lines of the GO annotations that are not
+     in goa_anns, as new_goa_lines does, in the GAF format with the
+     fields GAFFIELDS.
+    """
+    # knownProt is the first accession of the entry that is in the
+    # GOA file, if there is one:
+    knownProt = ""
+    for ac in accessions:
+        if ac in goa_anns:
+            knownProt = ac
             break
-    infile_handle.close()
-    infile_handle = open(infile, 'r')
-    iter_handle = GOAParser.gafiterator(infile_handle)
-    return iter_handle, GAFFIELDS
+    newLines = []
+    for goaLine in goaLines:
+        if knownProt:
+            # Columns 4: GO_ID, 6: Evidence, 8: Aspect
+            cols = goaLine.split('\t', 9)
+            if goa_anns.has_annotation(knownProt, cols[4], cols[6], cols[8]):
+                continue
+        if len(GAFFIELDS) == 15:
+            # GAF 1.0 has no Annotation_Extension and Gene_Product_Form_ID
+            # columns, which are empty in the cached lines:
+            goaLine = goaLine[:-2]
+        newLines.append(goaLine + '\n')
+    return newLines
 
-def appendSprot2goa(fh_sprot, goa_file_name, taxon_id, fh_merged_go):
+def appendSprot2goa(fh_sprot, goa_file_name, taxon_id, fh_merged_go,
+                    snapshot=None, jobs=1):
     """
      This method reads each reacord from the UniProtKB/SwissProt file
      and checks wither it's for taxon_id. If it is, this method
@@ -252,61 +459,218 @@ def appendSprot2goa(fh_sprot, goa_file_name, taxon_id, fh_merged_go):
      this method invokes swissProt2GOA method for each such GO term 
      to construct a UniProt-GOA record which it appends at the end of 
      the merged UniProt-GOA file passed as file handle fh_merged_go. 
+     With jobs > 1, the UniProtKB/SwissProt file is parsed and converted
+     on jobs processes, with the same output.
     """
-    # Creates an iterator object for t1 file:
-    iter_handle, GAFFIELDS = create_iterator(goa_file_name) 
+    if snapshot is not None:
+        GAFFIELDS = snapshot.fields
+        # Columns 1: DB_Object_ID, 4: GO_ID, 6: Evidence, 8: Aspect
+        ann_iter = snapshot.gaf_columns((1, 4, 6, 8))
+    else:
+        # Creates an iterator object for t1 file:
+        iter_handle, GAFFIELDS = create_iterator(goa_file_name) 
+        ann_iter = ((ingen['DB_Object_ID'], ingen['GO_ID'], 
+                     ingen['Evidence'], ingen['Aspect']) 
+                    for ingen in iter_handle)
 
-    # Construct a dictionary goa_dict with the proteins and 
+    # Construct the set goa_anns of the proteins and 
     # the corresponding GO terms in t1 file:
-    goa_dict = {}
-    for ingen in iter_handle:
-        if ingen['DB_Object_ID'] in goa_dict.keys():
-            goa_dict[ingen['DB_Object_ID']].append([ingen['GO_ID'], \
-                            ingen['Evidence'], ingen['Aspect']])
-        else:
-            goa_dict[ingen['DB_Object_ID']] = [[ingen['GO_ID'], \
-                           ingen['Evidence'], ingen['Aspect']]]
+    goa_anns = GOAAnnotations()
+    for protName, goID, evidence, aspect in ann_iter:
+        goa_anns.add(protName, goID, evidence, aspect)
 
-    # EXTRACTS the NEW GO terms in t2 file that are NOT found in t1 file:
+    # EXTRACTS the NEW GO terms in t2 file that are NOT found in t1 file.
+    # Only the entries of taxon_id (all entries if it is None) are parsed,
+    # on jobs processes; the lines come in the order of the entries:
     goCount = 0
-    for rec in sp.parse(fh_sprot):
-        # SELECTS records that are related to a specific taxon_id
-        # such as 559292 for yeast:
-        if taxon_id is None or taxon_id in rec.taxonomy_id:
-            # Going over each of the entries of the accessions list:
-            for ac in range(len(rec.accessions)):
-                # knownProt is an indicator to detect whether the
-                # current sprot protein is already in GOA file:
-                knownProt = ""
-                if rec.accessions[ac] in goa_dict.keys():
-                    # If the current sprot protein is already in the GOA
-                    # file, the sprot protein is assigned to knownProt:
-                    knownProt = rec.accessions[ac]
-                    break
-            # Going over the list of GO information:
-            for crossRef in rec.cross_references:
-                # Consider the cross_reference entries that relate to GO DB:
-                if crossRef[0] == 'GO':
-                    # goList is a list of GO ID, Aspect, and Evidence:
-                    goList = [crossRef[1], (crossRef[3].split(':'))[0], \
-                              crossRef[2][0]]
-                    # Checking whether a new GO annotaion found:
-                    if (not knownProt) or (knownProt and \
-                        goList not in goa_dict[knownProt]):
-                        # A new GO annotation is found in two situations:
-                        # 1. if knownProt is empty  (not knownProt) or
-                        # 2. if knownProt is not empty but the GO annotation
-                        #    is not found in the GOA file
-
-                        # Convert the sprot record to a GOA record:
-                        goaRec = swissProt2GOA(rec, crossRef, GAFFIELDS)
-                        # Write the converted GOA record to the output file:
-                        GOAParser.writerec(goaRec, fh_merged_go, GAFFIELDS)
-#                        if goCount in range(1, 20) or goCount in range(6400, 6420):
-#                            print ('goCount: ' + str(goCount) + '\n')
-#                            goaRec = swissProt2GOA(rec, crossRef, GAFFIELDS)
-                        goCount += 1
+    for goaLines in sps.parallel_parse(fh_sprot, taxon_id,
+                                       functools.partial(new_goa_lines,
+                                                         goa_anns, GAFFIELDS),
+                                       jobs):
+        for goaLine in goaLines:
+            # Write the converted GOA record to the output file:
+            fh_merged_go.write(goaLine)
+            goCount += 1
     return goCount
+
+def _goa_iter(goa_file_name, snapshot=None, taxon=False):
+    """
+     Returns the field names of the UniProt-GOA file goa_file_name and an
+     iterator over its records, each with the tuple of its DB_Object_ID,
+     GO_ID, Evidence and Aspect and, if taxon is True, its first Taxon_ID
+     value. The records are read from snapshot, when it is given
+     (PRIVATE).
+    """
+    if snapshot is not None:
+        # Columns 1: DB_Object_ID, 4: GO_ID, 6: Evidence, 8: Aspect,
+        # 12: Taxon_ID
+        cols = (1, 4, 6, 8, 12) if taxon else (1, 4, 6, 8)
+        return snapshot.fields, zip(snapshot.records(),
+                                    snapshot.gaf_columns(cols))
+    iter_handle, GAFFIELDS = create_iterator(goa_file_name)
+    if taxon:
+        goa_iter = ((ingen, (ingen['DB_Object_ID'], ingen['GO_ID'],
+                             ingen['Evidence'], ingen['Aspect'],
+                             ingen['Taxon_ID'][0]))
+                    for ingen in iter_handle)
+    else:
+        goa_iter = ((ingen, (ingen['DB_Object_ID'], ingen['GO_ID'],
+                             ingen['Evidence'], ingen['Aspect']))
+                    for ingen in iter_handle)
+    return GAFFIELDS, goa_iter
+
+def _accession_map(fh_sprot, keep, index_dir=None):
+    """
+     Returns the map from the accessions of the UniProtKB/SwissProt file
+     fh_sprot to their primary accessions. For an uncompressed file, the
+     map is read from its SprotIndex in index_dir (default: next to the
+     file) and None is returned with it. A
+     compressed file is read here, and the list of its records rec with
+     keep(rec) (without their sequences) is returned with the map
+     (PRIVATE).
+    """
+    sprot_fname = getattr(fh_sprot, 'name', None)
+    if isinstance(sprot_fname, str) and os.path.isfile(sprot_fname) and \
+       not cio.compression_type(sprot_fname):
+        return si.get_index(sprot_fname, index_dir).accession_map(), None
+    primary_ac_map = {}
+    sprot_recs = []
+    for rec in sps.parse(fh_sprot):
+        primary_ac = rec.accessions[0]
+        for ac in rec.accessions:
+            primary_ac_map[ac] = primary_ac
+        if keep(rec):
+            rec.sequence = ''
+            sprot_recs.append(rec)
+    return primary_ac_map, sprot_recs
+
+def mergeSprot2goa(fh_sprot, goa_file_name, taxon_id, fh_merged_go,
+                   snapshot=None, jobs=1, cache=None, index_dir=None):
+    """
+     This method merges the UniProtKB/SwissProt file fh_sprot into the
+     UniProt-GOA file goa_file_name with one pass over each file. It
+     writes every record of goa_file_name to fh_merged_go, with its
+     DB_Object_ID replaced by the primary accession of its SwissProt
+     entry, and builds the dictionary of the GOA annotations in the same
+     pass. It then appends the new GO annotations of the SwissProt
+     entries of taxon_id, as appendSprot2goa does, and returns their
+     number. The accession map of an uncompressed SwissProt file is read
+     from its SprotIndex in index_dir (default: next to the file, see
+     SprotIndex.index_dirname). A compressed file is read once before the GOA
+     file, and its entries of taxon_id (without their sequences) are kept
+     in memory until the GOA annotations are known. When the SprotCache
+     cache of fh_sprot is given, the accession map and the converted GO
+     annotations are read from it instead, and fh_sprot is not read.
+    """
+    GAFFIELDS, goa_iter = _goa_iter(goa_file_name, snapshot)
+
+    # Create a map from ACs to primary AC:
+    if cache is not None:
+        primary_ac_map, sprot_recs = cache.accession_map(), None
+    else:
+        primary_ac_map, sprot_recs = _accession_map(fh_sprot,
+            lambda rec: taxon_id is None or taxon_id in rec.taxonomy_id,
+            index_dir)
+
+    # Copy the GOA records with primary ACs and construct the set
+    # goa_anns of the proteins and the corresponding GO terms:
+    goa_anns = GOAAnnotations()
+    for ingen, (protName, goID, evidence, aspect) in goa_iter:
+        goa_anns.add(protName, goID, evidence, aspect)
+        ingen['DB_Object_ID'] = primary_ac_map.get(protName, protName)
+        fh_merged_go.write(GOAParser.formatrec(ingen, GAFFIELDS))
+
+    # Append the NEW GO terms of the SwissProt entries:
+    convert = functools.partial(new_goa_lines, goa_anns, GAFFIELDS)
+    if cache is not None:
+        goa_lines_iter = (cached_goa_lines(goa_anns, GAFFIELDS, accessions,
+                                           goaLines)
+                          for rec_taxa, accessions, goaLines in
+                          cache.goa_entries(None if taxon_id is None
+                                            else set([taxon_id])))
+    elif sprot_recs is None:
+        goa_lines_iter = sps.parallel_parse(fh_sprot, taxon_id, convert, jobs)
+    else:
+        goa_lines_iter = map(convert, sprot_recs)
+    goCount = 0
+    for goaLines in goa_lines_iter:
+        for goaLine in goaLines:
+            fh_merged_go.write(goaLine)
+            goCount += 1
+    return goCount
+
+def taxa_goa_lines(taxa, goa_anns, GAFFIELDS, rec):
+    """
+     This method returns the taxonomy ids of the SwissProt record rec
+     that are in the set taxa (all of them, if taxa is None), together
+     with the new_goa_lines of rec when there is any such taxonomy id.
+    """
+    rec_taxa = [taxon for taxon in rec.taxonomy_id
+                if taxa is None or taxon in taxa]
+    if not rec_taxa:
+        return rec_taxa, []
+    return rec_taxa, new_goa_lines(goa_anns, GAFFIELDS, rec)
+
+def mergeSprot2goa_by_taxon(fh_sprot, goa_file_name, taxa, writer,
+                            snapshot=None, jobs=1, cache=None,
+                            index_dir=None):
+    """
+     This method merges the UniProtKB/SwissProt file fh_sprot into the
+     UniProt-GOA file goa_file_name for every taxonomy id of the set taxa
+     (or for every taxonomy id of the two files, if taxa is None), with
+     one pass over each file. The lines of a taxonomy id are written by
+     writer.write(taxon, line) (see CompressedIO.RoutedWriter): the GOA
+     records whose first Taxon_ID is the taxonomy id, with primary
+     accessions as in mergeSprot2goa, followed by the new GO annotations
+     of its SwissProt entries. It returns a dictionary that maps every
+     taxonomy id to the number of its new GO annotations. The SprotCache
+     cache and index_dir are used as in mergeSprot2goa.
+    """
+    GAFFIELDS, goa_iter = _goa_iter(goa_file_name, snapshot, taxon=True)
+
+    # Create a map from ACs to primary AC:
+    if cache is not None:
+        primary_ac_map, sprot_recs = cache.accession_map(), None
+    else:
+        primary_ac_map, sprot_recs = _accession_map(fh_sprot,
+            lambda rec: taxa is None or not taxa.isdisjoint(rec.taxonomy_id),
+            index_dir)
+
+    # Copy the GOA records of the taxa with primary ACs and construct
+    # the set goa_anns of their proteins and GO terms:
+    goa_anns = GOAAnnotations()
+    # Map from a Taxon_ID value ('taxon:559292') to its taxonomy id:
+    taxon_of = {}
+    for ingen, (protName, goID, evidence, aspect, taxon_value) in goa_iter:
+        taxon = taxon_of.get(taxon_value)
+        if taxon is None:
+            taxon = taxon_of[taxon_value] = \
+                taxon_value.split('|')[0].split(':')[-1]
+        if taxa is not None and taxon not in taxa:
+            continue
+        goa_anns.add(protName, goID, evidence, aspect)
+        ingen['DB_Object_ID'] = primary_ac_map.get(protName, protName)
+        writer.write(taxon, GOAParser.formatrec(ingen, GAFFIELDS))
+
+    # Append the NEW GO terms of the SwissProt entries:
+    convert = functools.partial(taxa_goa_lines, taxa, goa_anns, GAFFIELDS)
+    if cache is not None:
+        goa_lines_iter = ((rec_taxa, cached_goa_lines(goa_anns, GAFFIELDS,
+                                                      accessions, goaLines))
+                          for rec_taxa, accessions, goaLines in
+                          cache.goa_entries(taxa))
+    elif sprot_recs is None:
+        goa_lines_iter = sps.parallel_parse(fh_sprot, None, convert, jobs)
+    else:
+        goa_lines_iter = map(convert, sprot_recs)
+    goCounts = {}
+    for rec_taxa, goaLines in goa_lines_iter:
+        for taxon in rec_taxa:
+            for goaLine in goaLines:
+                writer.write(taxon, goaLine)
+            goCounts[taxon] = goCounts.get(taxon, 0) + len(goaLines)
+    return goCounts
+
 if __name__ == '__main__':
     print (sys.argv[0] + ':')
     print (__doc__)
@@ -58,9 +58,21 @@ def collect_args(prog='benchmark'):
     if prog == 'benchmark':
         parser.add_argument('-O', '--output', default='', help='Provides ' + \
             'user an option to specify an output filename.')
+        parser.add_argument('-Z', '--compress', action='store_true', help= \
+            'Writes the benchmark files gzip compressed (.gz), using all ' + \
+            'CPUs for compression. By default, it is turned off.')
+        parser.add_argument('-j', '--jobs', type=int, default=1, help= \
+            'Specifies the number of processes that parse the ' + \
+            'uncompressed input files in parallel. With more than one ' + \
+            'process, the input files are parsed as text and their ' + \
+            'snapshots are neither read nor written. Default is 1.')
     elif prog == 'verify':
         parser.add_argument('-I3', '--input3', help='Specifies path to ' + \
            'one of the SIX benchmark files. This option is mandaroty.')
+    parser.add_argument('--no-snapshot', action='store_true', help= \
+                    'Parses the input files as text, without reading or ' + \
+                    'writing their snapshots in the workspace. By ' + \
+                    'default, the snapshots are used.')
     parser.add_argument('-G','--organism',nargs='*', default=['all'],help= \
                     'Provides user a choice to specify a set of organisms ' + \
                     '(example:Saccharomyces cerevisiae or 7227) separated ' + \
@@ -109,8 +121,11 @@ def extract_args(args, prog):
     args_dict['t2'] = args.input2
     if prog == 'benchmark':
         args_dict['outfile'] = args.output # Default: ''
+        args_dict['compress'] = args.compress # Default: False
+        args_dict['jobs'] = args.jobs # Default: 1
     elif prog == 'verify': 
         args_dict['t3'] = args.input3
+    args_dict['no_snapshot'] = args.no_snapshot # Default: False
     args_dict['Taxon_ID'] = args.organism # Default: 'all'
     args_dict['Aspect'] = args.ontology # Default: 'all'
     args_dict['Evidence'] = args.evidence # Default: 'all'   
@@ -149,6 +164,12 @@ def check_args(args_dict, parser):
                 user_dict['t3'] = args_dict[arg]
         elif arg == 'outfile':
             user_dict[arg] = args_dict[arg]
+        elif arg == 'compress':
+            user_dict[arg] = args_dict[arg]
+        elif arg == 'jobs':
+            user_dict[arg] = max(1, args_dict[arg])
+        elif arg == 'no_snapshot':
+            user_dict[arg] = args_dict[arg]
         elif arg == 'Threshold':
             user_dict[arg] = args_dict[arg]
         elif arg == 'Confidence':
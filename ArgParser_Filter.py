@@ -41,6 +41,13 @@ def collect_args():
     parser.add_argument('-O', '--output', default='', help='Provides user ' + \
         'an option to specify an output filename prefix. When not ' + \
         'specified, the program will create an output file name.')
+    parser.add_argument('-Z', '--compress', action='store_true', help= \
+        'Writes the output files gzip compressed (.gz), using all CPUs ' + \
+        'for compression. By default, it is turned off.')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help= \
+        'Specifies the number of processes that parse the ' + \
+        'uncompressed UniProtKB/SwissProt file in parallel. ' + \
+        'Default is 1.')
     return parser
 
 def extract_args(args):
@@ -52,6 +59,8 @@ def extract_args(args):
     args_dict['t1'] = args.input1
     args_dict['outfile'] = args.output
     args_dict['g'] = args.organism
+    args_dict['compress'] = args.compress # Default: False
+    args_dict['jobs'] = args.jobs # Default: 1
     return args_dict
     
 def check_args(args_dict,parser):
@@ -76,6 +85,10 @@ def check_args(args_dict,parser):
                 print (parser.parse_args(['--help']))
             else:
                 user_dict['g'] = args_dict[arg]
+        elif arg == 'compress':
+            user_dict[arg] = args_dict[arg]
+        elif arg == 'jobs':
+            user_dict[arg] = max(1, args_dict[arg])
         elif arg == 'Taxon_ID':
             if 'all' in args_dict[arg] or len(args_dict[arg]) == 0:
                 user_dict[arg] = set([])
@@ -44,13 +44,30 @@ def collect_args():
                     'a UniProt/Swissprot file. This opton is mandatory.')
     parser.add_argument('-I2', '--input2', help='Specifies path to a ' + \
                     'UniProt-GOA file. This option is mandatory.')
-    parser.add_argument('-G','--organism', help='Specifies an organism id,' + \
-                    'for example, 559292 for Saccharomyces cerevisiae. ' + \
-                    'This opton is mandatory.')
+    parser.add_argument('-G','--organism', nargs='+', help='Specifies ' + \
+                    'an organism id, for example, 559292 for ' + \
+                    'Saccharomyces cerevisiae. With several organism ids ' + \
+                    '(or all), one merged file is created for each ' + \
+                    'organism. This opton is mandatory.')
     parser.add_argument('-O', '--output', default='', help='Provides user ' + \
                     'an option to specify an output filename prefix. When ' + \
                     'not specified, the program will create an output ' + \
                     'file name.')
+    parser.add_argument('-Z', '--compress', action='store_true', help= \
+                    'Writes the output file gzip compressed (.gz), using ' + \
+                    'all CPUs for compression. By default, it is turned off.')
+    parser.add_argument('--no-snapshot', action='store_true', help= \
+                    'Parses the UniProt-GOA file as text, without reading ' + \
+                    'or writing its snapshot in the workspace. By ' + \
+                    'default, the snapshot is used.')
+    parser.add_argument('--no-cache', action='store_true', help= \
+                    'Parses the UniProtKB/SwissProt file, without reading ' + \
+                    'or writing its cache of converted GO annotations in ' + \
+                    'the workspace. By default, the cache is used.')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help= \
+                    'Specifies the number of processes that parse the ' + \
+                    'uncompressed UniProtKB/SwissProt file in parallel. ' + \
+                    'Default is 1.')
     return parser
 
 def extract_args(args):
@@ -64,6 +81,10 @@ def extract_args(args):
     args_dict['t2'] = args.input2
     args_dict['outfile'] = args.output
     args_dict['g'] = args.organism
+    args_dict['compress'] = args.compress # Default: False
+    args_dict['jobs'] = args.jobs # Default: 1
+    args_dict['no_snapshot'] = args.no_snapshot # Default: False
+    args_dict['no_cache'] = args.no_cache # Default: False
     return args_dict
     
 def check_args(args_dict, parser):
@@ -90,7 +111,23 @@ def check_args(args_dict, parser):
         elif arg == 'outfile':
             user_dict[arg] = args_dict[arg]
         elif arg == 'g':
-            user_dict['g'] = args_dict[arg]
+            if args_dict[arg] == None:
+                user_dict['g'] = None
+            else:
+                # The organism ids may also be separated by commas:
+                taxa = [x for g in args_dict[arg] for x in g.split(',') if x]
+                if 'all' in [x.lower() for x in taxa]:
+                    user_dict['g'] = ['all']
+                else:
+                    user_dict['g'] = list(OrderedDict.fromkeys(taxa))
+        elif arg == 'compress':
+            user_dict[arg] = args_dict[arg]
+        elif arg == 'jobs':
+            user_dict[arg] = max(1, args_dict[arg])
+        elif arg == 'no_snapshot':
+            user_dict[arg] = args_dict[arg]
+        elif arg == 'no_cache':
+            user_dict[arg] = args_dict[arg]
         elif arg == 'Taxon_ID':
             if 'all' in args_dict[arg] or len(args_dict[arg]) == 0:
                 user_dict[arg] = set([])
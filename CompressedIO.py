@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+'''
+    This module has the following methods to read UniProt-GOA and
+    UniProtKB/SwissProt files that are either plain text files or are
+    compressed with gzip (.gz), bzip2 (.bz2) or xz (.xz), as they are
+    shipped by EBI and UniProt, and to write large output files:
+
+    compression_type(fname):
+        This method looks at the first bytes of the file fname and
+        returns 'gz', 'bz2' or 'xz' for a compressed file. Otherwise, it
+        returns an empty string.
+
+    open_input(fname, mode='r'):
+        This method opens the file fname for reading and returns a file
+        handle to it. A compressed file is decompressed on the fly while
+        it is read, so it never has to be decompressed to disk. Reads go
+        through a large buffer (READ_BUFFER_SIZE bytes).
+
+    strip_compression_suffix(fname):
+        This method removes a trailing .gz, .bz2 or .xz from the file
+        name fname and returns the resulting name. The tools use it to
+        build output and intermediate file names.
+
+    BlockWriter(fname, compress=False, threads=None, 
+                block_size=WRITE_BLOCK_SIZE, level=6):
+        A text output stream that collects the written lines into large
+        blocks and writes them to the file fname block by block. With 
+        compress=True, every block is compressed as an independent gzip
+        member on a pool of threads (as pigz does), and the members are
+        written in order, so the output is a valid .gz file.
+
+    open_output(fname, compress=None, threads=None):
+        This method opens the file fname for writing and returns a 
+        BlockWriter. When compress is None, the output is gzip compressed
+        if fname ends with .gz.
+
+    RoutedWriter(fname_of, compress=False, header='',
+                 buffer_size=ROUTE_BUFFER_SIZE,
+                 block_size=WRITE_BLOCK_SIZE, level=6):
+        A text output stream for many files at once: write(key, text)
+        appends text to the file fname_of(key). The text is buffered in
+        memory and appended to the files in large blocks, and at most
+        one of the files is open at any time.
+'''
+import bz2
+import collections
+import gzip
+import io
+import lzma
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Size of the read buffer placed in front of the files:
+READ_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Leading bytes (magic numbers) of the supported compressed file formats:
+MAGIC_NUMBERS = [('gz', b'\x1f\x8b'),
+                 ('bz2', b'BZh'),
+                 ('xz', b'\xfd7zXZ\x00')]
+
+# File name suffixes of the supported compressed file formats:
+COMPRESSION_SUFFIXES = ['.gz', '.bz2', '.xz']
+
+# Size of the blocks written (and compressed) by BlockWriter:
+WRITE_BLOCK_SIZE = 1024 * 1024
+
+# Number of characters buffered by a RoutedWriter for all its files:
+ROUTE_BUFFER_SIZE = 64 * 1024 * 1024
+
+def compression_type(fname):
+    """
+    This method returns 'gz', 'bz2' or 'xz' if the file fname is
+    compressed in the corresponding format. Otherwise, it returns an
+    empty string.
+    """
+    with open(fname, 'rb') as fh:
+        head = fh.read(6)
+    for ctype, magic in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return ctype
+    return ''
+
+def open_input(fname, mode='r'):
+    """
+    This method opens the file fname for reading and returns the file
+    handle. When the file is compressed (gzip, bzip2 or xz), the handle
+    decompresses the content while it is read. mode is 'r' (text) or
+    'rb' (bytes).
+    """
+    ctype = compression_type(fname)
+    if ctype == 'gz':
+        stream = gzip.GzipFile(fname, mode='rb')
+    elif ctype == 'bz2':
+        stream = bz2.BZ2File(fname, mode='rb')
+    elif ctype == 'xz':
+        stream = lzma.LZMAFile(fname, mode='rb')
+    else:
+        stream = open(fname, 'rb', buffering=READ_BUFFER_SIZE)
+    if ctype:
+        # The decompressed data is read in large blocks as well:
+        stream = io.BufferedReader(stream, buffer_size=READ_BUFFER_SIZE)
+    if mode == 'rb':
+        return stream
+    return io.TextIOWrapper(stream)
+
+def strip_compression_suffix(fname):
+    """
+    This method removes a compression suffix (.gz, .bz2 or .xz) from
+    the file name fname and returns the file name.
+    """
+    for suffix in COMPRESSION_SUFFIXES:
+        if fname.endswith(suffix):
+            return fname[:-len(suffix)]
+    return fname
+
+class BlockWriter(object):
+    """
+    A text output stream that writes the file fname in blocks of about
+    block_size characters. When compress is True, each block is gzip 
+    compressed (compression level level) on a pool of threads threads 
+    (default: the number of CPUs). The compressed blocks are written in 
+    the order they were filled, each as a gzip member of its own; a 
+    sequence of gzip members is a valid gzip file.
+    """
+    def __init__(self, fname, compress=False, threads=None,
+                 block_size=WRITE_BLOCK_SIZE, level=6):
+        self.name = fname
+        self._fh = open(fname, 'wb')
+        self._block_size = block_size
+        self._level = level
+        self._parts = []
+        self._size = 0
+        self._pool = None
+        self._pending = collections.deque()
+        self._members = 0
+        if compress:
+            threads = threads or os.cpu_count() or 1
+            self._pool = ThreadPoolExecutor(max_workers=threads)
+            # Blocks that may wait for compression at the same time:
+            self._max_pending = 2 * threads
+        self.closed = False
+
+    def write(self, text):
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self._block_size:
+            self._write_block()
+        return len(text)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def _write_block(self):
+        if not self._parts:
+            return None
+        data = ''.join(self._parts).encode()
+        self._parts = []
+        self._size = 0
+        if self._pool is None:
+            self._fh.write(data)
+            return None
+        # zlib releases the GIL, so the blocks are compressed in parallel:
+        self._pending.append(self._pool.submit(gzip.compress, data,
+                                               self._level, mtime=0))
+        while len(self._pending) > self._max_pending:
+            self._write_member(self._pending.popleft().result())
+        return None
+
+    def _write_member(self, member):
+        self._fh.write(member)
+        self._members += 1
+
+    def flush(self):
+        self._write_block()
+        while self._pending:
+            self._write_member(self._pending.popleft().result())
+        self._fh.flush()
+
+    def close(self):
+        if self.closed:
+            return None
+        self.flush()
+        if self._pool is not None:
+            if self._members == 0:
+                # An empty output is still a valid gzip file:
+                self._write_member(gzip.compress(b'', self._level, mtime=0))
+            self._pool.shutdown()
+        self._fh.close()
+        self.closed = True
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+def open_output(fname, compress=None, threads=None):
+    """
+    This method opens the file fname for writing and returns a BlockWriter
+    for it. When compress is None, the output is gzip compressed if fname
+    ends with .gz. threads is the number of compression threads (default:
+    the number of CPUs).
+    """
+    if compress is None:
+        compress = fname.endswith('.gz')
+    return BlockWriter(fname, compress=compress, threads=threads)
+
+class RoutedWriter(object):
+    """
+    A text output stream that writes many files: write(key, text) appends
+    text to the file fname_of(key), which starts with header. The text of
+    every file is collected in memory. A file is opened, appended with its
+    collected text and closed again when its text reaches block_size
+    characters, or when the text of all the files reaches buffer_size
+    characters (then the largest buffers are written out first). So at
+    most one file is open at a time, however many keys there are. When
+    compress is True, every appended block is a gzip member of its own
+    (compression level level), so every file is a valid gzip file.
+    """
+    def __init__(self, fname_of, compress=False, header='',
+                 buffer_size=ROUTE_BUFFER_SIZE, block_size=WRITE_BLOCK_SIZE,
+                 level=6):
+        self._fname_of = fname_of
+        self._compress = compress
+        self._header = header
+        self._buffer_size = buffer_size
+        self._block_size = block_size
+        self._level = level
+        # For every key, the list of its buffered strings and their size:
+        self._parts = {}
+        self._sizes = {}
+        self._size = 0
+        # The keys whose files have been created:
+        self._created = set()
+        # The file names of the keys, in the order they were first seen:
+        self.names = collections.OrderedDict()
+        self.closed = False
+
+    def write(self, key, text):
+        parts = self._parts.get(key)
+        if parts is None:
+            self.names[key] = self._fname_of(key)
+            parts = self._parts[key] = [self._header]
+            self._sizes[key] = len(self._header)
+            self._size += len(self._header)
+        parts.append(text)
+        self._sizes[key] += len(text)
+        self._size += len(text)
+        if self._sizes[key] >= self._block_size:
+            self._write_block(key)
+        elif self._size >= self._buffer_size:
+            self._write_largest()
+        return len(text)
+
+    def _write_largest(self):
+        # Write out the largest buffers until half of the buffer is free:
+        for key in sorted(self._sizes, key=self._sizes.get, reverse=True):
+            if self._size <= self._buffer_size // 2:
+                break
+            self._write_block(key)
+
+    def _write_block(self, key):
+        if not self._parts[key]:
+            return None
+        data = ''.join(self._parts[key]).encode()
+        self._parts[key] = []
+        self._size -= self._sizes[key]
+        self._sizes[key] = 0
+        if self._compress:
+            data = gzip.compress(data, self._level, mtime=0)
+        # The first block of a file replaces an older file of that name:
+        mode = 'ab' if key in self._created else 'wb'
+        with open(self.names[key], mode) as fh:
+            fh.write(data)
+        self._created.add(key)
+        return None
+
+    def flush(self):
+        for key in self._parts:
+            self._write_block(key)
+
+    def close(self):
+        if self.closed:
+            return None
+        self.flush()
+        self.closed = True
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+if __name__ == '__main__':
+    print (sys.argv[0] + ':')
+    print (__doc__)
+    sys.exit(0)
@@ -54,23 +54,23 @@ import os
 import sys
 from collections import defaultdict
 
+import GOAParser as GOA
+
 def create_exp_ann_dict(goa_exp_handle):
     # Initialize THREE dictionaries:
     t1_mfo_dict = defaultdict(lambda:set())
     t1_bpo_dict = defaultdict(lambda:set())
     t1_cco_dict = defaultdict(lambda:set())
 
-    # Populate the dictionaries:
-    for lines in goa_exp_handle:
-        cols = lines.strip().split('\t')
-        if len(cols) < 15: # Skip lines NOT in GAF 1.0 or GAF 2.0 format
-            continue
-        if cols[8] == 'F': # Col 8: Ontology group
-            t1_mfo_dict[cols[1]].add(cols[4]) # Col 1: protein name, Col 2: GO ID
-        elif cols[8] == 'P':
-            t1_bpo_dict[cols[1]].add(cols[4])
-        elif cols[8] == 'C':
-            t1_cco_dict[cols[1]].add(cols[4])
+    # Populate the dictionaries (lines NOT in GAF 1.0 or GAF 2.0 format
+    # are skipped by gaf_columns):
+    for protName, goID, aspect in GOA.gaf_columns(goa_exp_handle, (1, 4, 8)):
+        if aspect == 'F': # Col 8: Ontology group
+            t1_mfo_dict[protName].add(goID) # Col 1: protein name, Col 4: GO ID
+        elif aspect == 'P':
+            t1_bpo_dict[protName].add(goID)
+        elif aspect == 'C':
+            t1_cco_dict[protName].add(goID)
     return (t1_bpo_dict, t1_cco_dict, t1_mfo_dict)
 
 
@@ -144,18 +144,17 @@ def create_benchmarks(t1_iea_handle,
 
     # Populate benchmark files:
     print('Creating benchmark sets ...')
-    for lines in t1_iea_handle:
-        cols = lines.strip().split('\t')
-        if cols[8] == 'F':
+    for protName, aspect in GOA.gaf_columns(t1_iea_handle, (1, 8)):
+        if aspect == 'F':
             # write out MFO type benchmarks:
-            write_NK_benchmarks(cols[1],
+            write_NK_benchmarks(protName,
                              t1_bpo_dict,
                              t1_cco_dict,
                              t1_mfo_dict,
                              t2_mfo_dict,
                              bmfile_NK_mfo_handle
                             )
-            write_LK_benchmarks(cols[1],
+            write_LK_benchmarks(protName,
                              t1_bpo_dict,
                              t1_cco_dict,
                              t1_mfo_dict,
@@ -163,16 +162,16 @@ def create_benchmarks(t1_iea_handle,
                              bmfile_LK_mfo_handle,
                              'MFO'
                             )
-        elif cols[8] == 'P':
+        elif aspect == 'P':
             # write out BPO type benchmarks:
-            write_NK_benchmarks(cols[1],
+            write_NK_benchmarks(protName,
                               t1_bpo_dict,
                               t1_cco_dict,
                               t1_mfo_dict,
                               t2_bpo_dict,
                               bmfile_NK_bpo_handle
                             )
-            write_LK_benchmarks(cols[1],
+            write_LK_benchmarks(protName,
                               t1_bpo_dict,
                               t1_cco_dict,
                               t1_mfo_dict,
@@ -180,16 +179,16 @@ def create_benchmarks(t1_iea_handle,
                               bmfile_LK_bpo_handle,
                               'BPO'
                             )
-        elif cols[8] == 'C':
+        elif aspect == 'C':
             # write out CCO type benchmarks:
-            write_NK_benchmarks(cols[1],
+            write_NK_benchmarks(protName,
                              t1_bpo_dict,
                              t1_cco_dict,
                              t1_mfo_dict,
                              t2_cco_dict,
                              bmfile_NK_cco_handle
                             )
-            write_LK_benchmarks(cols[1],
+            write_LK_benchmarks(protName,
                              t1_bpo_dict,
                              t1_cco_dict,
                              t1_mfo_dict,
@@ -9,8 +9,9 @@
             (2) a taxonomy id,
             (3) an output file handle for writing target sequences,
             (4) an output file handle for writing the mapping between
-                target id and protein name, and
-            (5) the set of EXP codes.
+                target id and protein name,
+            (5) the set of EXP codes, and
+            (6) the number of processes that parse the file (default: 1).
             
         If the function finds a protein that does NOT have any EXP evidence 
         code, it writes the protein sequence for that protein to the output 
@@ -23,11 +24,16 @@
             Total number of sequences in the sprot file related to the the 
                 taxonomy id whose annotations have EXP evidence
 
+        With more than one process, the file is cut into chunks of whole
+        entries that are parsed at the same time. The target ids are the
+        same as with a single process.
+
     species_filter_count:
-        This method takes three arguments:
+        This method takes four arguments:
             (1) a uniprot-swissProt file handle
             (2) a taxonomy id
             (3) the set of EXP codes
+            (4) the number of processes that parse the file (default: 1)
 
         It returns TWO values:
             Total number of sequences in the sprot file related to the the 
@@ -35,14 +41,46 @@
             Total number of sequences in the sprot file related to the the 
                 taxonomy id whose annotations have EXP evidence
 '''
+import functools
 import sys
 from Bio import SeqIO
 from Bio.Seq import Seq
 from Bio.SeqRecord import SeqRecord
-from Bio import SwissProt as sp
+import SwissProtScanner as sps
+
+def _has_exp_code(rec, EXP_default):
+    """
+    Returns True if the SwissProt record rec has a GO annotation with an
+    evidence code in EXP_default (PRIVATE).
+    """
+    # Going over the list of GO information:
+    for crossRef in rec.cross_references:
+        # Consider the cross_reference entries that relate to GO DB:
+        if crossRef[0] == 'GO' and \
+           (crossRef[3].split(':'))[0] in EXP_default:
+            return True
+    return False
+
+def _target_info(EXP_default, rec):
+    """
+    Returns the entry name, the primary accession and the sequence of the
+    SwissProt record rec, or None if rec has EXP evidence (PRIVATE).
+    """
+    if _has_exp_code(rec, EXP_default):
+        return None
+    return (rec.entry_name, rec.accessions[0], rec.sequence)
+
+def _taxon_exp_flags(taxon_id, EXP_default, rec):
+    """
+    Returns whether the SwissProt record rec is related to the taxonomy
+    id taxon_id and whether it has EXP evidence (PRIVATE).
+    """
+    if taxon_id not in rec.taxonomy_id:
+        return (False, False)
+    return (True, _has_exp_code(rec, EXP_default))
 
 def species_filter(fh_sprot, taxon_id, fh_targets, 
-                   fh_map, EXP_default=set([])):
+                   fh_map, EXP_default=set([]), jobs=1):
     # Initializes the target_id:
     target_id = int(taxon_id+"0000001")
     outseq_list = []
@@ -56,63 +94,38 @@ def species_filter(fh_sprot, taxon_id, fh_targets,
     # evidence:
     seqCount_no_exp = 0
 
-    for rec in sp.parse(fh_sprot):
-        # Selects records that are related to a specific
-        # taxonomy id taxon_id:
-        if taxon_id in rec.taxonomy_id:
-            exp_code = False 
-            seqCount += 1
-            # Going over the list of GO information:
-            for crossRef in rec.cross_references: 
-                # Consider the cross_reference entries 
-                # that relate to GO DB:
-                if crossRef[0] == 'GO':
-                    goList = [crossRef[1], 
-                             (crossRef[3].split(':'))[0], 
-                             crossRef[2][0]]
-                    if (crossRef[3].split(':'))[0] in EXP_default:
-                        exp_code = True
-                        break
-
-            # If the protein has no EXP evidence,
-            # write the sequence to the output file:
-            if not exp_code:
-#                outseq = SeqRecord(Seq(rec.sequence),
-#                                   id="T"+str(target_id),
-#                                   description = "%s" %
-#                                   (rec.entry_name))
-
-                outseq = SeqRecord(Seq(rec.sequence),
-                                   id="T"+str(target_id),
-                                   description = "%s\t%s" %
-                                   (rec.entry_name, rec.accessions[0]))
-
-#                outseq = SeqRecord(Seq(rec.sequence),
-#                                   id="T"+str(target_id),
-#                                   description = "%s" %
-#                                   (rec.accessions[0]))
-                outseq_list = [outseq]
-                # Write out the sequence:
-                SeqIO.write(outseq_list,fh_targets, "fasta")
-                # Create target id -> protein name map string:
-#                mapStr = "T" + str(target_id) + '\t' + \
-#                               str(rec.entry_name) + '\n'
-
-                mapStr = "T" + str(target_id) + '\t' + \
-                               str(rec.entry_name) + '\t' + \
-                               str(rec.accessions[0]) + '\n'
-
-#                mapStr = "T" + str(target_id) + '\t' + \
-#                               str(rec.accessions[0]) + '\n'
-
-                # Write out the mapping (target id -> protein name):
-                fh_map.write("%s" % mapStr)
-                target_id += 1
-                seqCount_no_exp += 1
+    # Only the entries of taxon_id are parsed, on jobs processes. The
+    # targets come in the order of the file, so the target ids are the
+    # same for any number of jobs:
+    for target in sps.parallel_parse(fh_sprot, taxon_id,
+                                     functools.partial(_target_info,
+                                                       EXP_default),
+                                     jobs):
+        seqCount += 1
+        # If the protein has no EXP evidence,
+        # write the sequence to the output file:
+        if target is not None:
+            entry_name, accession, sequence = target
+            outseq = SeqRecord(Seq(sequence),
+                               id="T"+str(target_id),
+                               description = "%s\t%s" %
+                               (entry_name, accession))
+            outseq_list = [outseq]
+            # Write out the sequence:
+            SeqIO.write(outseq_list,fh_targets, "fasta")
+            # Create target id -> protein name map string:
+            mapStr = "T" + str(target_id) + '\t' + \
+                           str(entry_name) + '\t' + \
+                           str(accession) + '\n'
+
+            # Write out the mapping (target id -> protein name):
+            fh_map.write("%s" % mapStr)
+            target_id += 1
+            seqCount_no_exp += 1
 #    return (seqCount, seqCount_no_exp)
     return seqCount_no_exp
 
-def species_filter_count(fh_sprot, taxon_id, EXP_default=set([])):
+def species_filter_count(fh_sprot, taxon_id, EXP_default=set([]), jobs=1):
     # The seqCopunt variable counts total number of sequences
     # in the sprot file related to the the taxonomy id taxon_id:
     seqCount = 0
@@ -125,24 +138,16 @@ def species_filter_count(fh_sprot, taxon_id, EXP_default=set([])):
     # The rec_count counts the number of records
     rec_count = 0
 
-    for rec in sp.parse(fh_sprot):
+    for in_taxon, exp_code in sps.parallel_parse(
+                                  fh_sprot, None,
+                                  functools.partial(_taxon_exp_flags,
+                                                    taxon_id, EXP_default),
+                                  jobs):
         rec_count += 1
         # SELECT records that are related to a specific
         # taxon_id such as 559292 for yeast:
-        if taxon_id in rec.taxonomy_id:
-            exp_code = False
+        if in_taxon:
             seqCount += 1
-            # Go over the list of GO information:
-            for crossRef in rec.cross_references:
-                # Consider the cross_reference entries that 
-                # relate to GO DB:
-                if crossRef[0] == 'GO':
-                    goList = [crossRef[1],
-                              (crossRef[3].split(':'))[0], 
-                              crossRef[2][0]]
-                    if (crossRef[3].split(':'))[0] in EXP_default:
-                        exp_code = True
-                        break
             # If the protein has an no EXP evidence,
             # increase seqCount_no_exp:
             if not exp_code:
@@ -30,9 +30,10 @@ import sys
 import re
 from os.path import basename
 
-from Bio import SwissProt as sp
 import stat
 
+import SwissProtScanner as sps
+
 def check_gaf_format(fh_goa):
     """
     This method checks whether the format of the file
@@ -58,7 +59,7 @@ def check_sprot_format(fh_sprot):
     Otherwise,
        it returns False.
     """
-    iter_handle = sp.parse(fh_sprot) # sp.parse method returns a generator
+    iter_handle = sps.parse(fh_sprot) # sps.parse method returns a generator
     try:
         for rec in iter_handle:
             break
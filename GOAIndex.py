@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+'''
+    This module has the following methods to read the annotations of
+    single proteins from a UniProt-GOA file without reading the whole file.
+    An index file (a sidecar file next to the UniProt-GOA file) keeps, for
+    every DB_Object_ID, the byte offset and length of the block of lines
+    of that protein. The UniProt-GOA file is then memory-mapped and only
+    the lines of the requested proteins are read.
+
+    index_filename(goa_fname):
+        This method returns the name of the index file of the UniProt-GOA
+        file goa_fname: goa_fname + '.idx'
+
+    build_index(goa_fname, index_fname=None):
+        This method reads the UniProt-GOA file goa_fname once, writes its
+        index file and returns the index: a dictionary that maps a
+        DB_Object_ID to a list of (offset, length) pairs.
+
+    load_index(goa_fname, index_fname=None):
+        This method reads the index file of goa_fname and returns the
+        index. It returns None when the index file does not exist or is
+        out of date, i.e. when the size or the modification time of
+        goa_fname has changed since the index was built.
+
+    get_index(goa_fname, index_fname=None):
+        This method returns the index of goa_fname. It loads the index
+        file if it is up to date, otherwise it (re)builds it.
+
+    GOAIndex(goa_fname, index_fname=None):
+        An indexed, memory-mapped UniProt-GOA file:
+            records(protein_ids, record='lazy'):
+                yields the records of the proteins in protein_ids, in the
+                order of protein_ids, in the same record types as
+                GOAParser.gafiterator.
+            lines(protein_id):
+                returns the annotation lines of a single protein.
+            protein_ids():
+                returns the DB_Object_IDs in the file.
+        A protein that is not in the file has no records.
+
+    The UniProt-GOA file must be an uncompressed file: a compressed file
+    cannot be memory-mapped.
+'''
+import mmap
+import os
+import sys
+
+import CompressedIO as cio
+import GOAParser as GOA
+
+# First word of the header line of an index file:
+INDEX_HEADER = '!goa-index: 1.0'
+
+def index_filename(goa_fname):
+    """
+    This method returns the name of the index file of goa_fname.
+    """
+    return goa_fname + '.idx'
+
+def _source_stamp(goa_fname):
+    """
+    Returns the size and the modification time (in nanoseconds) of the
+    file goa_fname as strings (PRIVATE).
+    """
+    st = os.stat(goa_fname)
+    return str(st.st_size), str(st.st_mtime_ns)
+
+def build_index(goa_fname, index_fname=None):
+    """
+    This method scans the UniProt-GOA file goa_fname and returns a
+    dictionary that maps every DB_Object_ID to the list of (offset, length)
+    pairs of its blocks of consecutive lines. It also writes the index to
+    the file index_fname (default: index_filename(goa_fname)). If the
+    index file cannot be written, the index is only returned.
+    """
+    if cio.compression_type(goa_fname):
+        raise ValueError(goa_fname + ' is a compressed file. ' + \
+                         'Only an uncompressed file can be indexed.')
+    if index_fname is None:
+        index_fname = index_filename(goa_fname)
+    size, mtime = _source_stamp(goa_fname)
+    index = {}
+    cur_id = None
+    cur_block = None
+    offset = 0
+    with open(goa_fname, 'rb', buffering=cio.READ_BUFFER_SIZE) as fh:
+        for inline in fh:
+            line_len = len(inline)
+            if inline[:1] != b'!':
+                cols = inline.split(b'\t', 2)
+                if len(cols) > 1:
+                    prot_id = cols[1].decode()
+                    if prot_id == cur_id and \
+                       cur_block[0] + cur_block[1] == offset:
+                        cur_block[1] += line_len
+                    else:
+                        cur_id = prot_id
+                        cur_block = [offset, line_len]
+                        index.setdefault(prot_id, []).append(cur_block)
+            offset += line_len
+    # The index is written to a temporary file first, so an interrupted
+    # run never leaves an incomplete index file with a valid header:
+    tmp_fname = index_fname + '.tmp' + str(os.getpid())
+    try:
+        with open(tmp_fname, 'w') as index_fh:
+            index_fh.write('\t'.join([INDEX_HEADER, size, mtime]) + '\n')
+            for prot_id, blocks in index.items():
+                for block_offset, block_len in blocks:
+                    index_fh.write(prot_id + '\t' + str(block_offset) +
+                                   '\t' + str(block_len) + '\n')
+        os.replace(tmp_fname, index_fname)
+    except OSError:
+        # A read-only directory: the index is kept in memory only.
+        if os.path.exists(tmp_fname):
+            os.remove(tmp_fname)
+    return _finish_index(index)
+
+def _finish_index(index):
+    """
+    Turns the [offset, length] blocks of index into tuples (PRIVATE).
+    """
+    for prot_id in index:
+        index[prot_id] = [tuple(block) for block in index[prot_id]]
+    return index
+
+def load_index(goa_fname, index_fname=None):
+    """
+    This method reads the index file index_fname (default:
+    index_filename(goa_fname)) and returns the index. It returns None,
+    if the index file does not exist, or if goa_fname has a different
+    size or modification time than when the index was built.
+    """
+    if index_fname is None:
+        index_fname = index_filename(goa_fname)
+    if not os.path.exists(index_fname):
+        return None
+    index = {}
+    with open(index_fname, 'r') as index_fh:
+        header = index_fh.readline().rstrip('\n').split('\t')
+        if len(header) != 3 or header[0] != INDEX_HEADER or \
+           tuple(header[1:3]) != _source_stamp(goa_fname):
+            return None
+        for inline in index_fh:
+            prot_id, block_offset, block_len = inline.rstrip('\n').split('\t')
+            index.setdefault(prot_id, []).append([int(block_offset),
+                                                  int(block_len)])
+    return _finish_index(index)
+
+def get_index(goa_fname, index_fname=None):
+    """
+    This method returns the index of goa_fname, from the index file if
+    it is up to date, otherwise by building a new index file.
+    """
+    index = load_index(goa_fname, index_fname)
+    if index is None:
+        index = build_index(goa_fname, index_fname)
+    return index
+
+class GOAIndex(object):
+    """
+    An indexed UniProt-GOA file. The file goa_fname is memory-mapped, and
+    the lines of a protein are read from the blocks listed in the index.
+    The index file is built on first use and rebuilt whenever goa_fname
+    changes.
+    """
+    def __init__(self, goa_fname, index_fname=None):
+        self.goa_fname = goa_fname
+        self.index = get_index(goa_fname, index_fname)
+        # The GAF version, as gafiterator_with_fields reads it:
+        with open(goa_fname, 'r') as fh:
+            self.fields = GOA.read_gaf_fields(fh)[0]
+        self._fh = open(goa_fname, 'rb')
+        self._mm = None
+        if os.fstat(self._fh.fileno()).st_size > 0:
+            # An empty file cannot be memory-mapped (and has no records):
+            self._mm = mmap.mmap(self._fh.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+
+    def protein_ids(self):
+        return list(self.index)
+
+    def __contains__(self, protein_id):
+        return protein_id in self.index
+
+    def lines(self, protein_id):
+        """
+        Returns the list of annotation lines (with the trailing newline)
+        of the protein protein_id.
+        """
+        if protein_id not in self:
+            return []
+        mm = self._mm
+        lines = []
+        for block_offset, block_len in self.index[protein_id]:
+            block = mm[block_offset:block_offset + block_len].decode()
+            if block.endswith('\n'):
+                block = block[:-1]
+            # Only '\n' ends a line (str.splitlines would also split at
+            # characters such as '\x0b' in the free text columns):
+            lines.extend([inline + '\n' for inline in block.split('\n')])
+        return lines
+
+    def records(self, protein_ids, record='lazy'):
+        """
+        Yields the records of the proteins in protein_ids. record selects
+        the type of the records, as for GOAParser.gafiterator.
+        """
+        for protein_id in protein_ids:
+            for rec in GOA.gaflineiterator(self.lines(protein_id),
+                                           self.fields, record):
+                yield rec
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+if __name__ == '__main__':
+    print (sys.argv[0] + ':')
+    print (__doc__)
+    sys.exit(0)
@@ -54,39 +54,85 @@
         based on GPA file format version and retuns an iterator to read a file
         either in GPA format version 1.0 or 1.1
 
-    _gaf20iterator(handle):
+    GAF20Record, GAF10Record
+        Compact, read-only records (tuple subclasses without a per-instance
+        dictionary) for GAF 2.0 and GAF 1.0 lines. Fields are accessed by 
+        name, as with the dictionary records: rec['GO_ID'].
+
+    GAF20LazyRecord, GAF10LazyRecord
+        Lazy records for GAF 2.0 and GAF 1.0 lines. They keep the raw line
+        and split a column (or a '|' separated list field) only when that
+        field is first read.
+
+    _gaf20iterator(handle, record='lazy', filters=None):
         This method returns an iterator to read a file in GAF format 
         version 2.0
 
-    _gaf10iterator(handle):
+    _gaf10iterator(handle, record='lazy', filters=None):
         This method returns an iterator to read a file in GAF format 
         version 1.0
 
-    gafiterator(handle):
+    gafiterator(handle, record='lazy', filters=None):
         This method invokes _gaf10iterator or _gaf20iterator private methods
         based on GAF file format version and retuns an iterator to read a file
-        either in GAF format version 1.0 or 2.0
+        either in GAF format version 1.0 or 2.0. By default the iterator 
+        yields lazy records; record='dict' yields one dictionary per line 
+        and record='tuple' yields GAF20Record/GAF10Record objects.
+        filters (e.g. {'Evidence': set(['EXP', 'IDA'])}) selects records 
+        by field values; lines are checked before a record is built.
 
-    _gaf10byproteiniterator(handle):
+    _gaf10byproteiniterator(handle, record='lazy', filters=None):
 
 
-    _gaf20byproteiniterator(handle):
+    _gaf20byproteiniterator(handle, record='lazy', filters=None):
 
-    gafbyproteiniterator(handle):
+    gafbyproteiniterator(handle, record='lazy', filters=None, sort=False,
+                         buffer_lines=SORT_BUFFER_LINES, tmp_dir=None):
         This method invokes _gaf10byproteiniterator or _gaf20byproteiniterator
         private methods based on GAF file format version and retuns an 
         iterator to read a file either in GAF format version 1.0 or 2.0.
         The iterator goes over the consecutive records with the same 
-        DB_OBJECT_ID. 
+        DB_OBJECT_ID. With sort=True, an unsorted file is sorted by 
+        DB_Object_ID first, in runs of buffer_lines lines spilled to 
+        temporary files in tmp_dir.
+
+    read_gaf_fields(handle):
+        This method reads the GAF version from the header (or the first
+        annotation line) and returns the field names of the file 
+        (GAF20FIELDS or GAF10FIELDS) with the first annotation line.
+
+    gafiterator_with_fields(handle, record='lazy', filters=None):
+        This method reads the GAF version from the header (or the first 
+        annotation line) and returns an iterator over the file together 
+        with its field names (GAF20FIELDS or GAF10FIELDS), reading the
+        file only once.
+
+    gaflineiterator(lines, fields=GAF20FIELDS, record='lazy', filters=None)
+        This method iterates over GAF annotation lines that come without a
+        header line (e.g. a part of a GAF file) and yields their records.
+        The GAF version is given by fields (GAF20FIELDS or GAF10FIELDS).
+
+    gaf_columns(handle, cols=(1, 4, 8), min_cols=15)
+        This method iterates over the annotation lines of a GAF file and 
+        yields a tuple with only the requested columns of each line. It 
+        splits a line only up to the highest requested column.
+
+    formatrec(outrec,fields=GAF20FIELDS)
+        This method returns a single UniProt-GOA record as a GAF line.
 
     writerec(outrec,handle,fields=GAF20FIELDS)
-        This method writes a single UniProt-GOA reacord to an output file
-        stream.    
+        This method writes a single UniProt-GOA reacord (a dictionary, a
+        tuple record or a lazy record) to an output file stream.    
 
     writebyproteinrec(outprotrec,handle,fields=GAF20FIELDS)
         This method writes a list of UniProt-GOA records to an output file 
         stream. 
 
+    compile_matcher(fieldvals)
+        This method accepts a dictionary of field values and returns a 
+        function that tests a record as record_has does, without building 
+        any set per record.
+
     record_has(inrec, fieldvals)
         This method accepts a record and a dictionary of filed values. 
         The function returns: 
@@ -102,8 +148,11 @@
     http://www.geneontology.org/GO.format.annotation.shtml
 
 """
-import copy
+import heapq
+import itertools
+import operator
 import sys
+import tempfile
 
 # GAF version 2.0
 GAF20FIELDS = ['DB' , 
@@ -298,62 +347,255 @@ def gpa_iterator(handle):
         sys.stderr.write("gpa 1.0\n")
         return _gpa10iterator(handle)
 
-def _gaf20iterator(handle):
-    for inline in handle:
-        if inline[0] == '!': continue
-        inrec = inline.rstrip('\n').split('\t')
-        if len(inrec) == 1:
-            continue
-        inrec[3] = inrec[3].split('|') #Qualifier
-        inrec[5] = inrec[5].split('|') # DB:reference(s)
-        inrec[7] = inrec[7].split('|') # With || From
-        inrec[10] = inrec[10].split('|') # Synonym
-        inrec[12] = inrec[12].split('|') # Taxon
-        yield dict(zip(GAF20FIELDS, inrec))
+class _GAFTupleRecord(tuple):
+    """
+    Base class of the compact GAF records (PRIVATE).
+    A record is a tuple of the column values of one GAF line; a field can
+    also be looked up by name (rec['GO_ID']), so the record can be passed
+    to the methods written for the dictionary records. It has no 
+    per-instance dictionary, which keeps it much smaller than a dict.
+    """
+    __slots__ = ()
+    _fields = ()
+    _index = {}
 
+    def __getitem__(self, key):
+        if key.__class__ is str:
+            return tuple.__getitem__(self, self._index[key])
+        return tuple.__getitem__(self, key)
 
-def _gaf10iterator(handle):
-    for inline in handle:
-        if inline[0] == '!': continue
-        inrec = inline.rstrip('\n').split('\t')
-        if len(inrec) == 1:
-            continue
-        inrec[3] = inrec[3].split('|') #Qualifier
-        inrec[5] = inrec[5].split('|') # DB:reference(s)
-        inrec[7] = inrec[7].split('|') # With || From
-        inrec[10] = inrec[10].split('|') # Synonym
-        inrec[12] = inrec[12].split('|') # Taxon
-        yield dict(zip(GAF10FIELDS, inrec))
+    def __contains__(self, field):
+        return self._index.get(field, len(self)) < len(self)
 
-def _gaf10byproteiniterator(handle):
-    cur_id = None
-    id_rec_list = []
+    def get(self, field, default=None):
+        if field in self:
+            return self[field]
+        return default
+
+    def keys(self):
+        return list(self._fields[:len(self)])
+
+    def items(self):
+        return list(zip(self._fields, self))
+
+    def _asdict(self):
+        return dict(zip(self._fields, self))
+
+    def __repr__(self):
+        return self.__class__.__name__ + repr(self._asdict())
+
+class GAF20Record(_GAFTupleRecord):
+    """A compact record for a line in GAF 2.0 format."""
+    __slots__ = ()
+    _fields = tuple(GAF20FIELDS)
+    _index = dict((field, i) for i, field in enumerate(GAF20FIELDS))
+
+class GAF10Record(_GAFTupleRecord):
+    """A compact record for a line in GAF 1.0 format."""
+    __slots__ = ()
+    _fields = tuple(GAF10FIELDS)
+    _index = dict((field, i) for i, field in enumerate(GAF10FIELDS))
+
+# GAF columns holding '|' separated lists:
+GAF_LIST_COLUMNS = frozenset([3, 5, 7, 10, 12])
+# Names of the GAF fields holding lists (the same in GAF 1.0 and 2.0):
+GAF_LIST_FIELDS = frozenset([GAF20FIELDS[col] for col in GAF_LIST_COLUMNS])
+
+class _GAFLazyRecord(object):
+    """
+    Base class of the lazy GAF records (PRIVATE).
+    A record keeps the raw GAF line. The line is split into columns the
+    first time a field is read, and a list field (Qualifier, DB:Reference,
+    With, Synonym, Taxon_ID) is split on '|' only when that field is 
+    read. Fields are read and assigned by name, like a dictionary record.
+    A record that is not modified is written back by writerec as its 
+    raw line.
+    """
+    __slots__ = ('_line', '_cols', '_vals')
+    _fields = ()
+    _index = {}
+
+    def __init__(self, line):
+        self._line = line   # GAF line without the trailing newline
+        self._cols = None   # column values, once the line is split
+        self._vals = None   # decoded list fields and assigned values
+
+    def _columns(self):
+        cols = self._cols
+        if cols is None:
+            cols = self._cols = self._line.split('\t')
+        return cols
+
+    def __getitem__(self, field):
+        vals = self._vals
+        if vals is not None and field in vals:
+            return vals[field]
+        col = self._index[field]
+        cols = self._columns()
+        if col >= len(cols):
+            raise KeyError(field)
+        if col in GAF_LIST_COLUMNS:
+            value = cols[col].split('|')
+            if vals is None:
+                vals = self._vals = {}
+            vals[field] = value
+            return value
+        return cols[col]
+
+    def __setitem__(self, field, value):
+        if field not in self._index:
+            raise KeyError(field)
+        if self._vals is None:
+            self._vals = {}
+        self._vals[field] = value
+
+    def __len__(self):
+        return min(self._line.count('\t') + 1, len(self._fields))
+
+    def __contains__(self, field):
+        return self._index.get(field, len(self)) < len(self)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def get(self, field, default=None):
+        if field in self:
+            return self[field]
+        return default
+
+    def keys(self):
+        return list(self._fields[:len(self)])
+
+    def items(self):
+        return [(field, self[field]) for field in self.keys()]
+
+    def _asdict(self):
+        return dict(self.items())
+
+    def _is_raw(self, nfields):
+        """
+        Returns True if the raw line has nfields columns and no field has
+        been modified, so the line can be written out unchanged.
+        """
+        if self._line.count('\t') + 1 != nfields:
+            return False
+        vals = self._vals
+        if vals:
+            cols = self._columns()
+            for field, value in vals.items():
+                if isinstance(value, list):
+                    value = '|'.join(value)
+                if value != cols[self._index[field]]:
+                    return False
+        return True
+
+    def __repr__(self):
+        return self.__class__.__name__ + repr(self._asdict())
+
+class GAF20LazyRecord(_GAFLazyRecord):
+    """A lazy record for a line in GAF 2.0 format."""
+    __slots__ = ()
+    _fields = GAF20Record._fields
+    _index = GAF20Record._index
+
+class GAF10LazyRecord(_GAFLazyRecord):
+    """A lazy record for a line in GAF 1.0 format."""
+    __slots__ = ()
+    _fields = GAF10Record._fields
+    _index = GAF10Record._index
+
+def _gaf_record_factory(fields, record):
+    """
+    Returns the callable that turns a list of column values into a record
+    of the requested type (PRIVATE): 'dict' or 'tuple'.
+    """
+    if record == 'dict':
+        return lambda inrec: dict(zip(fields, inrec))
+    elif record == 'tuple':
+        if len(fields) == len(GAF20FIELDS):
+            return GAF20Record
+        return GAF10Record
+    raise ValueError("record must be 'lazy', 'dict' or 'tuple', not %r" \
+                     % (record,))
+
+def _gaf_line_filter(fields, filters):
+    """
+    Returns a function that tells, from the raw GAF line, whether a line
+    passes the filters (PRIVATE). filters maps field names to sets of 
+    allowed values. A list field (e.g. Taxon_ID) passes when any of its
+    '|' separated values is allowed. The line is split only up to the 
+    highest filtered column. Returns None when there are no filters.
+    """
+    if not filters:
+        return None
+    tests = []
+    for field, values in filters.items():
+        if field not in fields:
+            raise ValueError('Cannot filter on unknown GAF field %r' \
+                             % (field,))
+        col = fields.index(field)
+        if not isinstance(values, str):
+            values = frozenset(values)
+        # A string (e.g. the EXP_EVIDENCE_CODES entry of the config file)
+        # is tested with 'in', as the record filters of the tools do:
+        tests.append((col, values, col in GAF_LIST_COLUMNS))
+    maxcol = max([col for col, values, is_list in tests])
+    def line_filter(inline):
+        cols = inline.split('\t', maxcol + 1)
+        if len(cols) <= maxcol:
+            return False
+        for col, values, is_list in tests:
+            if is_list:
+                for value in cols[col].split('|'):
+                    if value in values:
+                        break
+                else:
+                    return False
+            elif cols[col] not in values:
+                return False
+        return True
+    return line_filter
+
+def _gaflazyiterator(handle, lazy_class, line_filter=None):
+    """
+    Yields a lazy record of type lazy_class for every annotation line
+    (PRIVATE) that passes line_filter. No column is split here, apart 
+    from the partial split done by line_filter.
+    """
     for inline in handle:
         if inline[0] == '!': continue
-        inrec = inline.rstrip('\n').split('\t')
-        if len(inrec) == 1:
+        if '\t' not in inline:
             continue
-        inrec[3] = inrec[3].split('|') #Qualifier
-        inrec[5] = inrec[5].split('|') # DB:reference(s)
-        inrec[7] = inrec[7].split('|') # With || From
-        inrec[10] = inrec[10].split('|') # Synonym
-        inrec[12] = inrec[12].split('|') # Taxon
-        cur_rec = dict(zip(GAF10FIELDS, inrec))
-        if cur_rec['DB_Object_ID'] != cur_id and cur_id:
-            ret_list = copy.copy(id_rec_list)
-            id_rec_list = [cur_rec]
-            cur_id = cur_rec['DB_Object_ID']
-            yield ret_list
-        else:
-            cur_id = cur_rec['DB_Object_ID']
-            id_rec_list.append(cur_rec)
-
-def _gaf20byproteiniterator(handle):
-    cur_id = None
-    id_rec_list = []
+        inline = inline.rstrip('\n')
+        if line_filter is not None and not line_filter(inline):
+            continue
+        yield lazy_class(inline)
+
+def _gaf20iterator(handle, record='lazy', filters=None):
+    line_filter = _gaf_line_filter(GAF20FIELDS, filters)
+    if record == 'lazy':
+        return _gaflazyiterator(handle, GAF20LazyRecord, line_filter)
+    return _gafeageriterator(handle, _gaf_record_factory(GAF20FIELDS, record),
+                             line_filter)
+
+def _gaf10iterator(handle, record='lazy', filters=None):
+    line_filter = _gaf_line_filter(GAF10FIELDS, filters)
+    if record == 'lazy':
+        return _gaflazyiterator(handle, GAF10LazyRecord, line_filter)
+    return _gafeageriterator(handle, _gaf_record_factory(GAF10FIELDS, record),
+                             line_filter)
+
+def _gafeageriterator(handle, make_record, line_filter=None):
+    """
+    Splits every column of every annotation line that passes line_filter 
+    and yields the record built by make_record (PRIVATE).
+    """
     for inline in handle:
         if inline[0] == '!': continue
-        inrec = inline.rstrip('\n').split('\t')
+        inline = inline.rstrip('\n')
+        if line_filter is not None and not line_filter(inline):
+            continue
+        inrec = inline.split('\t')
         if len(inrec) == 1:
             continue
         inrec[3] = inrec[3].split('|') #Qualifier
@@ -361,46 +603,274 @@ def _gaf20byproteiniterator(handle):
         inrec[7] = inrec[7].split('|') # With || From
         inrec[10] = inrec[10].split('|') # Synonym
         inrec[12] = inrec[12].split('|') # Taxon
-        cur_rec = dict(zip(GAF20FIELDS, inrec))
-        if cur_rec['DB_Object_ID'] != cur_id and cur_id:
-            ret_list = copy.copy(id_rec_list)
-            id_rec_list = [cur_rec]
-            cur_id = cur_rec['DB_Object_ID']
-            yield ret_list
-        else:
-            cur_id = cur_rec['DB_Object_ID']
-            id_rec_list.append(cur_rec)
-
-def gafbyproteiniterator(handle):
+        yield make_record(inrec)
+
+# Number of annotation lines that gafbyproteiniterator (sort=True) sorts
+# in memory before it writes them to a temporary file:
+SORT_BUFFER_LINES = 1000000
+
+# Largest number of sorted runs that are merged (and kept open) at once:
+MERGE_FAN_IN = 64
+
+def _gafbyprotein(rec_iter):
+    """
+    Groups consecutive records with the same DB_Object_ID (PRIVATE).
+    Every group, the last one included, is yielded as a new list.
+    """
+    for prot_id, group in itertools.groupby(rec_iter,
+                              operator.itemgetter('DB_Object_ID')):
+        yield list(group)
+
+def _protein_id(inline):
+    """
+    Returns the DB_Object_ID of an annotation line (PRIVATE).
+    """
+    return inline.split('\t', 2)[1]
+
+def _spill_run(buf, tmp_dir=None):
+    """
+    Sorts the annotation lines buf by DB_Object_ID, writes them to a new
+    temporary file in the directory tmp_dir and returns the file, 
+    rewound for reading (PRIVATE).
+    """
+    buf.sort(key=_protein_id)
+    run = tempfile.TemporaryFile(mode='w+', dir=tmp_dir)
+    run.writelines(inline + '\n' for inline in buf)
+    run.seek(0)
+    return run
+
+def _merge_runs(runs, tmp_dir=None):
+    """
+    Merges the sorted runs (temporary files) runs into a new temporary 
+    file in the directory tmp_dir, closes them and returns the new run, 
+    rewound for reading (PRIVATE). heapq.merge takes equal keys from the
+    earlier runs first, so the order of the lines of a protein is kept.
+    """
+    merged = tempfile.TemporaryFile(mode='w+', dir=tmp_dir)
+    try:
+        merged.writelines(heapq.merge(*runs, key=_protein_id))
+    finally:
+        for run in runs:
+            run.close()
+    merged.seek(0)
+    return merged
+
+def _add_run(runs, run, fan_in=MERGE_FAN_IN, tmp_dir=None):
+    """
+    Appends the sorted run run to the list runs of (level, run) pairs 
+    (PRIVATE). Whenever the last fan_in runs have the same level, they 
+    are merged into one run of the next level, so at most 
+    (fan_in - 1) * levels runs are open, and every line is written 
+    once per level.
+    """
+    level = 0
+    runs.append((level, run))
+    while len(runs) >= fan_in and runs[-fan_in][0] == level:
+        group = [pair[1] for pair in runs[-fan_in:]]
+        del runs[-fan_in:]
+        level += 1
+        runs.append((level, _merge_runs(group, tmp_dir)))
+
+def _gafsortedlines(handle, line_filter=None, buffer_lines=SORT_BUFFER_LINES,
+                    tmp_dir=None, fan_in=MERGE_FAN_IN):
+    """
+    Yields the annotation lines of handle that pass line_filter, sorted by
+    DB_Object_ID (PRIVATE). The lines of a protein keep the order they 
+    have in the file. At most buffer_lines lines are kept in memory: every
+    full buffer is sorted and written to a temporary file (a sorted run).
+    The runs are merged in passes of at most fan_in runs (see _add_run),
+    so the number of open files stays small however large the file is,
+    and the last runs are merged while the lines are yielded.
+    """
+    runs = []
+    buf = []
+    try:
+        for inline in handle:
+            if inline[0] == '!' or '\t' not in inline:
+                continue
+            inline = inline.rstrip('\n')
+            if line_filter is not None and not line_filter(inline):
+                continue
+            buf.append(inline)
+            if len(buf) >= buffer_lines:
+                _add_run(runs, _spill_run(buf, tmp_dir), fan_in, tmp_dir)
+                buf = []
+        # Together with the buffer, at most fan_in runs are merged in 
+        # the last pass:
+        while len(runs) >= fan_in:
+            group = runs[-fan_in:]
+            del runs[-fan_in:]
+            runs.append((group[0][0] + 1,
+                         _merge_runs([pair[1] for pair in group], tmp_dir)))
+        buf.sort(key=_protein_id)
+        # heapq.merge takes equal keys from the earlier runs first, so 
+        # the order of the lines of a protein is kept:
+        sorted_runs = [(inline.rstrip('\n') for inline in pair[1]) 
+                       for pair in runs]
+        sorted_runs.append(buf)
+        for inline in heapq.merge(*sorted_runs, key=_protein_id):
+            yield inline
+    finally:
+        for pair in runs:
+            pair[1].close()
+
+def _gaf10byproteiniterator(handle, record='lazy', filters=None):
+    return _gafbyprotein(_gaf10iterator(handle, record, filters))
+
+def _gaf20byproteiniterator(handle, record='lazy', filters=None):
+    return _gafbyprotein(_gaf20iterator(handle, record, filters))
+
+def _gafsortedbyproteiniterator(handle, fields, record='lazy', filters=None,
+                                buffer_lines=SORT_BUFFER_LINES, tmp_dir=None):
+    lines = _gafsortedlines(handle, _gaf_line_filter(fields, filters),
+                            buffer_lines, tmp_dir)
+    return _gafbyprotein(gaflineiterator(lines, fields, record))
+
+def gafbyproteiniterator(handle, record='lazy', filters=None, sort=False,
+                         buffer_lines=SORT_BUFFER_LINES, tmp_dir=None):
     """
     Iterates over records in a gene association file. 
     Returns a list of all consecutive records with the same DB_Object_ID
     This function should be called to read a
     gene_association.goa_uniprot file. Reads the first record and
-    returns a gaf 2.0 or a gaf 1.0 iterator as needed
+    returns a gaf 2.0 or a gaf 1.0 iterator as needed.
+    record selects the type of the records, as for gafiterator.
+    filters drops records before they are grouped, as for gafiterator.
+    With sort=True, the file does not have to be sorted by DB_Object_ID:
+    the lines are sorted first (an external sort that keeps at most
+    buffer_lines lines in memory and writes sorted runs to temporary 
+    files in tmp_dir), so every protein comes in a single list.
     """
     inline = handle.readline()
     if inline.strip() == '!gaf-version: 2.0':
         sys.stderr.write("gaf 2.0\n")
-        return _gaf20byproteiniterator(handle)
+        if sort:
+            return _gafsortedbyproteiniterator(handle, GAF20FIELDS, record,
+                                               filters, buffer_lines, tmp_dir)
+        return _gaf20byproteiniterator(handle, record, filters)
     else:
         sys.stderr.write("gaf 1.0\n")
-        return _gaf10byproteiniterator(handle)
+        if sort:
+            return _gafsortedbyproteiniterator(handle, GAF10FIELDS, record,
+                                               filters, buffer_lines, tmp_dir)
+        return _gaf10byproteiniterator(handle, record, filters)
 
-def gafiterator(handle):
+def gafiterator(handle, record='lazy', filters=None):
     """
     Iterate pver a GAF 1.0 or 2.0 file.
     This function should be called to read a
     gene_association.goa_uniprot file. Reads the first record and
-    returns a gaf 2.0 or a gaf 1.0 iterator as needed
+    returns a gaf 2.0 or a gaf 1.0 iterator as needed.
+    record selects the type of the records yielded: 'lazy' (default, a 
+    GAF20LazyRecord/GAF10LazyRecord that decodes fields on first access),
+    'dict' (one dictionary per line) or 'tuple' (a compact 
+    GAF20Record/GAF10Record).
+    filters is a dictionary that maps field names to sets of allowed 
+    values, e.g. {'Evidence': set(['EXP', 'IDA']), 'Aspect': set(['F'])}.
+    Only the records whose fields all have allowed values are yielded; a
+    list field such as Taxon_ID is allowed when any of its values is. The
+    filters are checked on the raw line, split only up to the highest 
+    filtered column, before any record is built.
     """
     inline = handle.readline()
     if inline.strip() == '!gaf-version: 2.0':
         sys.stderr.write("gaf 2.0\n")
-        return _gaf20iterator(handle)
+        return _gaf20iterator(handle, record, filters)
     else:
         sys.stderr.write("gaf 1.0\n")
-        return _gaf10iterator(handle)
+        return _gaf10iterator(handle, record, filters)
+
+def read_gaf_fields(handle):
+    """
+    Reads the GAF file handle up to its first annotation line and returns
+    the list of the field names of the file (GAF20FIELDS or GAF10FIELDS)
+    together with that line (None, if the file has no annotation line).
+    The version is read from the '!gaf-version' header line (2.0, 2.1,
+    2.2 are GAF 2.x) or, if there is none, from the number of columns of
+    the first annotation line.
+    """
+    version = None
+    first_line = None
+    for inline in handle:
+        if inline[0] == '!':
+            if inline.startswith('!gaf-version:'):
+                version = inline.split(':', 1)[1].strip()
+            continue
+        first_line = inline
+        break
+    if version is None and first_line is not None:
+        if first_line.count('\t') + 1 >= len(GAF20FIELDS):
+            version = '2.0'
+    if version is not None and version.startswith('2'):
+        return GAF20FIELDS, first_line
+    return GAF10FIELDS, first_line
+
+def gafiterator_with_fields(handle, record='lazy', filters=None):
+    """
+    Iterates over a GAF 1.0 or 2.x file in a single pass and returns the
+    iterator together with the list of the field names of the file
+    (GAF20FIELDS or GAF10FIELDS), as read by read_gaf_fields. The first
+    annotation line is handed back to the iterator, so the file is
+    neither reopened nor rewound, and it can be a compressed or a network
+    stream. record and filters are as for gafiterator.
+    """
+    fields, first_line = read_gaf_fields(handle)
+    if first_line is not None:
+        handle = itertools.chain([first_line], handle)
+    if fields is GAF20FIELDS:
+        sys.stderr.write("gaf 2.0\n")
+        return _gaf20iterator(handle, record, filters), GAF20FIELDS
+    sys.stderr.write("gaf 1.0\n")
+    return _gaf10iterator(handle, record, filters), GAF10FIELDS
+
+def gaflineiterator(lines, fields=GAF20FIELDS, record='lazy', filters=None):
+    """
+    Iterates over the GAF annotation lines lines (a file handle or any 
+    iterable of lines) that do not start with a GAF header line, such as
+    a part of a GAF file. fields (GAF20FIELDS or GAF10FIELDS) tells the
+    GAF version of the lines. record selects the type of the records, 
+    and filters as for gafiterator. Comment lines are skipped.
+    """
+    if len(fields) == len(GAF20FIELDS):
+        return _gaf20iterator(lines, record, filters)
+    return _gaf10iterator(lines, record, filters)
+
+def gaf_columns(handle, cols=(1, 4, 8), min_cols=15):
+    """
+    Iterates over the annotation lines of a GAF file and yields, for each
+    line, a tuple with the values of the columns cols (column numbers 
+    start at 0, e.g. 1: DB_Object_ID, 4: GO_ID, 8: Aspect). A line is 
+    split only up to the highest column in cols. Comment lines and lines
+    with fewer than min_cols columns (15 columns for GAF 1.0) are skipped.
+    The handle may be positioned anywhere in the file, a header line is
+    skipped like any other comment line.
+    """
+    maxsplit = max(cols) + 1
+    min_tabs = max(min_cols, maxsplit) - 1
+    if len(cols) == 1:
+        col = cols[0]
+        project = lambda inrec: (inrec[col],)
+    else:
+        project = operator.itemgetter(*cols)
+    for inline in handle:
+        if inline[0] == '!' or inline.count('\t') < min_tabs:
+            continue
+        yield project(inline.rstrip('\n').split('\t', maxsplit))
+
+def formatrec(outrec,fields=GAF20FIELDS):
+    """
+    Returns a single UniProt-GOA record as a GAF line, with the trailing
+    newline. Caller should know the format version. Default: gaf-2.0
+    """
+    if isinstance(outrec, _GAFLazyRecord) and outrec._is_raw(len(fields)):
+        # An unmodified lazy record is written out as it was read:
+        return outrec._line + '\n'
+    if isinstance(outrec, _GAFTupleRecord) and len(outrec) == len(fields):
+        values = outrec
+    else:
+        values = [outrec[field] for field in fields]
+    return '\t'.join([('|'.join(value) if isinstance(value, list) else value)
+                      for value in values]) + '\n'
 
 def writerec(outrec,handle,fields=GAF20FIELDS):
     """Write a single UniProt-GOA record to an output stream. 
@@ -409,16 +879,7 @@ def writerec(outrec,handle,fields=GAF20FIELDS):
     If header has a value, then it is assumed this is the first record,
     a header is written.
     """
-    outstr = ''
-    for field in fields[:-1]:
-        if isinstance(outrec[field], list):
-            for subfield in outrec[field]:
-                outstr += subfield + '|'
-            outstr = outstr[:-1] + '\t'
-        else:
-            outstr += outrec[field] + '\t'
-    outstr += outrec[fields[-1]] + '\n'
-    handle.write("%s" % outstr)
+    handle.write(formatrec(outrec, fields))
 
 def writebyproteinrec(outprotrec,handle,fields=GAF20FIELDS):
     """
@@ -432,23 +893,59 @@ def writebyproteinrec(outprotrec,handle,fields=GAF20FIELDS):
     for outrec in outprotrec:
         writerec(outrec, handle, fields=fields)
 
+def _field_matcher(field, vals):
+    """
+    Returns a function that tells whether the field field of a record has
+    one of the values vals (PRIVATE). Whether the value is a string or a
+    list is checked for every record: the single valued GAF fields hold
+    strings and the fields of GAF_LIST_FIELDS hold lists, but the records
+    of other formats (e.g. the DB_Object_Synonym of a GPI record) may have
+    a list in any field.
+    """
+    def matcher(inrec):
+        value = inrec[field]
+        if isinstance(value, str):
+            return value in vals
+        # isdisjoint stops at the first common value:
+        return not vals.isdisjoint(value)
+    return matcher
+
+def compile_matcher(fieldvals):
+    """
+    This method accepts a dictionary of field values in the format 
+    {'field_name': set([val1, val2])} and returns a function that accepts
+    a record (a dictionary, a tuple record or a lazy record) and returns
+    True if any field in the record has a matching value, otherwise False.
+    The value sets are prepared once, so that no set is built per record:
+    a single valued field is tested with 'in' and a list field (e.g. 
+    Taxon_ID) stops at its first matching value.
+    """
+    matchers = []
+    for field, vals in fieldvals.items():
+        if not isinstance(vals, (set, frozenset)):
+            vals = frozenset(vals)
+        matchers.append(_field_matcher(field, vals))
+    if not matchers:
+        return lambda inrec: False
+    if len(matchers) == 1:
+        return matchers[0]
+    def matcher(inrec):
+        for field_matcher in matchers:
+            if field_matcher(inrec):
+                return True
+        return False
+    return matcher
+
 def record_has(inrec, fieldvals):
     """
     This method accepts a record, and a dictionary of field values. 
     The format is {'field_name': set([val1, val2])}.
+    The record can be a dictionary, a tuple record or a lazy record.
     If any field in the record has a matching value, the function returns
-    True. Otherwise, returns False.
-    """
-    retval = False
-    for field in fieldvals:
-        if isinstance(inrec[field], str):
-            set1 = set([inrec[field]])
-        else:
-            set1 = set(inrec[field])
-        if (set1 & fieldvals[field]):
-            retval = True
-            break
-    return retval
+    True. Otherwise, returns False. To test many records against the same
+    field values, use compile_matcher.
+    """
+    return compile_matcher(fieldvals)(inrec)
 
 if __name__ == '__main__':
     print (sys.argv[0] + ':')
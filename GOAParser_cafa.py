@@ -32,10 +32,20 @@
         proteins present in t2 files, if the evidence code of the proteins
         in t1 file is electronic or experimental. Accordingly, splits them
         into 2 different files and writes out the files
+
+    t1_filter_parallel(t1_fname,
+                       t1_iea_name,
+                       t1_exp_name,
+                       t2_exp_name,
+                       EXP_default=set([]),
+                       jobs=None):
+        This method does the same as t1_filter, but parses the t1 file 
+        t1_fname on jobs processes (ParallelGAF).
 '''
 import os
 import sys
 import GOAParser
+import ParallelGAF
 from os.path import basename
 from collections import defaultdict
 
@@ -149,6 +159,20 @@ def record_has_forBenchmark(inupgrec,
                 break        
     return retval  
 
+def _t2_exp_proteins(t2_exp_name):
+    '''
+    Returns a dictionary of the proteins in the t2 file t2_exp_name, with
+    the aspects of their annotations (PRIVATE).
+    '''
+    t2_exp_handle = open(t2_exp_name, 'r')
+    
+    exp_pid_dict = defaultdict(lambda:defaultdict())
+
+    for protName, aspect in GOAParser.gaf_columns(t2_exp_handle, (1, 8)):
+        exp_pid_dict[protName][aspect] = 1
+    t2_exp_handle.close()
+    return exp_pid_dict
+
 def t1_filter(t1_iter, 
               t1_iea_name, 
               t1_exp_name, 
@@ -161,16 +185,7 @@ def t1_filter(t1_iter,
     in t1 file is electronic or experimental. Accordingly, splits them
     into 2 different files and writes out the files
     '''
-    t2_exp_handle = open(t2_exp_name, 'r')
-    
-    exp_pid_dict = defaultdict(lambda:defaultdict())
-
-    for inline in t2_exp_handle:
-        inrec = inline.strip('\n').split('\t')
-        if len(inrec) < 15:
-            continue
-        exp_pid_dict[inrec[1]][inrec[8]] = 1
-    t2_exp_handle.close()
+    exp_pid_dict = _t2_exp_proteins(t2_exp_name)
 
     t1_iea_handle = open(t1_iea_name, "w")
     t1_exp_handle = open(t1_exp_name, "w")
@@ -185,6 +200,36 @@ def t1_filter(t1_iter,
     t1_exp_handle.close()
     exp_pid_dict.clear()
 
+def t1_filter_parallel(t1_fname,
+                       t1_iea_name,
+                       t1_exp_name,
+                       t2_exp_name,
+                       EXP_default=set([]),
+                       jobs=None):
+    '''
+    This method does the same as t1_filter for the t1 file t1_fname. The
+    file is parsed on jobs processes, and the worker processes send back
+    only the records of the proteins present in t2 file.
+    '''
+    exp_pid_dict = _t2_exp_proteins(t2_exp_name)
+    GAFFIELDS = ParallelGAF.gaf_fields(t1_fname)
+
+    t1_iea_handle = open(t1_iea_name, "w")
+    t1_exp_handle = open(t1_exp_name, "w")
+
+    project = lambda rec: (rec['Evidence'] in EXP_default,
+                           GOAParser.formatrec(rec, GAFFIELDS))
+    for is_exp, outline in ParallelGAF.parallel_gaf(t1_fname, None, project,
+                               jobs=jobs,
+                               filters={'DB_Object_ID': exp_pid_dict.keys()}):
+        if is_exp:
+            t1_exp_handle.write(outline)
+        else:
+            t1_iea_handle.write(outline)
+    t1_iea_handle.close()
+    t1_exp_handle.close()
+    exp_pid_dict.clear()
+
 if __name__ == '__main__': 
     print (sys.argv[0] + ':')
     print(__doc__)
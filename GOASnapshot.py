@@ -0,0 +1,380 @@
+#!/usr/bin/env python
+'''
+    This module has the following methods to keep a parsed UniProt-GOA
+    file as a binary snapshot in the workspace. A snapshot stores the
+    columns DB_Object_ID, DB:Reference, GO_ID, Evidence, Aspect and Taxon_ID
+    dictionary-encoded: one integer code per line and column, plus a string
+    table per column that maps the codes back to the values. It also stores
+    the byte offset and length of every annotation line, so that the
+    complete line can be read from the (memory-mapped) UniProt-GOA file.
+
+    A snapshot is written once for a UniProt-GOA file and is identified by
+    the SHA-1 hash of the file content. Later runs memory-map the snapshot
+    instead of parsing the text file again.
+
+    file_hash(fname):
+        This method returns the SHA-1 hash of the content of the file fname.
+
+    open_snapshot(goa_fname, work_dir, create=True):
+        This method returns a GOASnapshot for the UniProt-GOA file
+        goa_fname. It looks for a valid snapshot in the snapshot directory
+        of the workspace work_dir and, if none is found and create is True,
+        it writes a new one. It returns None for a compressed file, which
+        cannot be memory-mapped.
+
+    create_snapshot(goa_fname, snapshot_dir, digest=None):
+        This method parses the UniProt-GOA file goa_fname and writes its
+        snapshot to the directory snapshot_dir.
+
+    prune_snapshots(work_dir):
+        This method deletes the snapshots in the workspace work_dir whose
+        UniProt-GOA file no longer exists or no longer has the content
+        the snapshot was made from. open_snapshot calls it before it
+        writes a new snapshot.
+
+    GOASnapshot(snapshot_dir, goa_fname):
+        A memory-mapped snapshot of the UniProt-GOA file goa_fname:
+            rows:
+                the number of annotation lines.
+            fields:
+                GAF20FIELDS or GAF10FIELDS.
+            codes(field):
+                the integer codes of the column field, one per line.
+            strings(field):
+                the string table of the column field.
+            gaf_columns(cols):
+                iterates over the lines and yields a tuple of the values
+                of the columns cols (GAF column numbers, as for
+                GOAParser.gaf_columns) per line.
+            select(field, values):
+                returns the line numbers with a value of the column field
+                in values.
+            line(row):
+                returns the annotation line row, with the newline.
+            records(rows=None, record='lazy'):
+                yields the records of the lines rows (default: all the
+                lines), as GOAParser.gafiterator does.
+'''
+import array
+import hashlib
+import itertools
+import mmap
+import os
+import shutil
+import sys
+
+import CompressedIO as cio
+import GOAParser as GOA
+
+# Version of the snapshot format:
+SNAPSHOT_VERSION = '1'
+
+# Name of the snapshot directory in the workspace:
+SNAPSHOT_DIRNAME = 'snapshots'
+
+# GAF column numbers of the dictionary-encoded columns:
+SNAPSHOT_COLUMNS = {'DB_Object_ID': 1,
+                    'GO_ID': 4,
+                    'DB:Reference': 5,
+                    'Evidence': 6,
+                    'Aspect': 8,
+                    'Taxon_ID': 12}
+
+def file_hash(fname):
+    """
+    This method returns the SHA-1 hash (hexadecimal string) of the content
+    of the file fname.
+    """
+    digest = hashlib.sha1()
+    with open(fname, 'rb') as fh:
+        block = fh.read(cio.READ_BUFFER_SIZE)
+        while block:
+            digest.update(block)
+            block = fh.read(cio.READ_BUFFER_SIZE)
+    return digest.hexdigest()
+
+def _source_stamp(goa_fname):
+    """
+    Returns the absolute path, the size and the modification time of the
+    file goa_fname (PRIVATE).
+    """
+    st = os.stat(goa_fname)
+    return [os.path.abspath(goa_fname), str(st.st_size), str(st.st_mtime_ns)]
+
+def _read_meta(snapshot_dir):
+    """
+    Returns the meta data of a snapshot as a dictionary, or None if the
+    snapshot directory has no meta data file (PRIVATE).
+    """
+    meta_fname = snapshot_dir + '/meta'
+    if not os.path.exists(meta_fname):
+        return None
+    meta = {}
+    with open(meta_fname, 'r') as meta_fh:
+        for inline in meta_fh:
+            key, value = inline.rstrip('\n').split('\t', 1)
+            meta[key] = value
+    return meta
+
+def _write_meta(snapshot_dir, meta):
+    """
+    Writes the meta data dictionary meta of a snapshot (PRIVATE).
+    """
+    with open(snapshot_dir + '/meta', 'w') as meta_fh:
+        for key in sorted(meta):
+            meta_fh.write(key + '\t' + meta[key] + '\n')
+
+def _is_valid(meta):
+    """
+    Returns True if meta belongs to a complete snapshot that can be read
+    on this machine (PRIVATE).
+    """
+    return meta is not None and \
+           meta.get('version') == SNAPSHOT_VERSION and \
+           meta.get('byteorder') == sys.byteorder
+
+def create_snapshot(goa_fname, snapshot_dir, digest=None):
+    """
+    This method parses the UniProt-GOA file goa_fname and writes its
+    snapshot to the directory snapshot_dir. digest is the SHA-1 hash of
+    goa_fname (it is computed, if None). The snapshot is written to a
+    temporary directory first, so an interrupted run never leaves an
+    incomplete snapshot behind.
+    """
+    if digest is None:
+        digest = file_hash(goa_fname)
+    fields = GOA.GAF10FIELDS
+    columns = sorted(SNAPSHOT_COLUMNS.items(), key=lambda item: item[1])
+    tables = [{} for field, col in columns]
+    codes = [array.array('i') for field, col in columns]
+    offsets = array.array('q')
+    lengths = array.array('i')
+    offset = 0
+    with open(goa_fname, 'rb', buffering=cio.READ_BUFFER_SIZE) as fh:
+        for inline in fh:
+            line_len = len(inline)
+            if inline[:1] == b'!':
+                if inline.strip() == b'!gaf-version: 2.0':
+                    fields = GOA.GAF20FIELDS
+            elif b'\t' in inline:
+                # The same lines as read by GOAParser.gafiterator:
+                offsets.append(offset)
+                lengths.append(line_len)
+                cols = inline.rstrip(b'\n').split(b'\t')
+                for i in range(len(columns)):
+                    col = columns[i][1]
+                    value = cols[col] if col < len(cols) else b''
+                    table = tables[i]
+                    code = table.get(value)
+                    if code is None:
+                        code = table[value] = len(table)
+                    codes[i].append(code)
+            offset += line_len
+
+    tmp_dir = snapshot_dir + '.tmp' + str(os.getpid())
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    for i in range(len(columns)):
+        field = columns[i][0]
+        with open(tmp_dir + '/' + _column_fname(field) + '.codes', 'wb') \
+             as codes_fh:
+            codes[i].tofile(codes_fh)
+        # The values are stored in the order of their codes:
+        with open(tmp_dir + '/' + _column_fname(field) + '.strings', 'wb') \
+             as strings_fh:
+            strings_fh.write(b'\n'.join(tables[i]))
+    with open(tmp_dir + '/offsets', 'wb') as offsets_fh:
+        offsets.tofile(offsets_fh)
+    with open(tmp_dir + '/lengths', 'wb') as lengths_fh:
+        lengths.tofile(lengths_fh)
+    source, size, mtime = _source_stamp(goa_fname)
+    _write_meta(tmp_dir, {'version': SNAPSHOT_VERSION,
+                          'byteorder': sys.byteorder,
+                          'sha1': digest,
+                          'rows': str(len(offsets)),
+                          'gaf_version':
+                              '2.0' if fields is GOA.GAF20FIELDS else '1.0',
+                          'source': source,
+                          'size': size,
+                          'mtime': mtime})
+    if os.path.exists(snapshot_dir):
+        shutil.rmtree(snapshot_dir)
+    os.rename(tmp_dir, snapshot_dir)
+    return None
+
+def _column_fname(field):
+    """
+    Returns the file name prefix of the column field (PRIVATE).
+    """
+    return field.replace(':', '_')
+
+def open_snapshot(goa_fname, work_dir, create=True):
+    """
+    This method returns a GOASnapshot of the UniProt-GOA file goa_fname.
+    The snapshots are kept in the directory SNAPSHOT_DIRNAME of the
+    workspace work_dir, one subdirectory per SHA-1 hash. A snapshot is
+    found without hashing goa_fname again, if the file has the same path,
+    size and modification time as when the snapshot was last used. If no
+    valid snapshot is found, a new snapshot is written when create is
+    True; otherwise None is returned. None is also returned for a
+    compressed file.
+    """
+    if cio.compression_type(goa_fname):
+        return None
+    snapshots_dir = work_dir + '/' + SNAPSHOT_DIRNAME
+    source, size, mtime = _source_stamp(goa_fname)
+    # Look for a snapshot of the unchanged file:
+    if os.path.isdir(snapshots_dir):
+        for digest in sorted(os.listdir(snapshots_dir)):
+            snapshot_dir = snapshots_dir + '/' + digest
+            meta = _read_meta(snapshot_dir)
+            if _is_valid(meta) and meta['source'] == source and \
+               meta['size'] == size and meta['mtime'] == mtime:
+                return GOASnapshot(snapshot_dir, goa_fname)
+    # Look for a snapshot of a file with the same content:
+    digest = file_hash(goa_fname)
+    snapshot_dir = snapshots_dir + '/' + digest
+    meta = _read_meta(snapshot_dir)
+    if _is_valid(meta):
+        # Remember this file, so it is not hashed on the next run:
+        meta['source'], meta['size'], meta['mtime'] = source, size, mtime
+        _write_meta(snapshot_dir, meta)
+        return GOASnapshot(snapshot_dir, goa_fname)
+    if not create:
+        return None
+    # The snapshots of files that changed are not used any more:
+    prune_snapshots(work_dir)
+    print('Creating a snapshot of ' + os.path.basename(goa_fname) + ' ...')
+    create_snapshot(goa_fname, snapshot_dir, digest)
+    return GOASnapshot(snapshot_dir, goa_fname)
+
+def prune_snapshots(work_dir):
+    """
+    This method deletes the snapshots in the workspace work_dir whose
+    UniProt-GOA file, as recorded in the snapshot, no longer exists or
+    no longer has the SHA-1 hash of the snapshot, and the snapshots of
+    an older SNAPSHOT_VERSION. A file is hashed again only when its size
+    is the same but its modification time changed. The temporary
+    directories of snapshots that are being written are left alone.
+    """
+    snapshots_dir = work_dir + '/' + SNAPSHOT_DIRNAME
+    if not os.path.isdir(snapshots_dir):
+        return None
+    for digest in sorted(os.listdir(snapshots_dir)):
+        if '.tmp' in digest:
+            continue
+        snapshot_dir = snapshots_dir + '/' + digest
+        meta = _read_meta(snapshot_dir)
+        if _is_valid(meta) and os.path.isfile(meta['source']):
+            source, size, mtime = _source_stamp(meta['source'])
+            if size == meta['size'] and mtime == meta['mtime']:
+                continue
+            if size == meta['size'] and \
+               file_hash(meta['source']) == meta['sha1']:
+                # Only the modification time changed:
+                meta['mtime'] = mtime
+                _write_meta(snapshot_dir, meta)
+                continue
+        print('Deleting the out of date snapshot ' + digest + ' ...')
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+    return None
+
+def _map_array(fname, typecode):
+    """
+    Memory-maps the binary file fname and returns it as a read-only array
+    of typecode items (PRIVATE).
+    """
+    if os.path.getsize(fname) == 0:
+        # An empty file cannot be memory-mapped:
+        return array.array(typecode)
+    with open(fname, 'rb') as fh:
+        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mm).cast(typecode)
+
+class GOASnapshot(object):
+    """
+    A memory-mapped snapshot (in snapshot_dir) of the UniProt-GOA file
+    goa_fname. The columns are mapped when they are first used.
+    """
+    def __init__(self, snapshot_dir, goa_fname):
+        self.snapshot_dir = snapshot_dir
+        self.goa_fname = goa_fname
+        meta = _read_meta(snapshot_dir)
+        self.rows = int(meta['rows'])
+        if meta['gaf_version'] == '2.0':
+            self.fields = GOA.GAF20FIELDS
+        else:
+            self.fields = GOA.GAF10FIELDS
+        self._codes = {}
+        self._strings = {}
+        self._offsets = _map_array(snapshot_dir + '/offsets', 'q')
+        self._lengths = _map_array(snapshot_dir + '/lengths', 'i')
+        self._source = _map_array(goa_fname, 'B')
+
+    def codes(self, field):
+        if field not in self._codes:
+            self._codes[field] = _map_array(self.snapshot_dir + '/' +
+                                            _column_fname(field) + '.codes',
+                                            'i')
+        return self._codes[field]
+
+    def strings(self, field):
+        if field not in self._strings:
+            with open(self.snapshot_dir + '/' + _column_fname(field) +
+                      '.strings', 'rb') as strings_fh:
+                data = strings_fh.read()
+            if self.rows == 0:
+                self._strings[field] = []
+            else:
+                self._strings[field] = data.decode().split('\n')
+        return self._strings[field]
+
+    def _field(self, col):
+        for field in SNAPSHOT_COLUMNS:
+            if SNAPSHOT_COLUMNS[field] == col:
+                return field
+        raise KeyError('GAF column ' + str(col) + ' is not in the snapshot')
+
+    def gaf_columns(self, cols=(1, 4, 8)):
+        """
+        Returns an iterator that yields, for every annotation line, a
+        tuple with the values of the GAF columns cols (column numbers
+        start at 0).
+        """
+        fields = [self._field(col) for col in cols]
+        # The string tables are looked up in C, column by column:
+        return zip(*[map(self.strings(field).__getitem__, self.codes(field))
+                     for field in fields])
+
+    def select(self, field, values):
+        """
+        Returns the list of the line numbers whose column field has one of
+        the values values.
+        """
+        strings = self.strings(field)
+        wanted = set([code for code in range(len(strings))
+                      if strings[code] in values])
+        return list(itertools.compress(range(self.rows),
+                                       map(wanted.__contains__,
+                                           self.codes(field))))
+
+    def line(self, row):
+        offset = self._offsets[row]
+        return bytes(self._source[offset:offset + self._lengths[row]]).decode()
+
+    def records(self, rows=None, record='lazy'):
+        """
+        Yields the records of the annotation lines rows (default: all the
+        lines). record selects the type of the records, as for
+        GOAParser.gafiterator.
+        """
+        if rows is None:
+            rows = range(self.rows)
+        lines = (self.line(row) for row in rows)
+        return GOA.gaflineiterator(lines, self.fields, record)
+
+if __name__ == '__main__':
+    print (sys.argv[0] + ':')
+    print (__doc__)
+    sys.exit(0)
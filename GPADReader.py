@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+'''
+    This module has the following methods to read annotations that come
+    as a pair of Gene Product Association Data (GPAD) and Gene Product
+    Information (GPI) files, instead of a UniProt-GOA file in GAF format.
+    The GPI file is read once into a compact lookup table, and the GPAD
+    rows are then streamed and joined against it. Every joined row is
+    turned into a GAF 2.0 annotation line, so the records have the same
+    fields and types as the records of GOAParser.gafiterator and can be
+    given to the tools and to GOAParser.writerec unchanged.
+
+    ECO2GAF
+        Dictionary that maps Evidence & Conclusion Ontology (ECO) codes,
+        as used in GPAD files, to GAF evidence codes. It holds the default
+        mappings of the GO Consortium gaf-eco-mapping file and the ECO
+        codes UniProt-GOA uses for electronic (IEA) annotations.
+        Details: http://geneontology.org/gene-associations/gaf-eco-mapping.txt
+
+    load_eco_mapping(fname):
+        This method reads a gaf-eco-mapping file (or the derived mapping
+        file) of the GO Consortium and returns a dictionary that maps ECO
+        codes to GAF evidence codes. The files are read once; later calls
+        return the cached dictionary.
+
+    gpi_lookup(handle):
+        This method reads a GPI 1.0 or 1.1 file and returns a dictionary
+        that maps 'DB:DB_Object_ID' to a tuple (DB_Object_Symbol,
+        DB_Object_Name, DB_Object_Synonym, DB_Object_Type, Taxon) of
+        raw GPI columns.
+
+    gpad_gaf_lines(gpad_handle, gpi, eco_map=ECO2GAF):
+        This method reads a GPAD 1.0 or 1.1 file and yields a GAF 2.0
+        annotation line for every GPAD row, joined with the GPI lookup
+        gpi. The ECO code is mapped to a GAF evidence code with eco_map;
+        an ECO code that is not in eco_map is kept as it is. The Aspect
+        is taken from the relation in the GPAD Qualifier column.
+
+    gpadgafiterator(gpad_handle, gpi_handle, record='lazy', filters=None,
+                    eco_map=ECO2GAF):
+        This method returns an iterator over the GAF 2.0 records of a
+        GPAD file and its GPI file. record and filters are as for
+        GOAParser.gafiterator.
+
+    If this module is run with a GPAD file, a GPI file and an output file
+    name, it writes the annotations as a GAF 2.0 file (GPAD and GPI files
+    may be compressed; the output is compressed if its name ends with .gz):
+
+        python GPADReader.py gp_association.goa_uniprot.gz \\
+            gp_information.goa_uniprot.gz goa_uniprot.gaf
+'''
+import sys
+
+import CompressedIO as cio
+import GOAParser as GOA
+
+# Default ECO to GAF evidence code mappings:
+ECO2GAF = {
+    'ECO:0000269' : 'EXP',
+    'ECO:0000314' : 'IDA',
+    'ECO:0000353' : 'IPI',
+    'ECO:0000315' : 'IMP',
+    'ECO:0000316' : 'IGI',
+    'ECO:0000270' : 'IEP',
+    'ECO:0006056' : 'HTP',
+    'ECO:0007005' : 'HDA',
+    'ECO:0007001' : 'HMP',
+    'ECO:0007003' : 'HGI',
+    'ECO:0007007' : 'HEP',
+    'ECO:0000250' : 'ISS',
+    'ECO:0000266' : 'ISO',
+    'ECO:0000247' : 'ISA',
+    'ECO:0000255' : 'ISM',
+    'ECO:0000317' : 'IGC',
+    'ECO:0000245' : 'RCA',
+    'ECO:0000318' : 'IBA',
+    'ECO:0000319' : 'IBD',
+    'ECO:0000320' : 'IKR',
+    'ECO:0000321' : 'IRD',
+    'ECO:0000304' : 'TAS',
+    'ECO:0000303' : 'NAS',
+    'ECO:0000305' : 'IC',
+    'ECO:0000307' : 'ND',
+    'ECO:0000501' : 'IEA',
+    'ECO:0000203' : 'IEA',
+    'ECO:0000256' : 'IEA',
+    'ECO:0000265' : 'IEA',
+    'ECO:0000322' : 'IEA',
+    'ECO:0000323' : 'IEA',
+    'ECO:0000363' : 'IEA',
+    'ECO:0000364' : 'IEA',
+    'ECO:0007669' : 'IEA'}
+
+# GPAD relations and the GAF Aspect of the GO terms they are used with:
+RELATION2ASPECT = {
+    'enables' : 'F',
+    'contributes_to' : 'F',
+    'involved_in' : 'P',
+    'acts_upstream_of' : 'P',
+    'acts_upstream_of_positive_effect' : 'P',
+    'acts_upstream_of_negative_effect' : 'P',
+    'acts_upstream_of_or_within' : 'P',
+    'acts_upstream_of_or_within_positive_effect' : 'P',
+    'acts_upstream_of_or_within_negative_effect' : 'P',
+    'part_of' : 'C',
+    'located_in' : 'C',
+    'is_active_in' : 'C',
+    'colocalizes_with' : 'C'}
+
+# GPAD qualifiers that are also GAF 2.0 qualifiers:
+GAF_QUALIFIERS = set(['NOT', 'contributes_to', 'colocalizes_with'])
+
+# Dictionaries read by load_eco_mapping, by file name:
+_eco_mappings = {}
+
+def load_eco_mapping(fname):
+    """
+    This method reads the GO Consortium ECO mapping file fname and returns
+    a dictionary that maps ECO codes to GAF evidence codes. Every line of
+    the file has an ECO code, a GAF evidence code and a reference (a
+    GO_REF or 'Default'), in any order. The dictionary is cached.
+    """
+    if fname in _eco_mappings:
+        return _eco_mappings[fname]
+    eco_map = {}
+    with cio.open_input(fname) as fh:
+        for inline in fh:
+            if inline[0] == '#' or inline[0] == '!':
+                continue
+            cols = inline.split()
+            eco = [col for col in cols if col.startswith('ECO:')]
+            codes = [col for col in cols if not col.startswith('ECO:') and
+                     not col.startswith('GO_REF:') and col != 'Default']
+            if len(eco) == 1 and len(codes) == 1:
+                # The default mapping of an ECO code comes first:
+                eco_map.setdefault(eco[0], codes[0])
+    _eco_mappings[fname] = eco_map
+    return eco_map
+
+def gpi_lookup(handle):
+    """
+    This method reads the GPI file handle and returns a dictionary that
+    maps 'DB:DB_Object_ID' to the tuple (DB_Object_Symbol, DB_Object_Name,
+    DB_Object_Synonym, DB_Object_Type, Taxon). The columns are kept as
+    the raw strings of the GPI file (synonyms stay '|' separated), and
+    the repeated type and taxon strings are shared between entries.
+    """
+    inline = handle.readline()
+    if inline.strip() == '!gpi-version: 1.1':
+        # GPI 1.1: DB_Object_ID already has the DB prefix
+        key_cols, info_cols = (0,), (1, 2, 3, 4, 5)
+    else:
+        key_cols, info_cols = (0, 2), (3, 4, 5, 6, 7)
+    max_col = max(info_cols)
+    intern = sys.intern
+    gpi = {}
+    for inline in handle:
+        if inline[0] == '!': continue
+        inrec = inline.rstrip('\n').split('\t')
+        if len(inrec) <= max_col:
+            continue
+        key = ':'.join([inrec[col] for col in key_cols])
+        symbol, name, synonym, obj_type, taxon = [inrec[col]
+                                                  for col in info_cols]
+        gpi[key] = (symbol, name, synonym, intern(obj_type), intern(taxon))
+    return gpi
+
+def gpad_gaf_lines(gpad_handle, gpi, eco_map=ECO2GAF):
+    """
+    This method reads the GPAD file gpad_handle and yields, for every
+    annotation, a GAF 2.0 line (without the trailing newline) filled with
+    the GPI entry of the annotated object from the lookup gpi. An object
+    without a GPI entry gets empty GPI columns.
+    """
+    # Only GPAD 1.0 has a spliceform (GAF Gene_Product_Form_ID) column:
+    has_spliceform = gpad_handle.readline().strip() != '!gpa-version: 1.1'
+    no_info = ('', '', '', '', '')
+    for inline in gpad_handle:
+        if inline[0] == '!': continue
+        inrec = inline.rstrip('\n').split('\t')
+        if len(inrec) < 11:
+            continue
+        db, db_object_id, qualifier, go_id, db_ref, eco, with_from, \
+            interacting_taxon, date, assigned_by, extension = inrec[:11]
+        spliceform = ''
+        if has_spliceform and len(inrec) > 11:
+            spliceform = inrec[11]
+        symbol, name, synonym, obj_type, taxon = \
+            gpi.get(db + ':' + db_object_id, no_info)
+        aspect = ''
+        gaf_qualifiers = []
+        for value in qualifier.split('|'):
+            if value in GAF_QUALIFIERS:
+                gaf_qualifiers.append(value)
+            if value in RELATION2ASPECT:
+                aspect = RELATION2ASPECT[value]
+        if interacting_taxon:
+            taxon = taxon + '|' + interacting_taxon
+        yield '\t'.join([db, db_object_id, symbol, '|'.join(gaf_qualifiers),
+                         go_id, db_ref, eco_map.get(eco, eco), with_from,
+                         aspect, name, synonym, obj_type, taxon, date,
+                         assigned_by, extension, spliceform])
+
+def gpadgafiterator(gpad_handle, gpi_handle, record='lazy', filters=None,
+                    eco_map=ECO2GAF):
+    """
+    This method reads the GPI file gpi_handle into a lookup table and
+    returns an iterator over the GAF 2.0 records of the GPAD file
+    gpad_handle. record selects the type of the records and filters
+    selects records by their (GAF) field values, as for
+    GOAParser.gafiterator.
+    """
+    gpi = gpi_lookup(gpi_handle)
+    return GOA.gaflineiterator(gpad_gaf_lines(gpad_handle, gpi, eco_map),
+                               GOA.GAF20FIELDS, record, filters)
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4:
+        print (sys.argv[0] + ':')
+        print (__doc__)
+    else:
+        with cio.open_input(sys.argv[1]) as gpad_handle, \
+             cio.open_input(sys.argv[2]) as gpi_handle, \
+             cio.open_output(sys.argv[3]) as out_handle:
+            gpi = gpi_lookup(gpi_handle)
+            out_handle.write('!gaf-version: 2.0\n')
+            for outline in gpad_gaf_lines(gpad_handle, gpi):
+                out_handle.write(outline + '\n')
+    sys.exit(0)
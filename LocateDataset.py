@@ -14,6 +14,8 @@
         If the file is not available in the workspace and in the source 
             directory, it quits the program with a message which 
             includes the name of program that invoked this method.
+        A compressed file (.gz, .bz2, .xz) is NOT copied to the workspace:
+            the tools read it directly from where it is found.
 
     locate_SwissProtfile:
         If the file is found in the source directory:
@@ -43,8 +45,13 @@ from os.path import basename
 import shutil
 import inspect
 
+import CompressedIO as cio
+
 def locate_GOAfile(infile, work_dir):
-    if os.path.exists(work_dir + '/' + basename(infile)):
+    if os.path.exists(infile) and cio.compression_type(infile):
+        # Compressed files are streamed from the source directory:
+        return infile
+    elif os.path.exists(work_dir + '/' + basename(infile)):
         pass
     elif os.path.exists(infile):
         shutil.copy(infile, work_dir)
@@ -0,0 +1,410 @@
+#!/usr/bin/env python
+'''
+    The MemorySuite program measures the memory used by the stages of the
+    benchmark pipeline on synthetic inputs (see SyntheticData) of
+    increasing size. Every stage runs in a fresh process, so that its peak
+    resident set size (RSS) is its own. The program reports, per stage and
+    size, the peak RSS growth and the peak of the memory traced by
+    tracemalloc, both also in bytes per annotation, and the source lines
+    that held the most memory near the traced peak.
+
+    How to run this program:
+
+       python MemorySuite.py --sizes 100000 1000000 \\
+                             --baseline memory-baseline.json
+
+    --sizes lists the numbers of annotation lines of the t1 UniProt-GOA
+        file (default: 100000 1000000).
+    --stages selects the stages by name (default: all of them).
+    --data-dir is the directory for the generated inputs, shared with
+        ThroughputSuite (default: a temporary directory).
+    --top is the number of top allocations reported per stage (default:
+        10). With --top 0, the stages are not traced by tracemalloc and
+        only the peak RSS is measured. The allocations of the thread
+        that takes the snapshots (in threading.py, tracemalloc.py and
+        the _PeakSnapshot class) are left out of the report.
+    --baseline is a JSON file with the results of an earlier run. If a
+        stage uses more than --tolerance (default: 0.15, i.e. 15%) more
+        bytes per annotation than in the baseline, the program reports it
+        and exits with status 1.
+    --save writes the results of this run to the --baseline file,
+        together with the ThroughputSuite.machine_info of the machine it
+        ran on.
+
+    memory-baseline.json is the baseline of the sizes 100000 and 1000000,
+    saved on the machine described in its "machine" entry. When the
+    machine of a baseline differs from the current one, the comparison
+    is still made, but a warning is printed.
+
+    The stages are:
+
+    count_freq             PaperTermFrequency.count_freq of the t2 file
+    t1_filter              GOAParser_cafa.t1_filter of the t1 file
+    create_benchmarks      CreateBenchmark.create_benchmarks
+    verify_LK_benchmark    verifyBenchmark.verify_LK_benchmark (BPO)
+    verify_NK_benchmark    verifyBenchmark.verify_NK_benchmark (BPO)
+    appendSprot2goa        AppendSprot2GOA.appendSprot2goa
+
+    The tracemalloc pass and the RSS pass of a stage run in separate
+    processes, because tracing itself takes memory.
+'''
+import argparse
+import inspect
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import tracemalloc
+
+import AppendSprot2GOA as as2g
+import CreateBenchmark as cb
+import GOAParser as GOA
+import GOAParser_cafa as gc
+import PaperTermFrequency as ptf
+import SyntheticData as sd
+import ThroughputSuite as ts
+import verifyBenchmark as vb
+
+# Default numbers of t1 annotation lines:
+SIZES = [100000, 1000000]
+
+# Names of the benchmark files, in the order of create_benchmarks:
+BENCHMARK_TYPES = ['LK_bpo', 'LK_cco', 'LK_mfo', 'NK_bpo', 'NK_cco', 'NK_mfo']
+
+def prepare_data(data_dir, size, seed=sd.SEED):
+    """
+    This method generates the inputs of the given size (see
+    ThroughputSuite.prepare_data) together with the benchmark files that
+    the verify stages check, and returns the dictionary of the inputs.
+    """
+    data = ts.prepare_data(data_dir, size, seed)
+    size_dir = os.path.dirname(data['t1.gaf'])
+    for bm_type in BENCHMARK_TYPES:
+        data['bm_' + bm_type] = os.path.join(size_dir, 'bm_' + bm_type)
+    if not all([os.path.exists(data['bm_' + bm_type])
+                for bm_type in BENCHMARK_TYPES]):
+        _create_benchmarks(data, size_dir)
+    return data
+
+def _benchmark_inputs(data):
+    """
+    Returns the number of annotations in the inputs of create_benchmarks
+    and of the verify stages (PRIVATE).
+    """
+    return data['n_t1.iea'] + data['n_t1.exp'] + data['n_t2.exp']
+
+def _create_benchmarks(data, out_dir):
+    bm_handles = [open(os.path.join(out_dir, 'bm_' + bm_type), 'w')
+                  for bm_type in BENCHMARK_TYPES]
+    with open(data['t1.iea'], 'r') as t1_iea_handle, \
+         open(data['t1.exp'], 'r') as t1_exp_handle, \
+         open(data['t2.exp'], 'r') as t2_exp_handle:
+        cb.create_benchmarks(t1_iea_handle, t1_exp_handle, t2_exp_handle,
+                             *bm_handles)
+    for bm_handle in bm_handles:
+        bm_handle.close()
+
+def stage_count_freq(data, out_dir):
+    with open(data['t2.gaf'], 'r') as fh:
+        ptf.count_freq(fh, ts.EXP_EEC)
+    return data['n_t2.gaf']
+
+def stage_t1_filter(data, out_dir):
+    with open(data['t1.gaf'], 'r') as fh:
+        gc.t1_filter(GOA.gafiterator(fh), os.path.join(out_dir, 't1.iea'),
+                     os.path.join(out_dir, 't1.exp'), data['t2.exp'],
+                     GOA.GAF20FIELDS, ts.EXP_EEC)
+    return data['n_t1.gaf']
+
+def stage_create_benchmarks(data, out_dir):
+    _create_benchmarks(data, out_dir)
+    return _benchmark_inputs(data)
+
+def stage_verify_LK_benchmark(data, out_dir):
+    with open(data['t1.iea'], 'r') as t1_iea_handle, \
+         open(data['t1.exp'], 'r') as t1_exp_handle, \
+         open(data['t2.exp'], 'r') as t2_exp_handle, \
+         open(data['bm_LK_bpo'], 'r') as bm_handle:
+        vb.verify_LK_benchmark(t1_iea_handle, t1_exp_handle, t2_exp_handle,
+                               bm_handle, 'BPO')
+    return _benchmark_inputs(data)
+
+def stage_verify_NK_benchmark(data, out_dir):
+    with open(data['t1.iea'], 'r') as t1_iea_handle, \
+         open(data['t1.exp'], 'r') as t1_exp_handle, \
+         open(data['t2.exp'], 'r') as t2_exp_handle, \
+         open(data['bm_NK_bpo'], 'r') as bm_handle:
+        vb.verify_NK_benchmark(t1_iea_handle, t1_exp_handle, t2_exp_handle,
+                               bm_handle, 'BPO')
+    return _benchmark_inputs(data)
+
+def stage_appendSprot2goa(data, out_dir):
+    with open(data['sprot.dat'], 'r') as fh_sprot, \
+         open(os.path.join(out_dir, 'merged.gaf'), 'w') as fh_merged:
+        as2g.appendSprot2goa(fh_sprot, data['t1.gaf'], sd.TAXON_ID,
+                             fh_merged)
+    return data['n_t1.gaf']
+
+# The stages, in the order they are run:
+STAGES = [('count_freq', stage_count_freq),
+          ('t1_filter', stage_t1_filter),
+          ('create_benchmarks', stage_create_benchmarks),
+          ('verify_LK_benchmark', stage_verify_LK_benchmark),
+          ('verify_NK_benchmark', stage_verify_NK_benchmark),
+          ('appendSprot2goa', stage_appendSprot2goa)]
+
+def current_rss():
+    """
+    This method returns the resident set size of this process in bytes,
+    or 0 where it cannot be read (it is read from /proc on Linux).
+    """
+    try:
+        with open('/proc/self/statm', 'r') as fh:
+            return int(fh.read().split()[1]) * resource.getpagesize()
+    except (IOError, OSError):
+        return 0
+
+def peak_rss():
+    """
+    This method returns the peak resident set size of this process in
+    bytes. On Linux, it is read from /proc (VmHWM): ru_maxrss keeps the
+    peak of the process before its exec, i.e. of the parent process that
+    spawned it.
+    """
+    try:
+        with open('/proc/self/status', 'r') as fh:
+            for inline in fh:
+                if inline.startswith('VmHWM:'):
+                    return int(inline.split()[1]) * 1024
+    except (IOError, OSError):
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        # Bytes on macOS, kilobytes elsewhere:
+        return maxrss
+    return maxrss * 1024
+
+class _PeakSnapshot(threading.Thread):
+    """
+    A thread that watches the memory traced by tracemalloc while a stage
+    runs and takes a snapshot whenever the traced memory has grown by
+    more than a tenth since the last snapshot, so that the last snapshot
+    shows the allocations near the peak (PRIVATE).
+    """
+    def __init__(self, interval=0.1):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.interval = interval
+        self.snapshot = None
+        self._size = 0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.check()
+
+    def check(self):
+        if not tracemalloc.is_tracing():
+            return None
+        current = tracemalloc.get_traced_memory()[0]
+        if current > 1.1 * self._size:
+            self.snapshot = tracemalloc.take_snapshot()
+            self._size = current
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+def _stage_allocations(stats):
+    """
+    Returns the allocation statistics stats without those of the thread
+    of _PeakSnapshot, which are in threading.py, in tracemalloc.py or in
+    the _PeakSnapshot class, rather than in the measured stage (PRIVATE).
+    """
+    watcher_files = set([os.path.abspath(threading.__file__),
+                         os.path.abspath(tracemalloc.__file__)])
+    lines, first = inspect.getsourcelines(_PeakSnapshot)
+    watcher_lines = range(first, first + len(lines))
+    this_file = os.path.abspath(__file__)
+    stage_stats = []
+    for stat in stats:
+        frame = stat.traceback[0]
+        filename = os.path.abspath(frame.filename)
+        if filename in watcher_files or \
+           (filename == this_file and frame.lineno in watcher_lines):
+            continue
+        stage_stats.append(stat)
+    return stage_stats
+
+def _run_stage(name, data, out_dir, top):
+    """
+    Runs the stage name in this (fresh) process and returns its
+    measurements (PRIVATE). With top > 0, the stage is traced by
+    tracemalloc, otherwise its RSS is measured.
+    """
+    stage = dict(STAGES)[name]
+    result = {}
+    if top > 0:
+        # The watcher is started before the tracing, so its own objects
+        # are not traced:
+        watcher = _PeakSnapshot()
+        watcher.start()
+        tracemalloc.start()
+        n_annotations = stage(data, out_dir)
+        watcher.stop()
+        watcher.check()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result['traced_peak_bytes'] = peak
+        stats = _stage_allocations(watcher.snapshot.statistics('lineno'))
+        # The files of the toolset are reported relative to its directory:
+        repo_dir = os.path.dirname(os.path.abspath(__file__)) + os.sep
+        result['top_allocations'] = [str(stat).replace(repo_dir, '')
+                                     for stat in stats[:top]]
+    else:
+        start_rss = current_rss()
+        n_annotations = stage(data, out_dir)
+        result['rss_peak_bytes'] = peak_rss() - start_rss
+    result['annotations'] = n_annotations
+    return result
+
+def measure_stage(name, data, out_dir, top):
+    """
+    This method runs the stage name in new processes (one for the RSS and,
+    with top > 0, one for tracemalloc) and returns the measurements.
+    """
+    context = multiprocessing.get_context('spawn')
+    result = {}
+    passes = [0]
+    if top > 0:
+        passes.append(top)
+    for top_pass in passes:
+        with context.Pool(1) as pool:
+            result.update(pool.apply(_run_stage, (name, data, out_dir,
+                                                  top_pass)))
+    n_annotations = max(1, result['annotations'])
+    result['rss_bytes_per_annotation'] = round(result['rss_peak_bytes'] /
+                                               float(n_annotations), 1)
+    if 'traced_peak_bytes' in result:
+        result['traced_bytes_per_annotation'] = \
+            round(result['traced_peak_bytes'] / float(n_annotations), 1)
+    return result
+
+def run_suite(sizes, stage_names, data_dir, top, seed=sd.SEED):
+    """
+    This method measures the stages stage_names on the inputs of all sizes
+    and returns the results: a dictionary that maps a stage name to a
+    dictionary that maps a size (as a string) to the measurements.
+    """
+    results = {}
+    for size in sizes:
+        data = prepare_data(data_dir, size, seed)
+        for name, stage in STAGES:
+            if name not in stage_names:
+                continue
+            out_dir = tempfile.mkdtemp(dir=data_dir)
+            try:
+                result = measure_stage(name, data, out_dir, top)
+            finally:
+                shutil.rmtree(out_dir)
+            results.setdefault(name, {})[str(size)] = result
+            print('%-20s %10d %10d annotations  peak RSS %8.1f MB '
+                  '(%7.1f bytes/annotation)'
+                  % (name, size, result['annotations'],
+                     result['rss_peak_bytes'] / 1048576.0,
+                     result['rss_bytes_per_annotation']))
+            if 'traced_peak_bytes' in result:
+                print('%-20s %10s %10s              traced %8.1f MB '
+                      '(%7.1f bytes/annotation)'
+                      % ('', '', '', result['traced_peak_bytes'] / 1048576.0,
+                         result['traced_bytes_per_annotation']))
+                for allocation in result['top_allocations']:
+                    print('        ' + allocation)
+            sys.stdout.flush()
+    return results
+
+def compare(results, baseline, tolerance):
+    """
+    This method compares the bytes per annotation of the results with the
+    baseline results and returns the list of regressions as strings.
+    """
+    regressions = []
+    for name in results:
+        for size in results[name]:
+            if size not in baseline.get(name, {}):
+                continue
+            for key in ['rss_bytes_per_annotation',
+                        'traced_bytes_per_annotation']:
+                if key not in results[name][size] or \
+                   key not in baseline[name][size]:
+                    continue
+                old_value = baseline[name][size][key]
+                new_value = results[name][size][key]
+                if new_value > (1.0 + tolerance) * old_value:
+                    regressions.append('%s (%s): %s %.1f, baseline %.1f'
+                                       % (name, size, key, new_value,
+                                          old_value))
+    return regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Measures the memory use '
+                                     'of the benchmark pipeline stages.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help='Numbers of t1 annotation lines')
+    parser.add_argument('--stages', nargs='+',
+                        default=[name for name, stage in STAGES],
+                        choices=[name for name, stage in STAGES],
+                        help='Stages to measure')
+    parser.add_argument('--data-dir', default='',
+                        help='Directory for the generated inputs')
+    parser.add_argument('--seed', type=int, default=sd.SEED,
+                        help='Seed of the input generator')
+    parser.add_argument('--top', type=int, default=10,
+                        help='Top allocations reported per stage')
+    parser.add_argument('--baseline', default='',
+                        help='JSON file with baseline results')
+    parser.add_argument('--save', action='store_true', default=False,
+                        help='Write the results to the baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='Allowed growth of the bytes per annotation')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    data_dir = args.data_dir
+    if not data_dir:
+        data_dir = tempfile.mkdtemp(prefix='memory-')
+    elif not os.path.exists(data_dir):
+        os.makedirs(data_dir)
+    data_dir = os.path.abspath(data_dir)
+    try:
+        results = run_suite(args.sizes, set(args.stages), data_dir, args.top,
+                            args.seed)
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir)
+    exit_code = 0
+    if args.baseline and os.path.exists(args.baseline) and not args.save:
+        with open(args.baseline, 'r') as fh:
+            baseline = json.load(fh)
+        if baseline.get('machine') != ts.machine_info():
+            print('Warning: ' + args.baseline + ' was saved on another '
+                  'machine; its numbers may not be comparable')
+        regressions = compare(results, baseline['results'], args.tolerance)
+        for regression in regressions:
+            print('Regression: ' + regression)
+        if regressions:
+            exit_code = 1
+        else:
+            print('No regression against ' + args.baseline)
+    if args.baseline and args.save:
+        with open(args.baseline, 'w') as fh:
+            json.dump({'machine': ts.machine_info(),
+                       'seed': args.seed,
+                       'results': results}, fh, indent=2, sort_keys=True)
+        print('Results saved in ' + args.baseline)
+    sys.exit(exit_code)
@@ -3,6 +3,7 @@
     This module has the following two methods: 
 
     count_freq(goa_handle, EEC=set([])):
+        goa_handle is a file handle to a UniProt-GOA file or a GOASnapshot.
         This method calculates two things: 
         (1) the number of annotations per paper for every paper listed in 
             the input file, and 
@@ -20,20 +21,25 @@ import sys
 from collections import defaultdict
 import re
 
+import GOAParser as GOA
+from GOASnapshot import GOASnapshot
+
 def count_freq(goa_handle, EEC=set([])):
     paper_conf = defaultdict(lambda:defaultdict(set))
     ann_conf = defaultdict(lambda:defaultdict(set))
-    for line in goa_handle:
-        if line[0] == '!':
-            continue
-        fields = line.strip().split('\t')
-        if not fields[5] == '' and re.match('^PMID', fields[5]): # Match PMID 
-            pubmed_id = fields[5].split(':')[1] # Extract PubMed id
-            if (not EEC) or (fields[6] in EEC):
-                ann_conf[fields[1]][fields[4]].add(str(pubmed_id)) 
+    # Columns 1: protein name, 4: GO ID, 5: DB:Reference, 6: Evidence
+    if isinstance(goa_handle, GOASnapshot):
+        columns = goa_handle.gaf_columns((1, 4, 5, 6))
+    else:
+        columns = GOA.gaf_columns(goa_handle, (1, 4, 5, 6))
+    for protName, goID, dbRef, evidence in columns:
+        if not dbRef == '' and re.match('^PMID', dbRef): # Match PMID 
+            pubmed_id = dbRef.split(':')[1] # Extract PubMed id
+            if (not EEC) or (evidence in EEC):
+                ann_conf[protName][goID].add(str(pubmed_id)) 
                     # add pubmed id as evidence to the protein, GO ID 
-                    # (fields[1], fields[4]) pair
-                paper_conf[pubmed_id][fields[4]] = 1
+                    # (protName, goID) pair
+                paper_conf[pubmed_id][goID] = 1
     return (ann_conf, paper_conf)
 
 def paper_term_freq(goa_handle, ptf_handle, params):
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+'''
+    This module has the following methods to parse a UniProt-GOA file on
+    several CPUs at the same time. The file is cut into chunks of about
+    CHUNK_SIZE bytes at line boundaries and the chunks are parsed by a pool
+    of worker processes. A filter and a projection supplied by the caller
+    are applied in the worker processes, so only the selected values are
+    sent back to the calling process.
+
+    chunk_ranges(fname, chunk_size=CHUNK_SIZE):
+        This method returns a list of (start, end) byte ranges that cover
+        the file fname. Every range starts at the beginning of a line and
+        ends after a newline (or at the end of the file).
+
+    gaf_fields(fname):
+        This method returns GAF20FIELDS or GAF10FIELDS, based on the
+        header (or the first annotation line) of the UniProt-GOA file
+        fname, as GOAParser.read_gaf_fields reads it.
+
+    fork_context():
+        This method returns the multiprocessing context that starts
+        worker processes by fork, or None on a platform without fork.
+
+    parallel_gaf(fname, rec_filter=None, project=None, jobs=None,
+                 ordered=True, record='lazy', chunk_size=CHUNK_SIZE,
+                 filters=None):
+        This method iterates over the records of the UniProt-GOA file
+        fname, parsed on jobs worker processes (default: the number of
+        CPUs). For every record rec with rec_filter(rec) True (or for
+        every record, if rec_filter is None), it yields project(rec) (or
+        rec, if project is None). With ordered=True the values come in
+        the order of the records in the file, otherwise in the order the
+        chunks are finished. A compressed file, or jobs=1, is parsed in
+        the calling process, with the same results. filters (see
+        GOAParser.gafiterator) drops lines in the workers before any 
+        record is built.
+
+    The filter and the projection are handed to the worker processes when
+    the pool starts. The worker processes are always started by fork,
+    whatever the default start method of the platform is (spawn on macOS,
+    forkserver on Linux from Python 3.14), so the filter and the
+    projection can be any callables, e.g. lambdas or closures over large
+    dictionaries. On a platform without fork, the file is parsed in the
+    calling process, with the same results.
+'''
+import io
+import multiprocessing
+import os
+import sys
+
+import CompressedIO as cio
+import GOAParser as GOA
+
+# Approximate size of the chunks handed to the worker processes:
+CHUNK_SIZE = 16 * 1024 * 1024
+
+def chunk_ranges(fname, chunk_size=CHUNK_SIZE):
+    """
+    This method cuts the file fname into newline aligned byte ranges of
+    about chunk_size bytes and returns them as a list of (start, end).
+    """
+    size = os.path.getsize(fname)
+    ranges = []
+    start = 0
+    with open(fname, 'rb') as fh:
+        while start < size:
+            fh.seek(min(start + chunk_size, size))
+            if fh.tell() < size:
+                # Extend the chunk up to the end of the current line:
+                fh.readline()
+            end = fh.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def gaf_fields(fname):
+    """
+    This method returns the list of field names (GAF20FIELDS or
+    GAF10FIELDS) of the UniProt-GOA file fname.
+    """
+    with cio.open_input(fname) as fh:
+        return GOA.read_gaf_fields(fh)[0]
+
+def fork_context():
+    """
+    This method returns the multiprocessing context that starts worker
+    processes by fork, or None if the platform cannot fork.
+    """
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return None
+    return multiprocessing.get_context('fork')
+
+def _select(recs, rec_filter, project):
+    """
+    Applies rec_filter and project to the records recs and yields the
+    selected values (PRIVATE).
+    """
+    if rec_filter is not None:
+        recs = (rec for rec in recs if rec_filter(rec))
+    if project is not None:
+        recs = (project(rec) for rec in recs)
+    return recs
+
+# State of a worker process, set once by _init_worker:
+_worker = {}
+
+def _init_worker(fname, fields, record, filters, rec_filter, project):
+    """
+    Initializes a worker process of the pool (PRIVATE).
+    """
+    _worker['fh'] = open(fname, 'rb')
+    _worker['args'] = (fields, record, filters, rec_filter, project)
+
+def _parse_chunk(chunk):
+    """
+    Parses the byte range chunk of the file in a worker process and
+    returns the selected values of its records (PRIVATE).
+    """
+    start, end = chunk
+    fields, record, filters, rec_filter, project = _worker['args']
+    fh = _worker['fh']
+    fh.seek(start)
+    lines = io.StringIO(fh.read(end - start).decode(), newline='\n')
+    return list(_select(GOA.gaflineiterator(lines, fields, record, filters),
+                        rec_filter, project))
+
+def parallel_gaf(fname, rec_filter=None, project=None, jobs=None,
+                 ordered=True, record='lazy', chunk_size=CHUNK_SIZE,
+                 filters=None):
+    """
+    This method parses the UniProt-GOA file fname on jobs worker processes
+    and yields project(rec) for every record rec that passes rec_filter.
+    record selects the type of the records given to rec_filter and
+    project, and filters selects lines before they are parsed, as for
+    GOAParser.gafiterator.
+    """
+    fields = gaf_fields(fname)
+    jobs = jobs or os.cpu_count() or 1
+    context = fork_context()
+    if jobs == 1 or context is None or cio.compression_type(fname):
+        # A compressed file cannot be cut into chunks, and the workers
+        # need fork to inherit rec_filter and project:
+        with cio.open_input(fname) as fh:
+            for value in _select(GOA.gaflineiterator(fh, fields, record,
+                                                     filters),
+                                 rec_filter, project):
+                yield value
+        return
+    chunks = chunk_ranges(fname, chunk_size)
+    with context.Pool(jobs, _init_worker, (fname, fields, record, filters,
+                                           rec_filter, project)) as pool:
+        if ordered:
+            results = pool.imap(_parse_chunk, chunks)
+        else:
+            results = pool.imap_unordered(_parse_chunk, chunks)
+        for values in results:
+            for value in values:
+                yield value
+
+if __name__ == '__main__':
+    print (sys.argv[0] + ':')
+    print (__doc__)
+    sys.exit(0)
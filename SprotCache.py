@@ -0,0 +1,345 @@
+#!/usr/bin/env python
+'''
+    This module has the following methods to keep the GO annotations of a
+    UniProtKB/SwissProt file, already converted to UniProt-GOA lines, in a
+    cache in the workspace. The cache of a UniProtKB/SwissProt file stores
+    the accessions of every entry (from which the map of the accessions to
+    the primary accessions is built), the taxonomy ids of every entry, and
+    one GAF 2.0 line for every GO cross-reference of every entry, as
+    AppendSprot2GOA.goa_line_template formats it. A later Mergedb run with
+    the same UniProtKB/SwissProt file, but a new UniProt-GOA file, reads
+    the cache instead of parsing and converting the SwissProt file again;
+    only the check of the lines against the new UniProt-GOA file is done
+    again (see AppendSprot2GOA.cached_goa_lines). The accession map of
+    the cache replaces the one of the SprotIndex of the file, so with a
+    cache, Mergedb neither builds nor reads a SprotIndex.
+
+    A cache is identified by the SHA-1 hash of the content of the
+    UniProtKB/SwissProt file. It is rebuilt when CACHE_VERSION or the GAF
+    field names (GOAParser.GAF20FIELDS) change.
+
+    open_cache(sprot_fname, work_dir, jobs=1, create=True):
+        This method returns the SprotCache of the UniProtKB/SwissProt file
+        sprot_fname. It looks for a valid cache in the cache directory of
+        the workspace work_dir and, if none is found and create is True,
+        it writes a new one, parsing the file on jobs processes.
+
+    prune_caches(work_dir):
+        This method deletes the caches in the workspace work_dir whose
+        UniProtKB/SwissProt file no longer exists or no longer has the
+        content the cache was made from. open_cache calls it before it
+        writes a new cache.
+
+    create_cache(sprot_fname, cache_dir, digest=None, jobs=1):
+        This method parses the UniProtKB/SwissProt file sprot_fname,
+        converts the GO cross-references of its entries to GAF lines and
+        writes the cache to the directory cache_dir.
+
+    entry_goa_lines(rec):
+        This method returns the accessions, the taxonomy ids and the GAF
+        2.0 lines of the GO cross-references of the SwissProt record rec.
+
+    SprotCache(cache_dir):
+        The cache in cache_dir:
+            entries:
+                the number of entries of the UniProtKB/SwissProt file.
+            accession_map():
+                returns a dictionary that maps every accession to the
+                primary accession of its entry.
+            goa_entries(taxa=None):
+                yields, for every entry with a taxonomy id in the set taxa
+                (or for every entry, if taxa is None) and with GO
+                cross-references, the tuple (taxonomy ids in taxa,
+                accessions, GAF lines without their newlines).
+
+    Both uncompressed and compressed UniProtKB/SwissProt files can be
+    cached.
+'''
+import array
+import mmap
+import os
+import shutil
+import sys
+
+import AppendSprot2GOA as as2g
+import CompressedIO as cio
+import GOAParser as GOA
+import GOASnapshot as gs
+import SwissProtScanner as sps
+
+# Version of the cache format and of the conversion of the GO
+# cross-references:
+CACHE_VERSION = '1'
+
+# Name of the cache directory in the workspace:
+CACHE_DIRNAME = 'sprot_cache'
+
+def _source_stamp(sprot_fname):
+    """
+    Returns the absolute path, the size and the modification time of the
+    file sprot_fname (PRIVATE).
+    """
+    st = os.stat(sprot_fname)
+    return [os.path.abspath(sprot_fname), str(st.st_size),
+            str(st.st_mtime_ns)]
+
+def _read_meta(cache_dir):
+    """
+    Returns the meta data of a cache as a dictionary, or None if the
+    cache directory has no meta data file (PRIVATE).
+    """
+    meta_fname = cache_dir + '/meta'
+    if not os.path.exists(meta_fname):
+        return None
+    meta = {}
+    with open(meta_fname, 'r') as meta_fh:
+        for inline in meta_fh:
+            key, value = inline.rstrip('\n').split('\t', 1)
+            meta[key] = value
+    return meta
+
+def _write_meta(cache_dir, meta):
+    """
+    Writes the meta data dictionary meta of a cache (PRIVATE).
+    """
+    with open(cache_dir + '/meta', 'w') as meta_fh:
+        for key in sorted(meta):
+            meta_fh.write(key + '\t' + meta[key] + '\n')
+
+def _is_valid(meta):
+    """
+    Returns True if meta belongs to a complete cache that can be read on
+    this machine and has the current conversion of the GO
+    cross-references (PRIVATE).
+    """
+    return meta is not None and \
+           meta.get('version') == CACHE_VERSION and \
+           meta.get('fields') == ','.join(GOA.GAF20FIELDS) and \
+           meta.get('byteorder') == sys.byteorder
+
+def entry_goa_lines(rec):
+    """
+    This method returns the accessions, the taxonomy ids and the list of
+    the GAF 2.0 lines of the GO cross-references of the SwissProt record
+    rec.
+    """
+    goaLines = []
+    template = None
+    for crossRef in rec.cross_references:
+        if crossRef[0] == 'GO':
+            if template is None:
+                template = as2g.goa_line_template(rec, GOA.GAF20FIELDS)
+            goaLines.append(template.format(*as2g.crossref2GOA(crossRef)))
+    return rec.accessions, rec.taxonomy_id, goaLines
+
+def create_cache(sprot_fname, cache_dir, digest=None, jobs=1):
+    """
+    This method parses the UniProtKB/SwissProt file sprot_fname on jobs
+    processes, converts the GO cross-references of its entries with
+    entry_goa_lines and writes the cache to the directory cache_dir.
+    digest is the SHA-1 hash of sprot_fname (it is computed, if None).
+    The cache is written to a temporary directory first, so an
+    interrupted run never leaves an incomplete cache behind.
+    """
+    if digest is None:
+        digest = gs.file_hash(sprot_fname)
+    tmp_dir = cache_dir + '.tmp' + str(os.getpid())
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    accessions = []
+    taxa = []
+    # Per accession, the number of its primary accession; per entry, the
+    # number of its first accession and the offset and the length of its
+    # GAF lines in the file rows:
+    ac_primaries = array.array('i')
+    ac_starts = array.array('i')
+    row_offsets = array.array('q')
+    row_lengths = array.array('i')
+    offset = 0
+    with cio.open_input(sprot_fname) as fh_sprot, \
+         open(tmp_dir + '/rows', 'wb') as rows_fh:
+        for entry_accessions, entry_taxa, goaLines in \
+            sps.parallel_parse(fh_sprot, None, entry_goa_lines, jobs):
+            primary_num = len(accessions)
+            ac_starts.append(primary_num)
+            accessions.extend(entry_accessions)
+            ac_primaries.extend([primary_num] * len(entry_accessions))
+            taxa.append(','.join(entry_taxa))
+            data = ''.join(goaLines).encode()
+            rows_fh.write(data)
+            row_offsets.append(offset)
+            row_lengths.append(len(data))
+            offset += len(data)
+    ac_starts.append(len(accessions))
+    for name, values in [('accessions', accessions), ('taxa', taxa)]:
+        with open(tmp_dir + '/' + name, 'w') as strings_fh:
+            strings_fh.write('\n'.join(values))
+    for name, values in [('ac_primaries', ac_primaries),
+                         ('ac_starts', ac_starts),
+                         ('row_offsets', row_offsets),
+                         ('row_lengths', row_lengths)]:
+        with open(tmp_dir + '/' + name, 'wb') as array_fh:
+            values.tofile(array_fh)
+    source, size, mtime = _source_stamp(sprot_fname)
+    _write_meta(tmp_dir, {'version': CACHE_VERSION,
+                          'fields': ','.join(GOA.GAF20FIELDS),
+                          'byteorder': sys.byteorder,
+                          'sha1': digest,
+                          'entries': str(len(taxa)),
+                          'source': source,
+                          'size': size,
+                          'mtime': mtime})
+    if os.path.exists(cache_dir):
+        shutil.rmtree(cache_dir)
+    os.rename(tmp_dir, cache_dir)
+    return None
+
+def open_cache(sprot_fname, work_dir, jobs=1, create=True):
+    """
+    This method returns the SprotCache of the UniProtKB/SwissProt file
+    sprot_fname. The caches are kept in the directory CACHE_DIRNAME of the
+    workspace work_dir, one subdirectory per SHA-1 hash. A cache is found
+    without hashing sprot_fname again, if the file has the same path, size
+    and modification time as when the cache was last used. If no valid
+    cache is found, a new cache is written when create is True; otherwise
+    None is returned.
+    """
+    caches_dir = work_dir + '/' + CACHE_DIRNAME
+    source, size, mtime = _source_stamp(sprot_fname)
+    # Look for a cache of the unchanged file:
+    if os.path.isdir(caches_dir):
+        for digest in sorted(os.listdir(caches_dir)):
+            cache_dir = caches_dir + '/' + digest
+            meta = _read_meta(cache_dir)
+            if _is_valid(meta) and meta['source'] == source and \
+               meta['size'] == size and meta['mtime'] == mtime:
+                return SprotCache(cache_dir)
+    # Look for a cache of a file with the same content:
+    digest = gs.file_hash(sprot_fname)
+    cache_dir = caches_dir + '/' + digest
+    meta = _read_meta(cache_dir)
+    if _is_valid(meta):
+        # Remember this file, so it is not hashed on the next run:
+        meta['source'], meta['size'], meta['mtime'] = source, size, mtime
+        _write_meta(cache_dir, meta)
+        return SprotCache(cache_dir)
+    if not create:
+        return None
+    # The caches of files that changed are not used any more:
+    prune_caches(work_dir)
+    print('Creating a cache of ' + os.path.basename(sprot_fname) + ' ...')
+    create_cache(sprot_fname, cache_dir, digest, jobs)
+    return SprotCache(cache_dir)
+
+def prune_caches(work_dir):
+    """
+    This method deletes the caches in the workspace work_dir whose
+    UniProtKB/SwissProt file, as recorded in the cache, no longer exists
+    or no longer has the SHA-1 hash of the cache, and the caches of an
+    older CACHE_VERSION. A file is hashed again only when its size is the
+    same but its modification time changed. The temporary directories of
+    caches that are being written are left alone.
+    """
+    caches_dir = work_dir + '/' + CACHE_DIRNAME
+    if not os.path.isdir(caches_dir):
+        return None
+    for digest in sorted(os.listdir(caches_dir)):
+        if '.tmp' in digest:
+            continue
+        cache_dir = caches_dir + '/' + digest
+        meta = _read_meta(cache_dir)
+        if _is_valid(meta) and os.path.isfile(meta['source']):
+            source, size, mtime = _source_stamp(meta['source'])
+            if size == meta['size'] and mtime == meta['mtime']:
+                continue
+            if size == meta['size'] and \
+               gs.file_hash(meta['source']) == meta['sha1']:
+                # Only the modification time changed:
+                meta['mtime'] = mtime
+                _write_meta(cache_dir, meta)
+                continue
+        print('Deleting the out of date cache ' + digest + ' ...')
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return None
+
+def _read_strings(fname, count):
+    """
+    Returns the list of count strings in the string table fname
+    (PRIVATE).
+    """
+    if count == 0:
+        return []
+    with open(fname, 'r') as strings_fh:
+        return strings_fh.read().split('\n')
+
+def _read_array(fname, typecode):
+    """
+    Returns the binary file fname as an array of typecode items
+    (PRIVATE).
+    """
+    values = array.array(typecode)
+    with open(fname, 'rb') as array_fh:
+        values.frombytes(array_fh.read())
+    return values
+
+class SprotCache(object):
+    """
+    The cache of a UniProtKB/SwissProt file in cache_dir. The GAF lines
+    are memory-mapped, so only the lines of the entries that are read are
+    loaded.
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        meta = _read_meta(cache_dir)
+        self.entries = int(meta['entries'])
+        self._ac_primaries = _read_array(cache_dir + '/ac_primaries', 'i')
+        self._ac_starts = _read_array(cache_dir + '/ac_starts', 'i')
+        self._row_offsets = _read_array(cache_dir + '/row_offsets', 'q')
+        self._row_lengths = _read_array(cache_dir + '/row_lengths', 'i')
+        self._accessions = _read_strings(cache_dir + '/accessions',
+                                         len(self._ac_primaries))
+        self._taxa = _read_strings(cache_dir + '/taxa', self.entries)
+        self._rows = b''
+        if os.path.getsize(cache_dir + '/rows') > 0:
+            # An empty file cannot be memory-mapped:
+            with open(cache_dir + '/rows', 'rb') as rows_fh:
+                self._rows = mmap.mmap(rows_fh.fileno(), 0,
+                                       access=mmap.ACCESS_READ)
+
+    def accession_map(self):
+        """
+        Returns a dictionary that maps every accession to the primary
+        accession of its entry.
+        """
+        return dict(zip(self._accessions,
+                        map(self._accessions.__getitem__,
+                            self._ac_primaries)))
+
+    def goa_entries(self, taxa=None):
+        """
+        Yields the tuple (taxonomy ids in taxa, accessions, GAF lines
+        without their newlines) for every entry that has GO
+        cross-references and a taxonomy id in the set taxa (or for every
+        such entry, if taxa is None), in the order of the
+        UniProtKB/SwissProt file.
+        """
+        for entry_num in range(self.entries):
+            length = self._row_lengths[entry_num]
+            if length == 0:
+                continue
+            entry_taxa = self._taxa[entry_num].split(',')
+            if taxa is not None:
+                entry_taxa = [taxon for taxon in entry_taxa if taxon in taxa]
+                if not entry_taxa:
+                    continue
+            offset = self._row_offsets[entry_num]
+            accessions = self._accessions[self._ac_starts[entry_num]:
+                                          self._ac_starts[entry_num + 1]]
+            goaLines = self._rows[offset:offset + length - 1].decode()
+            yield entry_taxa, accessions, goaLines.split('\n')
+
+if __name__ == '__main__':
+    print (sys.argv[0] + ':')
+    print (__doc__)
+    sys.exit(0)
@@ -0,0 +1,392 @@
+#!/usr/bin/env python
+'''
+    This module has the following methods to look up single entries of a
+    UniProtKB/SwissProt file by accession without reading the whole file.
+    An index directory (by default, a sidecar directory next to the
+    UniProtKB/SwissProt file; Mergedb keeps it in the workspace) keeps,
+    for every accession of the file, primary and secondary, the byte
+    offset and length of its entry, the primary accession and the
+    taxonomy ids of the entry. The index is stored as binary arrays and
+    string tables, so it loads without parsing, and the UniProtKB/SwissProt
+    file is memory-mapped, so an entry is read with a single random read.
+
+    index_dirname(sprot_fname):
+        This method returns the name of the index directory of the
+        UniProtKB/SwissProt file sprot_fname: sprot_fname + '.acidx'
+
+    workspace_index_dirname(sprot_fname, work_dir):
+        This method returns the name of the index directory of
+        sprot_fname in the workspace work_dir:
+        work_dir/sprot_index/<file name of sprot_fname>.acidx
+
+    build_index(sprot_fname, index_dir=None):
+        This method reads the UniProtKB/SwissProt file sprot_fname once,
+        writes its index directory and returns the index as a SprotIndex.
+
+    load_index(sprot_fname, index_dir=None):
+        This method returns the SprotIndex of sprot_fname from its index
+        directory. It returns None when the index directory does not
+        exist or is out of date, i.e. when the size or the modification
+        time of sprot_fname has changed since the index was built.
+
+    get_index(sprot_fname, index_dir=None):
+        This method returns the SprotIndex of sprot_fname. It loads the
+        index directory if it is up to date, otherwise it (re)builds it.
+
+    SprotIndex(sprot_fname, index_dir, arrays):
+        An indexed, memory-mapped UniProtKB/SwissProt file:
+            lookup(accession):
+                returns the tuple (offset, length, primary accession,
+                taxonomy ids) of the entry of accession, or None.
+            primary_accession(accession):
+                returns the primary accession of the entry of accession.
+            taxon_ids(accession):
+                returns the tuple of the taxonomy ids of the entry of
+                accession.
+            record(accession):
+                returns the entry of accession as a
+                SwissProtScanner.SprotRecord.
+            accession_map():
+                returns a dictionary that maps every accession to the
+                primary accession of its entry.
+            accessions():
+                returns the accessions in the file, entry by entry.
+        An accession that is not in the file has no entry: lookup,
+        primary_accession, taxon_ids and record return None for it.
+
+    The UniProtKB/SwissProt file must be an uncompressed file: a
+    compressed file cannot be memory-mapped.
+'''
+import array
+import io
+import mmap
+import os
+import re
+import shutil
+import sys
+
+import CompressedIO as cio
+import SwissProtScanner as sps
+
+# Version of the index format:
+INDEX_VERSION = '1'
+
+# Name of the index directory in the workspace:
+INDEX_DIRNAME = 'sprot_index'
+
+# The AC and OX lines of an entry:
+_AC_RE = re.compile(rb'\nAC   ([^\n]*)')
+_OX_RE = re.compile(rb'\nOX   ([^\n]*)')
+
+def index_dirname(sprot_fname):
+    """
+    This method returns the name of the index directory of sprot_fname.
+    """
+    return sprot_fname + '.acidx'
+
+def workspace_index_dirname(sprot_fname, work_dir):
+    """
+    This method returns the name of the index directory of sprot_fname in
+    the directory INDEX_DIRNAME of the workspace work_dir. The index of a
+    file of the same name in another directory is replaced by it, as
+    load_index checks the path of the indexed file.
+    """
+    return work_dir + '/' + INDEX_DIRNAME + '/' + \
+           os.path.basename(sprot_fname) + '.acidx'
+
+def _source_stamp(sprot_fname):
+    """
+    Returns the size and the modification time (in nanoseconds) of the
+    file sprot_fname as strings (PRIVATE).
+    """
+    st = os.stat(sprot_fname)
+    return str(st.st_size), str(st.st_mtime_ns)
+
+def _read_meta(index_dir):
+    """
+    Returns the meta data of an index as a dictionary, or None if the
+    index directory has no meta data file (PRIVATE).
+    """
+    meta_fname = index_dir + '/meta'
+    if not os.path.exists(meta_fname):
+        return None
+    meta = {}
+    with open(meta_fname, 'r') as meta_fh:
+        for inline in meta_fh:
+            key, value = inline.rstrip('\n').split('\t', 1)
+            meta[key] = value
+    return meta
+
+def _entry_index(entry):
+    """
+    Returns the accessions and the taxonomy ids (as a string of ids
+    separated by ',') of the entry entry (bytes), read from its AC and
+    OX lines in the same way as SwissProtScanner.parse does (PRIVATE).
+    """
+    accessions = []
+    for value in _AC_RE.findall(entry):
+        accessions.extend(value.decode().rstrip().rstrip(';').split('; '))
+    taxon_ids = []
+    for value in _OX_RE.findall(entry):
+        ids = value.decode().split('{')[0].rstrip().rstrip(';')
+        if not taxon_ids:
+            ids = ids.split('=', 1)[-1]
+        taxon_ids.extend(ids.split(', '))
+    return accessions, ','.join(taxon_ids)
+
+def _scan_entries(sprot_fname):
+    """
+    Reads the UniProtKB/SwissProt file sprot_fname in blocks and yields
+    the byte offset, the length and the bytes of every entry. The length
+    includes the '//' line of the entry (PRIVATE).
+    """
+    offset = 0
+    pending = b''
+    with open(sprot_fname, 'rb') as fh:
+        block = fh.read(cio.READ_BUFFER_SIZE)
+        while block:
+            data = pending + block
+            # Every entry ends with a '//' line:
+            cut = data.rfind(b'\n//\n')
+            if cut < 0:
+                pending = data
+            else:
+                pending = data[cut + 4:]
+                for entry in data[:cut].split(b'\n//\n'):
+                    yield offset, len(entry) + 4, entry
+                    offset += len(entry) + 4
+            block = fh.read(cio.READ_BUFFER_SIZE)
+    # The last '//' line may have no newline:
+    if pending.rstrip(b'\n').endswith(b'\n//'):
+        yield offset, len(pending), pending.rstrip(b'\n')[:-3]
+    elif pending.strip():
+        raise ValueError('Unexpected end of file in entry: ' +
+                         pending[:80].decode())
+
+def build_index(sprot_fname, index_dir=None):
+    """
+    This method scans the UniProtKB/SwissProt file sprot_fname and writes
+    its index to the directory index_dir (default:
+    index_dirname(sprot_fname)). Only the AC and OX lines of the entries
+    are read. The index is written to a temporary directory first, so an
+    interrupted run never leaves an incomplete index behind. If the index
+    cannot be written, it is only returned.
+    """
+    if cio.compression_type(sprot_fname):
+        raise ValueError(sprot_fname + ' is a compressed file. ' + \
+                         'Only an uncompressed file can be indexed.')
+    if index_dir is None:
+        index_dir = index_dirname(sprot_fname)
+    size, mtime = _source_stamp(sprot_fname)
+    accessions = []
+    taxa = []
+    # Per accession, the entry number and the number of its primary
+    # accession; per entry, the offset and the length:
+    ac_entries = array.array('i')
+    ac_primaries = array.array('i')
+    offsets = array.array('q')
+    lengths = array.array('i')
+    for offset, length, entry in _scan_entries(sprot_fname):
+        entry_accessions, entry_taxa = _entry_index(entry)
+        entry_num = len(offsets)
+        primary_num = len(accessions)
+        offsets.append(offset)
+        lengths.append(length)
+        taxa.append(entry_taxa)
+        accessions.extend(entry_accessions)
+        for ac in entry_accessions:
+            ac_entries.append(entry_num)
+            ac_primaries.append(primary_num)
+    arrays = {'accessions': accessions, 'taxa': taxa,
+              'ac_entries': ac_entries, 'ac_primaries': ac_primaries,
+              'offsets': offsets, 'lengths': lengths}
+
+    tmp_dir = index_dir + '.tmp' + str(os.getpid())
+    try:
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+        for name in ['accessions', 'taxa']:
+            with open(tmp_dir + '/' + name, 'w') as strings_fh:
+                strings_fh.write('\n'.join(arrays[name]))
+        for name in ['ac_entries', 'ac_primaries', 'offsets', 'lengths']:
+            with open(tmp_dir + '/' + name, 'wb') as array_fh:
+                arrays[name].tofile(array_fh)
+        with open(tmp_dir + '/meta', 'w') as meta_fh:
+            for key, value in [('byteorder', sys.byteorder),
+                               ('entries', str(len(offsets))),
+                               ('mtime', mtime),
+                               ('size', size),
+                               ('source', os.path.abspath(sprot_fname)),
+                               ('version', INDEX_VERSION)]:
+                meta_fh.write(key + '\t' + value + '\n')
+        if os.path.exists(index_dir):
+            shutil.rmtree(index_dir)
+        os.rename(tmp_dir, index_dir)
+    except OSError as err:
+        # A read-only directory: the index is kept in memory only.
+        sys.stderr.write('Cannot write the index ' + index_dir + ': ' +
+                         str(err) + '\n')
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return SprotIndex(sprot_fname, index_dir, arrays)
+
+def _read_strings(fname, count):
+    """
+    Returns the list of count strings in the string table fname
+    (PRIVATE).
+    """
+    if count == 0:
+        return []
+    with open(fname, 'r') as strings_fh:
+        return strings_fh.read().split('\n')
+
+def _read_array(fname, typecode):
+    """
+    Returns the binary file fname as an array of typecode items
+    (PRIVATE).
+    """
+    values = array.array(typecode)
+    with open(fname, 'rb') as array_fh:
+        values.frombytes(array_fh.read())
+    return values
+
+def load_index(sprot_fname, index_dir=None):
+    """
+    This method reads the index directory index_dir (default:
+    index_dirname(sprot_fname)) and returns the SprotIndex. It returns
+    None, if the index directory does not exist, if it is the index of
+    another file, or if sprot_fname has a different size or modification
+    time than when the index was built.
+    """
+    if index_dir is None:
+        index_dir = index_dirname(sprot_fname)
+    meta = _read_meta(index_dir)
+    if meta is None or meta.get('version') != INDEX_VERSION or \
+       meta.get('byteorder') != sys.byteorder or \
+       meta.get('source', os.path.abspath(sprot_fname)) != \
+       os.path.abspath(sprot_fname) or \
+       (meta.get('size'), meta.get('mtime')) != _source_stamp(sprot_fname):
+        return None
+    arrays = {}
+    for name, typecode in [('ac_entries', 'i'), ('ac_primaries', 'i'),
+                           ('offsets', 'q'), ('lengths', 'i')]:
+        arrays[name] = _read_array(index_dir + '/' + name, typecode)
+    arrays['accessions'] = _read_strings(index_dir + '/accessions',
+                                         len(arrays['ac_entries']))
+    arrays['taxa'] = _read_strings(index_dir + '/taxa',
+                                   len(arrays['offsets']))
+    return SprotIndex(sprot_fname, index_dir, arrays)
+
+def get_index(sprot_fname, index_dir=None):
+    """
+    This method returns the SprotIndex of sprot_fname, from the index
+    directory if it is up to date, otherwise by building a new index.
+    """
+    index = load_index(sprot_fname, index_dir)
+    if index is None:
+        sys.stderr.write('Indexing ' + os.path.basename(sprot_fname) +
+                         ' ...\n')
+        index = build_index(sprot_fname, index_dir)
+    return index
+
+class SprotIndex(object):
+    """
+    An indexed UniProtKB/SwissProt file. arrays holds the index as read
+    by load_index or built by build_index. The file sprot_fname is
+    memory-mapped when the first entry is read.
+    """
+    def __init__(self, sprot_fname, index_dir, arrays):
+        self.sprot_fname = sprot_fname
+        self.index_dir = index_dir
+        self._accessions = arrays['accessions']
+        self._taxa = arrays['taxa']
+        self._ac_entries = arrays['ac_entries']
+        self._ac_primaries = arrays['ac_primaries']
+        self._offsets = arrays['offsets']
+        self._lengths = arrays['lengths']
+        self._ac_nums = None
+        self._fh = None
+        self._mm = None
+
+    def _ac_num(self, accession):
+        if self._ac_nums is None:
+            # The dictionary is built in C; a secondary accession of
+            # several entries keeps the last one, as in accession_map:
+            self._ac_nums = dict(zip(self._accessions,
+                                     range(len(self._accessions))))
+        return self._ac_nums.get(accession)
+
+    def __contains__(self, accession):
+        return self._ac_num(accession) is not None
+
+    def accessions(self):
+        return list(self._accessions)
+
+    def accession_map(self):
+        """
+        Returns a dictionary that maps every accession to the primary
+        accession of its entry.
+        """
+        return dict(zip(self._accessions,
+                        map(self._accessions.__getitem__,
+                            self._ac_primaries)))
+
+    def lookup(self, accession):
+        """
+        Returns the tuple (offset, length, primary accession, taxonomy
+        ids) of the entry of accession, or None.
+        """
+        ac_num = self._ac_num(accession)
+        if ac_num is None:
+            return None
+        entry_num = self._ac_entries[ac_num]
+        return (self._offsets[entry_num], self._lengths[entry_num],
+                self._accessions[self._ac_primaries[ac_num]],
+                tuple(self._taxa[entry_num].split(',')))
+
+    def primary_accession(self, accession):
+        ac_num = self._ac_num(accession)
+        if ac_num is None:
+            return None
+        return self._accessions[self._ac_primaries[ac_num]]
+
+    def taxon_ids(self, accession):
+        ac_num = self._ac_num(accession)
+        if ac_num is None:
+            return None
+        return tuple(self._taxa[self._ac_entries[ac_num]].split(','))
+
+    def record(self, accession):
+        """
+        Returns the entry of accession as a SwissProtScanner.SprotRecord,
+        or None.
+        """
+        entry = self.lookup(accession)
+        if entry is None:
+            return None
+        offset, length = entry[:2]
+        if self._mm is None:
+            self._fh = open(self.sprot_fname, 'rb')
+            self._mm = mmap.mmap(self._fh.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+        text = self._mm[offset:offset + length].decode()
+        return next(sps.parse(io.StringIO(text)))
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+if __name__ == '__main__':
+    print (sys.argv[0] + ':')
+    print (__doc__)
+    sys.exit(0)
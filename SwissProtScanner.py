@@ -0,0 +1,364 @@
+#!/usr/bin/env python
+'''
+    This module has the following methods to read UniProtKB/SwissProt
+    files. Instead of parsing every line of an entry, as
+    Bio.SwissProt.parse does, it splits the file into entries at the '//'
+    lines and keeps only the line types the tools use: ID, AC, DT, GN,
+    OX, RN, RX, DR and the sequence lines. Every other line type
+    (comments, features, keywords, authors, ...) is skipped without being
+    looked at.
+
+    SprotRecord
+        Slotted record class for a UniProtKB/SwissProt entry. Its
+        attributes have the same names and values as those of a
+        Bio.SwissProt.Record, so the records can be used in place of
+        Biopython records by the tools:
+
+            entry_name         entry name (string), e.g. 'DBP5_YEAST'
+            accessions         list of accessions, primary accession first
+            created            tuple (date, version) of the creation date
+            sequence_update    tuple (date, version) of the last sequence
+                               update
+            annotation_update  tuple (date, version) of the last annotation
+                               update
+            gene_name          the GN lines (string), joined with spaces
+            taxonomy_id        list of NCBI taxonomy ids (strings)
+            references         list of SprotReference objects
+            cross_references   list of tuples of the DR lines, e.g.
+                               ('GO', 'GO:0005634', 'C:nucleus', 'IDA:SGD')
+            sequence           the amino acid sequence (string)
+
+    SprotReference
+        Slotted class for a reference (RN line) of an entry. Its only
+        attribute, references, is the list of (database, identifier)
+        tuples of the RX lines, e.g. ('PubMed', '9603189').
+
+    parse(handle, taxon_id=None):
+        This method reads the UniProtKB/SwissProt file handle and returns
+        an iterator over its entries as SprotRecord objects. It raises a
+        ValueError if the file is not in UniProtKB/SwissProt format.
+        If taxon_id is given, the iterator has only the entries of the
+        taxonomy id taxon_id. The entries of other taxonomy ids are
+        skipped after a search of their OX lines, without being parsed.
+
+    chunk_ranges(fname, chunk_size=CHUNK_SIZE):
+        This method returns a list of (start, end) byte ranges that cover
+        the UniProtKB/SwissProt file fname. Every range starts at the ID
+        line of an entry and ends after the '//' line of an entry (or at
+        the end of the file).
+
+    parallel_parse(handle, taxon_id=None, convert=None, jobs=None,
+                   chunk_size=CHUNK_SIZE):
+        This method iterates over the entries of the UniProtKB/SwissProt
+        file handle, parsed on jobs worker processes (default: the number
+        of CPUs), and yields convert(rec) (or rec, if convert is None) for
+        every entry rec, in the order of the entries in the file. taxon_id
+        is as for parse. convert is run in the worker processes, so only
+        its values are sent back to the calling process. A compressed
+        file, a handle without a file name, or jobs=1 is parsed in the
+        calling process, with the same results. As for
+        ParallelGAF.parallel_gaf, the worker processes are always started
+        by fork, so convert can be any callable; on a platform without
+        fork, the file is parsed in the calling process.
+'''
+import io
+import os
+import re
+import sys
+
+import CompressedIO as cio
+import ParallelGAF as pg
+
+# Number of characters read from the file at a time:
+BLOCK_SIZE = 1 << 20
+
+# Approximate size of the chunks handed to the worker processes:
+CHUNK_SIZE = 16 * 1024 * 1024
+
+# The lines that are read after the ID line; the lines of all other types
+# are skipped:
+_LINE_RE = re.compile(r'\n(AC|DT|GN|OX|RN|RX|DR)   ([^\n]*)')
+
+class SprotReference(object):
+    __slots__ = ('references',)
+
+    def __init__(self):
+        self.references = []
+
+class SprotRecord(object):
+    __slots__ = ('entry_name', 'accessions', 'created', 'sequence_update',
+                 'annotation_update', 'gene_name', 'taxonomy_id',
+                 'references', 'cross_references', 'sequence')
+
+    def __init__(self, entry_name):
+        self.entry_name = entry_name
+        self.accessions = []
+        self.created = None
+        self.sequence_update = None
+        self.annotation_update = None
+        self.gene_name = ''
+        self.taxonomy_id = []
+        self.references = []
+        self.cross_references = []
+        self.sequence = ''
+
+def _read_dt(rec, value):
+    """
+    Sets the creation or update date of rec from the DT line value, in
+    the same way as Bio.SwissProt does for the current and the old style
+    DT lines (PRIVATE).
+    """
+    cols = value.split()
+    uprvalue = value.upper()
+    if 'INTEGRATED' in uprvalue or 'SEQUENCE VERSION' in uprvalue or \
+       'ENTRY VERSION' in uprvalue:
+        # Current style, e.g. 'DT   01-APR-2004, entry version 14.':
+        version = 0
+        for s in cols[-1].split('.'):
+            if s.isdigit():
+                version = int(s)
+        date = cols[0].rstrip(',')
+        if 'INTEGRATED' in uprvalue:
+            rec.created = date, version
+        elif 'SEQUENCE VERSION' in uprvalue:
+            rec.sequence_update = date, version
+        else:
+            rec.annotation_update = date, version
+    elif 'CREATED' in uprvalue or 'LAST SEQUENCE UPDATE' in uprvalue or \
+         'LAST ANNOTATION UPDATE' in uprvalue:
+        # Old style, e.g. 'DT   01-FEB-1995 (Rel. 31, Created)':
+        rel_index = -1
+        for index, col in enumerate(uprvalue.split()):
+            if 'REL.' in col:
+                rel_index = index
+        if rel_index < 0:
+            raise ValueError('Could not find Rel. in DT line: ' + value)
+        str_version = cols[rel_index + 1].rstrip(',')
+        if str_version == '':
+            version = 0
+        elif '.' in str_version:
+            version = str_version
+        else:
+            version = int(str_version)
+        date = cols[0]
+        if 'CREATED' in uprvalue:
+            rec.created = date, version
+        elif 'LAST SEQUENCE UPDATE' in uprvalue:
+            rec.sequence_update = date, version
+        else:
+            rec.annotation_update = date, version
+    else:
+        raise ValueError('Failed to parse DT line: ' + value)
+
+def _read_rx(reference, value):
+    """
+    Appends the (database, identifier) tuples of the RX line value to the
+    reference, in the same way as Bio.SwissProt does (PRIVATE).
+    """
+    value = value.replace(' [NCBI, ExPASy, Israel, Japan]', '')
+    if '=' in value:
+        # e.g. 'RX   PubMed=15060122; DOI=10.1136/jmg.2003.012781;':
+        for col in value.split('; '):
+            col = col.strip()
+            if not col:
+                continue
+            x = col.split('=')
+            if len(x) != 2:
+                break
+            reference.references.append((x[0], x[1].rstrip(';')))
+    else:
+        # e.g. 'RX   MEDLINE; 85132727.':
+        cols = value.split('; ')
+        if len(cols) == 2:
+            reference.references.append((cols[0].rstrip(';'),
+                                         cols[1].rstrip('.')))
+
+def _read_entry(entry):
+    """
+    Returns the SprotRecord of the entry text entry (the lines of an
+    entry without its '//' line) (PRIVATE).
+    """
+    if not entry.startswith('ID   '):
+        raise ValueError('Failed to find ID in entry: ' + entry[:80])
+    rec = SprotRecord(entry[5:].split(None, 1)[0])
+    for key, value in _LINE_RE.findall(entry):
+        value = value.rstrip()
+        if key == 'DR':
+            rec.cross_references.append(tuple(value.rstrip('.').split('; ')))
+        elif key == 'AC':
+            rec.accessions.extend(value.rstrip(';').split('; '))
+        elif key == 'RX':
+            _read_rx(rec.references[-1], value)
+        elif key == 'RN':
+            rec.references.append(SprotReference())
+        elif key == 'DT':
+            _read_dt(rec, value)
+        elif key == 'GN':
+            if rec.gene_name:
+                rec.gene_name += ' '
+            rec.gene_name += value
+        elif key == 'OX':
+            # The evidence codes of the OX line are ignored, e.g.
+            # 'OX   NCBI_TaxID=418404 {ECO:0000313|EMBL:AEX14553.1};':
+            ids = value.split('{')[0].rstrip().rstrip(';')
+            if not rec.taxonomy_id:
+                descr, ids = ids.split('=')
+                if descr != 'NCBI_TaxID':
+                    raise ValueError('Unexpected taxonomy type ' + descr)
+            rec.taxonomy_id.extend(ids.split(', '))
+    # The sequence lines follow the SQ line:
+    sq_start = entry.find('\nSQ   ')
+    if sq_start >= 0:
+        seq_start = entry.find('\n', sq_start + 1)
+        if seq_start >= 0:
+            rec.sequence = ''.join(entry[seq_start:].split())
+    return rec
+
+def _entry_blocks(handle, block_size):
+    """
+    Reads the UniProtKB/SwissProt file handle in blocks of block_size
+    characters and yields strings of complete entries. The entries of a
+    string are separated by their '//' lines; the '//' line of the last
+    entry is left out (PRIVATE).
+    """
+    block = handle.read(block_size)
+    # A file in another format is rejected before more of it is read:
+    if block and not block.lstrip('\n').startswith('ID   '):
+        raise ValueError('Failed to find ID in line: ' +
+                         block.lstrip('\n').split('\n', 1)[0])
+    pending = ''
+    while block:
+        data = pending + block
+        # Every entry ends with a '//' line:
+        cut = data.rfind('\n//\n')
+        if cut < 0:
+            pending = data
+        else:
+            pending = data[cut + 4:]
+            yield data[:cut]
+        block = handle.read(block_size)
+    # The last '//' line may have no newline:
+    pending = pending.strip('\n')
+    if pending.endswith('\n//'):
+        yield pending[:-3]
+    elif pending.strip():
+        raise ValueError('Unexpected end of file in entry: ' + pending[:80])
+
+def _taxon_entries(entries, taxon_id):
+    """
+    Yields the entries of the string entries (as from _entry_blocks)
+    that have an OX line with the taxonomy id taxon_id. Only the OX lines
+    are searched; an entry is cut out of entries when it matches
+    (PRIVATE).
+    """
+    ox_re = re.compile(r'\nOX   [^\n]*(?<![0-9])' + re.escape(taxon_id) +
+                       r'(?![0-9])')
+    entry_end = -1
+    for match in ox_re.finditer(entries):
+        if match.start() < entry_end:
+            # Another OX line of the entry that was already yielded:
+            continue
+        entry_start = entries.rfind('\n//\n', 0, match.start())
+        entry_start = 0 if entry_start < 0 else entry_start + 4
+        entry_end = entries.find('\n//\n', match.start())
+        if entry_end < 0:
+            entry_end = len(entries)
+        yield entries[entry_start:entry_end]
+
+def parse(handle, taxon_id=None, block_size=BLOCK_SIZE):
+    """
+    This method reads the UniProtKB/SwissProt file handle in blocks of
+    block_size characters and yields one SprotRecord for every entry of
+    the file. Only the line types the tools use are read; the others are
+    skipped. If taxon_id is given, only the entries whose taxonomy_id
+    has taxon_id are read and yielded: the other entries are skipped
+    after a search of their OX lines.
+    """
+    for entries in _entry_blocks(handle, block_size):
+        if taxon_id is None:
+            entry_iter = entries.split('\n//\n')
+        else:
+            entry_iter = _taxon_entries(entries, taxon_id)
+        for entry in entry_iter:
+            rec = _read_entry(entry.lstrip('\n'))
+            # The OX line search may also match taxonomy ids in evidence
+            # codes:
+            if taxon_id is None or taxon_id in rec.taxonomy_id:
+                yield rec
+
+def chunk_ranges(fname, chunk_size=CHUNK_SIZE):
+    """
+    This method cuts the UniProtKB/SwissProt file fname into byte ranges
+    of about chunk_size bytes that end after a '//' line, and returns them
+    as a list of (start, end).
+    """
+    size = os.path.getsize(fname)
+    ranges = []
+    start = 0
+    with open(fname, 'rb') as fh:
+        while start < size:
+            fh.seek(min(start + chunk_size, size))
+            if fh.tell() < size:
+                # Extend the chunk up to the end of the current entry:
+                fh.readline()
+                for inline in iter(fh.readline, b''):
+                    if inline.rstrip() == b'//':
+                        break
+            end = fh.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+# State of a worker process, set once by _init_worker:
+_worker = {}
+
+def _init_worker(fname, taxon_id, convert):
+    """
+    Initializes a worker process of the pool (PRIVATE).
+    """
+    _worker['fh'] = open(fname, 'rb')
+    _worker['args'] = (taxon_id, convert)
+
+def _parse_chunk(chunk):
+    """
+    Parses the byte range chunk of the file in a worker process and
+    returns the converted values of its entries (PRIVATE).
+    """
+    start, end = chunk
+    taxon_id, convert = _worker['args']
+    fh = _worker['fh']
+    fh.seek(start)
+    recs = parse(io.StringIO(fh.read(end - start).decode(), newline='\n'),
+                 taxon_id)
+    if convert is None:
+        return list(recs)
+    return [convert(rec) for rec in recs]
+
+def parallel_parse(handle, taxon_id=None, convert=None, jobs=None,
+                   chunk_size=CHUNK_SIZE):
+    """
+    This method parses the UniProtKB/SwissProt file handle on jobs worker
+    processes and yields convert(rec) for every entry rec of taxon_id (or
+    of all taxonomy ids, if taxon_id is None), in the order of the file.
+    The worker processes read the file by the name of handle.
+    """
+    fname = getattr(handle, 'name', None)
+    jobs = jobs or os.cpu_count() or 1
+    context = pg.fork_context()
+    if jobs == 1 or context is None or not isinstance(fname, str) or \
+       not os.path.isfile(fname) or cio.compression_type(fname):
+        # A compressed file cannot be cut into chunks, and the workers
+        # need fork to inherit convert:
+        for rec in parse(handle, taxon_id):
+            yield rec if convert is None else convert(rec)
+        return
+    chunks = chunk_ranges(fname, chunk_size)
+    with context.Pool(jobs, _init_worker, (fname, taxon_id, convert)) as pool:
+        for values in pool.imap(_parse_chunk, chunks):
+            for value in values:
+                yield value
+
+if __name__ == '__main__':
+    print (sys.argv[0] + ':')
+    print (__doc__)
+    sys.exit(0)
@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+'''
+    This module has the following methods to generate synthetic, but
+    well-formed, input files for the tools, so that they can be run and
+    timed on inputs of any size without downloading anything: a pair of
+    UniProt-GOA files at the time points t1 and t2 (GAF 1.0 or 2.0), a
+    matching UniProtKB/SwissProt file and a names.dmp taxonomy file. The
+    files are written one protein at a time, so their size is only
+    limited by the disk, and they are fully determined by the seed: the
+    same arguments always give the same files. A file name ending with
+    .gz gives a gzip compressed file.
+
+    protein_id(prot_num):
+        This method returns the DB_Object_ID of the synthetic protein
+        number prot_num.
+
+    protein_taxon(prot_num, taxon_mix=TAXON_MIX, seed=SEED):
+        This method returns the taxon (an entry of taxon_mix) of the
+        protein number prot_num. The taxa are distributed over the
+        proteins according to the weights of taxon_mix.
+
+    goa_proteins(n_proteins, seed=SEED, terms_per_protein=TERMS_PER_PROTEIN,
+                 evidence_mix=EVIDENCE_MIX, gain_fraction=GAIN_FRACTION):
+        This method yields the annotations of a pair of UniProt-GOA files
+        at the time points t1 and t2, one protein at a time. At t2, a
+        fraction gain_fraction of the proteins has gained annotations
+        with experimental evidence.
+
+    write_goa_pair(t1_fname, t2_fname, n_records, seed=SEED,
+                   terms_per_protein=TERMS_PER_PROTEIN, n_proteins=None,
+                   evidence_mix=EVIDENCE_MIX, taxon_mix=TAXON_MIX,
+                   gain_fraction=GAIN_FRACTION, gaf_version='2.0'):
+        This method writes a pair of UniProt-GOA files with about
+        n_records annotation lines (or n_proteins proteins) at t1.
+
+    write_sprot(fname, n_proteins, seed=SEED, taxon_mix=TAXON_MIX,
+                extra_fraction=EXTRA_FRACTION):
+        This method writes a UniProtKB/SwissProt file with an entry for
+        every protein of the UniProt-GOA files, plus extra_fraction as
+        many proteins that are not in the UniProt-GOA files.
+
+    write_names_dmp(fname, taxon_mix=TAXON_MIX):
+        This method writes an NCBI taxonomy names.dmp file with the
+        scientific names of the taxa of taxon_mix.
+
+    write_dataset(out_dir, n_records, ...):
+        This method writes all of the above files to the directory
+        out_dir.
+
+    If this module is run with arguments, it writes a data set (run it
+    with -h for the arguments), e.g. for 10 million annotation lines:
+
+        python SyntheticData.py -o synthetic -n 10000000 \\
+            --evidence IEA:70,EXP:10,IDA:20 --taxa 559292:80,9606:20
+'''
+import argparse
+import bisect
+import os
+import random
+import sys
+
+import CompressedIO as cio
+
+# Default seed of the random number generator:
+SEED = 2014
+
+# Default number of annotations per protein:
+TERMS_PER_PROTEIN = 5
+
+# Default taxon (yeast, as in the examples of the README):
+TAXON_ID = '559292'
+
+# Taxa of the proteins: (taxon ID, scientific name, UniProt mnemonic,
+# weight):
+TAXON_MIX = [(TAXON_ID, 'Saccharomyces cerevisiae S288c', 'YEAST', 100)]
+
+# Evidence codes and their weights in the annotations at t1:
+EVIDENCE_MIX = [('IEA', 70), ('EXP', 5), ('IDA', 10), ('IPI', 5),
+                ('IMP', 5), ('IGI', 2), ('IEP', 1), ('ISS', 2)]
+
+# Experimental evidence codes of the annotations gained at t2:
+EXP_CODES = ['EXP', 'IDA', 'IPI', 'IMP', 'IGI', 'IEP']
+
+# Fraction of the proteins that gain experimental annotations at t2:
+GAIN_FRACTION = 0.1
+
+# Number of UniProtKB/SwissProt entries without UniProt-GOA annotations,
+# relative to the number of proteins in the UniProt-GOA files:
+EXTRA_FRACTION = 1.0
+
+# Number of different GO terms used in the annotations:
+GO_TERMS = 40000
+
+# Scientific names and UniProt mnemonics of some well known taxa, used
+# for the taxa given on the command line:
+KNOWN_TAXA = {'559292' : ('Saccharomyces cerevisiae S288c', 'YEAST'),
+              '9606' : ('Homo sapiens', 'HUMAN'),
+              '10090' : ('Mus musculus', 'MOUSE'),
+              '10116' : ('Rattus norvegicus', 'RAT'),
+              '3702' : ('Arabidopsis thaliana', 'ARATH'),
+              '7227' : ('Drosophila melanogaster', 'DROME'),
+              '6239' : ('Caenorhabditis elegans', 'CAEEL'),
+              '83333' : ('Escherichia coli K-12', 'ECOLI')}
+
+def protein_id(prot_num):
+    """
+    This method returns the DB_Object_ID of the protein number prot_num.
+    The IDs sort in the order of the protein numbers.
+    """
+    return 'S%08d' % prot_num
+
+def _cum_weights(mix):
+    """
+    Returns the cumulative weights of mix, a list whose entries end with
+    a weight (PRIVATE).
+    """
+    cum_weights = []
+    total = 0
+    for entry in mix:
+        total += entry[-1]
+        cum_weights.append(total)
+    return cum_weights
+
+def protein_taxon(prot_num, taxon_mix=TAXON_MIX, seed=SEED):
+    """
+    This method returns the entry of taxon_mix for the protein number
+    prot_num. The taxon depends only on prot_num and seed, so the
+    UniProt-GOA and the UniProtKB/SwissProt files agree on it.
+    """
+    if len(taxon_mix) == 1:
+        return taxon_mix[0]
+    cum_weights = _cum_weights(taxon_mix)
+    # A multiplicative hash spreads the protein numbers over [0, 1):
+    point = ((prot_num * 2654435761 + seed) % 4294967296) / 4294967296.0
+    return taxon_mix[bisect.bisect(cum_weights, point * cum_weights[-1])]
+
+def _weighted(rng, mix):
+    """
+    Returns a function that draws a value of mix, a list of (value,
+    weight) pairs, with the random number generator rng (PRIVATE).
+    """
+    values = [entry[0] for entry in mix]
+    cum_weights = _cum_weights(mix)
+    total = cum_weights[-1]
+    rand = rng.random
+    return lambda: values[bisect.bisect(cum_weights, rand() * total)]
+
+def _annotation(rng, evidence, n_papers):
+    """
+    Returns a random annotation with the evidence code evidence as a tuple
+    (GO ID, Aspect, PubMed ID, evidence) (PRIVATE).
+    """
+    return ('GO:%07d' % rng.randint(1, GO_TERMS), rng.choice('PCF'),
+            str(rng.randint(1, n_papers)), evidence)
+
+def goa_proteins(n_proteins, seed=SEED, terms_per_protein=TERMS_PER_PROTEIN,
+                 evidence_mix=EVIDENCE_MIX, gain_fraction=GAIN_FRACTION):
+    """
+    This method yields, for every one of n_proteins proteins, a tuple
+    (protein number, annotations at t1, annotations gained at t2). Each
+    annotation is a tuple (GO ID, Aspect, PubMed ID, evidence). The t1
+    evidence codes are drawn from evidence_mix, and gain_fraction of the
+    proteins gain one or two annotations with experimental evidence.
+    """
+    rng = random.Random(seed)
+    n_papers = max(1, n_proteins * terms_per_protein // 20)
+    evidence = _weighted(rng, evidence_mix)
+    for prot_num in range(n_proteins):
+        t1_anns = [_annotation(rng, evidence(), n_papers)
+                   for k in range(terms_per_protein)]
+        gained = []
+        if rng.random() < gain_fraction:
+            gained = [_annotation(rng, rng.choice(EXP_CODES), n_papers)
+                      for k in range(rng.randint(1, 2))]
+        yield prot_num, t1_anns, gained
+
+def _gaf_line(ann, prot_num, prot_id, taxon_id=TAXON_ID, gaf_version='2.0'):
+    """
+    Returns the GAF 2.0 (or 1.0) line of the annotation ann of the
+    protein prot_id (PRIVATE).
+    """
+    go_id, aspect, pubmed_id, evidence = ann
+    cols = ['UniProtKB', prot_id, 'SYM%d' % prot_num, '', go_id,
+            'PMID:' + pubmed_id, evidence, '', aspect,
+            'Protein %d' % prot_num, 'SYM%d' % prot_num, 'protein',
+            'taxon:' + taxon_id, '20140101', 'UniProt']
+    if gaf_version == '2.0':
+        # Annotation_Extension and Gene_Product_Form_ID:
+        cols.extend(['', ''])
+    return '\t'.join(cols) + '\n'
+
+def write_goa_pair(t1_fname, t2_fname, n_records, seed=SEED,
+                   terms_per_protein=TERMS_PER_PROTEIN, n_proteins=None,
+                   evidence_mix=EVIDENCE_MIX, taxon_mix=TAXON_MIX,
+                   gain_fraction=GAIN_FRACTION, gaf_version='2.0'):
+    """
+    This method writes a pair of UniProt-GOA files in GAF gaf_version
+    ('2.0' or '1.0') format (see goa_proteins) to the files t1_fname and
+    t2_fname, one protein at a time, and returns the number of proteins.
+    The number of proteins is n_proteins or, if that is None, n_records
+    divided by terms_per_protein. The files are sorted by protein.
+    """
+    if n_proteins is None:
+        n_proteins = max(1, n_records // terms_per_protein)
+    header = '!gaf-version: ' + gaf_version + '\n'
+    with cio.open_output(t1_fname) as t1_handle, \
+         cio.open_output(t2_fname) as t2_handle:
+        t1_handle.write(header)
+        t2_handle.write(header)
+        for prot_num, t1_anns, gained in goa_proteins(n_proteins, seed,
+                                                      terms_per_protein,
+                                                      evidence_mix,
+                                                      gain_fraction):
+            prot_id = protein_id(prot_num)
+            taxon_id = protein_taxon(prot_num, taxon_mix, seed)[0]
+            t1_lines = ''.join([_gaf_line(ann, prot_num, prot_id, taxon_id,
+                                          gaf_version) for ann in t1_anns])
+            t1_handle.write(t1_lines)
+            t2_handle.write(t1_lines)
+            for ann in gained:
+                t2_handle.write(_gaf_line(ann, prot_num, prot_id, taxon_id,
+                                          gaf_version))
+    return n_proteins
+
+def _sprot_entry(rng, prot_id, entry_num, taxon):
+    """
+    Returns the text of a UniProtKB/SwissProt entry of the taxon taxon,
+    an entry of a taxon mix (PRIVATE).
+    """
+    taxon_id, name, mnemonic = taxon[:3]
+    lines = ['ID   SYN%d_%s             Reviewed;         10 AA.' \
+                 % (entry_num, mnemonic),
+             'AC   %s;' % prot_id,
+             'DT   21-JUL-1986, integrated into UniProtKB/Swiss-Prot.',
+             'DT   21-JUL-1986, sequence version 1.',
+             'DT   13-NOV-2013, entry version 100.',
+             'DE   RecName: Full=Protein %d;' % entry_num,
+             'GN   Name=SYN%d;' % entry_num,
+             'OS   %s.' % name,
+             'OC   Eukaryota.',
+             'OX   NCBI_TaxID=%s;' % taxon_id]
+    for k in range(rng.randint(1, 4)):
+        lines.append('DR   GO; GO:%07d; %s:term; %s:SGD.' \
+                     % (rng.randint(1, GO_TERMS), rng.choice('PCF'),
+                        rng.choice(['IDA', 'IEA', 'IMP', 'IPI'])))
+    lines.append('SQ   SEQUENCE   10 AA;  1000 MW;  0000000000000000 CRC64;')
+    lines.append('     MSTNPKPQRK')
+    lines.append('//')
+    return '\n'.join(lines) + '\n'
+
+def write_sprot(fname, n_proteins, seed=SEED, taxon_mix=TAXON_MIX,
+                extra_fraction=EXTRA_FRACTION):
+    """
+    This method writes a UniProtKB/SwissProt file fname with an entry for
+    each of the n_proteins proteins of the UniProt-GOA files (with the
+    same taxa), and about extra_fraction * n_proteins entries of proteins
+    that are not in the UniProt-GOA files, and returns the number of
+    entries.
+    """
+    rng = random.Random(seed)
+    n_entries = 0
+    extra = 0.0
+    with cio.open_output(fname) as fh:
+        for prot_num in range(n_proteins):
+            taxon = protein_taxon(prot_num, taxon_mix, seed)
+            fh.write(_sprot_entry(rng, protein_id(prot_num), n_entries,
+                                  taxon))
+            n_entries += 1
+            extra += extra_fraction
+            while extra >= 1.0:
+                fh.write(_sprot_entry(rng, 'T%08d' % n_entries, n_entries,
+                                      taxon))
+                n_entries += 1
+                extra -= 1.0
+    return n_entries
+
+def write_names_dmp(fname, taxon_mix=TAXON_MIX):
+    """
+    This method writes the scientific names of the taxa of taxon_mix to
+    the file fname in the format of the NCBI taxonomy names.dmp file.
+    """
+    with open(fname, 'w') as fh:
+        for taxon in taxon_mix:
+            fh.write('%s\t|\t%s\t|\t\t|\tscientific name\t|\n' \
+                     % (taxon[0], taxon[1]))
+
+def write_dataset(out_dir, n_records, seed=SEED,
+                  terms_per_protein=TERMS_PER_PROTEIN, n_proteins=None,
+                  evidence_mix=EVIDENCE_MIX, taxon_mix=TAXON_MIX,
+                  gain_fraction=GAIN_FRACTION, gaf_version='2.0',
+                  extra_fraction=EXTRA_FRACTION, suffix=''):
+    """
+    This method writes a UniProt-GOA file pair, a UniProtKB/SwissProt
+    file and a names.dmp file to the directory out_dir and returns a
+    dictionary with their names ('t1', 't2', 'sprot', 'names'). suffix
+    (e.g. '.gz') is added to the names of the large files.
+    """
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    fnames = {'t1' : os.path.join(out_dir, 'gene_association.goa_synthetic.1'
+                                  + suffix),
+              't2' : os.path.join(out_dir, 'gene_association.goa_synthetic.2'
+                                  + suffix),
+              'sprot' : os.path.join(out_dir, 'uniprot_sprot.dat.synthetic'
+                                     + suffix),
+              'names' : os.path.join(out_dir, 'names.dmp')}
+    n_proteins = write_goa_pair(fnames['t1'], fnames['t2'], n_records, seed,
+                                terms_per_protein, n_proteins, evidence_mix,
+                                taxon_mix, gain_fraction, gaf_version)
+    write_sprot(fnames['sprot'], n_proteins, seed, taxon_mix, extra_fraction)
+    write_names_dmp(fnames['names'], taxon_mix)
+    return fnames
+
+def _parse_mix(text):
+    """
+    Parses a mix given as 'value:weight,value:weight' into a list of
+    (value, weight) pairs (PRIVATE).
+    """
+    mix = []
+    for item in text.split(','):
+        value, weight = item.rsplit(':', 1)
+        mix.append((value.strip(), float(weight)))
+    return mix
+
+def _taxon_mix(text):
+    """
+    Parses a taxon mix given as 'taxon:weight,...' (PRIVATE). The names
+    and mnemonics of unknown taxa are made up from their IDs.
+    """
+    taxon_mix = []
+    for taxon_id, weight in _parse_mix(text):
+        name, mnemonic = KNOWN_TAXA.get(taxon_id, ('Taxon ' + taxon_id,
+                                                   'TX' + taxon_id))
+        taxon_mix.append((taxon_id, name, mnemonic, weight))
+    return taxon_mix
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Writes a synthetic data '
+                                     'set for the CAFA Toolset.')
+    parser.add_argument('-o', '--outdir', default='synthetic',
+                        help='Output directory')
+    parser.add_argument('-n', '--records', type=int, default=1000000,
+                        help='Number of annotation lines at t1')
+    parser.add_argument('-p', '--proteins', type=int, default=None,
+                        help='Number of proteins (overrides --records)')
+    parser.add_argument('--terms', type=int, default=TERMS_PER_PROTEIN,
+                        help='Annotations per protein at t1')
+    parser.add_argument('--evidence', default='',
+                        help='Evidence mix at t1, e.g. IEA:70,EXP:10,IDA:20')
+    parser.add_argument('--taxa', default='',
+                        help='Taxon mix, e.g. 559292:80,9606:20')
+    parser.add_argument('--gain', type=float, default=GAIN_FRACTION,
+                        help='Fraction of the proteins that gain '
+                             'experimental annotations at t2')
+    parser.add_argument('--extra', type=float, default=EXTRA_FRACTION,
+                        help='SwissProt-only entries per UniProt-GOA protein')
+    parser.add_argument('--gaf-version', default='2.0',
+                        choices=['1.0', '2.0'], help='GAF version')
+    parser.add_argument('--seed', type=int, default=SEED,
+                        help='Seed of the random number generator')
+    parser.add_argument('-Z', '--compress', action='store_true',
+                        default=False, help='Write gzip compressed files')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    if len(sys.argv) == 1:
+        print (sys.argv[0] + ':')
+        print (__doc__)
+        sys.exit(0)
+    args = parse_args()
+    evidence_mix = EVIDENCE_MIX
+    if args.evidence:
+        evidence_mix = _parse_mix(args.evidence)
+    taxon_mix = TAXON_MIX
+    if args.taxa:
+        taxon_mix = _taxon_mix(args.taxa)
+    fnames = write_dataset(args.outdir, args.records, args.seed, args.terms,
+                           args.proteins, evidence_mix, taxon_mix, args.gain,
+                           args.gaf_version, args.extra,
+                           '.gz' if args.compress else '')
+    for key in ['t1', 't2', 'sprot', 'names']:
+        print(fnames[key])
+    sys.exit(0)
@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+'''
+    The ThroughputSuite program times the hot paths of the parsing and the
+    benchmark creation code on synthetic inputs (see SyntheticData) of
+    several sizes and reports the number of records processed per second.
+    The inputs are generated locally with a fixed seed, so the numbers of
+    two runs on the same machine can be compared.
+
+    How to run this program:
+
+       python ThroughputSuite.py --sizes 100000 1000000 10000000 \\
+                                 --baseline throughput-baseline.json
+
+    --sizes lists the numbers of annotation lines of the t1 UniProt-GOA
+        file (default: 100000 1000000 10000000).
+    --cases selects the timed cases by name (default: all of them).
+    --data-dir is the directory for the generated inputs (default: a
+        temporary directory). The inputs of a size are generated only
+        once per data directory, so a kept data directory saves the
+        generation time of later runs.
+    --baseline is a JSON file with the results of an earlier run. Every
+        result that is more than --tolerance (default: 0.25, i.e. 25%)
+        slower than the baseline is reported as a regression, and the
+        program then exits with status 1.
+    --save writes the results of this run to the --baseline file,
+        together with the machine_info of the machine it ran on.
+
+    throughput-baseline.json is the baseline of the sizes 100000 and
+    1000000, saved on the machine described in its "machine" entry. On
+    another machine, save a baseline of its own first (see README.md):
+    when the machine of a baseline differs from the current one, the
+    comparison is still made, but a warning is printed.
+
+    The timed cases are:
+
+    gafiterator            GOAParser.gafiterator over the t2 file
+    gafbyproteiniterator   GOAParser.gafbyproteiniterator over the t2 file
+    writerec               GOAParser.writerec of the t1 records
+    t1_filter              GOAParser_cafa.t1_filter of the t1 file
+    create_benchmarks      CreateBenchmark.create_benchmarks
+    count_freq             PaperTermFrequency.count_freq of the t2 file
+    appendSprot2goa        AppendSprot2GOA.appendSprot2goa (the rate is
+                           in UniProtKB/SwissProt entries per second)
+'''
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import AppendSprot2GOA as as2g
+import CreateBenchmark as cb
+import GOAParser as GOA
+import GOAParser_cafa as gc
+import PaperTermFrequency as ptf
+import SyntheticData as sd
+
+# Default numbers of t1 annotation lines:
+SIZES = [100000, 1000000, 10000000]
+
+# Experimental evidence codes, as in the default configuration file:
+EXP_EEC = set(['EXP', 'IDA', 'IPI', 'IMP', 'IGI', 'IEP'])
+
+# Number of records written by writerec per timed batch:
+WRITE_BATCH = 100000
+
+def machine_info():
+    """
+    This method returns a dictionary that describes the machine and the
+    Python interpreter the suite runs on: the numbers of a baseline are
+    only comparable on the same machine.
+    """
+    processor = platform.processor()
+    if os.path.exists('/proc/cpuinfo'):
+        with open('/proc/cpuinfo', 'r') as fh:
+            for inline in fh:
+                if inline.startswith('model name'):
+                    processor = inline.split(':', 1)[1].strip()
+                    break
+    memory = 0
+    if os.path.exists('/proc/meminfo'):
+        with open('/proc/meminfo', 'r') as fh:
+            for inline in fh:
+                if inline.startswith('MemTotal:'):
+                    memory = int(inline.split()[1]) * 1024
+                    break
+    return {'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'system': platform.system(),
+            'machine': platform.machine(),
+            'processor': processor,
+            'cpus': os.cpu_count() or 1,
+            'memory': memory}
+
+def count_lines(fname):
+    """
+    This method returns the number of annotation lines of the file fname.
+    """
+    n_lines = 0
+    with open(fname, 'r') as fh:
+        for inline in fh:
+            if inline[0] != '!':
+                n_lines += 1
+    return n_lines
+
+def prepare_data(data_dir, size, seed=sd.SEED):
+    """
+    This method generates the inputs of the given size in a subdirectory
+    of data_dir, unless they are already there, and returns a dictionary
+    with their file names and line counts.
+    """
+    size_dir = os.path.join(data_dir, '%d-%d' % (size, seed))
+    meta_fname = os.path.join(size_dir, 'meta.json')
+    if os.path.exists(meta_fname):
+        with open(meta_fname, 'r') as fh:
+            return json.load(fh)
+    if not os.path.exists(size_dir):
+        os.makedirs(size_dir)
+    data = dict((name, os.path.join(size_dir, name)) for name in
+                ['t1.gaf', 't2.gaf', 'sprot.dat', 't2.exp', 't1.iea',
+                 't1.exp'])
+    print('Generating ' + str(size) + ' annotations in ' + size_dir + ' ...')
+    n_proteins = sd.write_goa_pair(data['t1.gaf'], data['t2.gaf'], size,
+                                   seed)
+    n_entries = sd.write_sprot(data['sprot.dat'], n_proteins, seed)
+    # The intermediate files of Benchmark for t1_filter and
+    # create_benchmarks:
+    with open(data['t2.gaf'], 'r') as t2_handle, \
+         open(data['t2.exp'], 'w') as t2_exp_handle:
+        for rec in GOA.gafiterator(t2_handle, filters={'Evidence': EXP_EEC}):
+            GOA.writerec(rec, t2_exp_handle, GOA.GAF20FIELDS)
+    with open(data['t1.gaf'], 'r') as t1_handle:
+        gc.t1_filter(GOA.gafiterator(t1_handle), data['t1.iea'],
+                     data['t1.exp'], data['t2.exp'], GOA.GAF20FIELDS,
+                     EXP_EEC)
+    for name in ['t1.gaf', 't2.gaf', 't2.exp', 't1.iea', 't1.exp']:
+        data['n_' + name] = count_lines(data[name])
+    data['n_sprot'] = n_entries
+    with open(meta_fname, 'w') as fh:
+        json.dump(data, fh)
+    return data
+
+def _time(func, *args):
+    """
+    Runs func(*args) and returns the elapsed time in seconds (PRIVATE).
+    """
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def time_gafiterator(data, out_dir):
+    def run():
+        with open(data['t2.gaf'], 'r') as fh:
+            for rec in GOA.gafiterator(fh):
+                rec['Evidence']
+    return data['n_t2.gaf'], _time(run)
+
+def time_gafbyproteiniterator(data, out_dir):
+    def run():
+        with open(data['t2.gaf'], 'r') as fh:
+            for recs in GOA.gafbyproteiniterator(fh):
+                recs[0]['Evidence']
+    return data['n_t2.gaf'], _time(run)
+
+def time_writerec(data, out_dir):
+    # Only the writing is timed, not the parsing of the records:
+    elapsed = 0.0
+    with open(data['t1.gaf'], 'r') as fh, \
+         open(os.path.join(out_dir, 'writerec.gaf'), 'w') as out_handle:
+        rec_iter = GOA.gafiterator(fh)
+        while True:
+            batch = [rec for rec, k in zip(rec_iter, range(WRITE_BATCH))]
+            if not batch:
+                break
+            start = time.perf_counter()
+            for rec in batch:
+                GOA.writerec(rec, out_handle, GOA.GAF20FIELDS)
+            elapsed += time.perf_counter() - start
+    return data['n_t1.gaf'], elapsed
+
+def time_t1_filter(data, out_dir):
+    def run():
+        with open(data['t1.gaf'], 'r') as fh:
+            gc.t1_filter(GOA.gafiterator(fh),
+                         os.path.join(out_dir, 't1.iea'),
+                         os.path.join(out_dir, 't1.exp'),
+                         data['t2.exp'], GOA.GAF20FIELDS, EXP_EEC)
+    return data['n_t1.gaf'], _time(run)
+
+def time_create_benchmarks(data, out_dir):
+    def run():
+        bm_names = [os.path.join(out_dir, 'bm_' + bm_type)
+                    for bm_type in ['LK_bpo', 'LK_cco', 'LK_mfo',
+                                    'NK_bpo', 'NK_cco', 'NK_mfo']]
+        bm_handles = [open(bm_name, 'w') for bm_name in bm_names]
+        with open(data['t1.iea'], 'r') as t1_iea_handle, \
+             open(data['t1.exp'], 'r') as t1_exp_handle, \
+             open(data['t2.exp'], 'r') as t2_exp_handle:
+            cb.create_benchmarks(t1_iea_handle, t1_exp_handle,
+                                 t2_exp_handle, *bm_handles)
+        for bm_handle in bm_handles:
+            bm_handle.close()
+    n_records = data['n_t1.iea'] + data['n_t1.exp'] + data['n_t2.exp']
+    return n_records, _time(run)
+
+def time_count_freq(data, out_dir):
+    def run():
+        with open(data['t2.gaf'], 'r') as fh:
+            ptf.count_freq(fh, EXP_EEC)
+    return data['n_t2.gaf'], _time(run)
+
+def time_appendSprot2goa(data, out_dir):
+    def run():
+        with open(data['sprot.dat'], 'r') as fh_sprot, \
+             open(os.path.join(out_dir, 'merged.gaf'), 'w') as fh_merged:
+            as2g.appendSprot2goa(fh_sprot, data['t1.gaf'], sd.TAXON_ID,
+                                 fh_merged)
+    return data['n_sprot'], _time(run)
+
+# The timed cases, in the order they are run:
+CASES = [('gafiterator', time_gafiterator),
+         ('gafbyproteiniterator', time_gafbyproteiniterator),
+         ('writerec', time_writerec),
+         ('t1_filter', time_t1_filter),
+         ('create_benchmarks', time_create_benchmarks),
+         ('count_freq', time_count_freq),
+         ('appendSprot2goa', time_appendSprot2goa)]
+
+def run_suite(sizes, case_names, data_dir, seed=sd.SEED):
+    """
+    This method runs the cases case_names on the inputs of all sizes and
+    returns the results: a dictionary that maps a case name to a
+    dictionary that maps a size (as a string) to the number of records,
+    the elapsed time and the records per second.
+    """
+    results = {}
+    for size in sizes:
+        data = prepare_data(data_dir, size, seed)
+        out_dir = tempfile.mkdtemp(dir=data_dir)
+        try:
+            for name, case in CASES:
+                if name not in case_names:
+                    continue
+                n_records, seconds = case(data, out_dir)
+                rate = n_records / seconds if seconds > 0 else 0.0
+                results.setdefault(name, {})[str(size)] = {
+                    'records': n_records,
+                    'seconds': round(seconds, 3),
+                    'records_per_sec': round(rate, 1)}
+                print('%-22s %10d %12d records %9.2f s %12.0f records/s' \
+                      % (name, size, n_records, seconds, rate))
+                sys.stdout.flush()
+        finally:
+            shutil.rmtree(out_dir)
+    return results
+
+def compare(results, baseline, tolerance):
+    """
+    This method compares the results with the baseline results and
+    returns the list of regressions as strings: the cases that processed
+    fewer than (1 - tolerance) times the records per second of the
+    baseline.
+    """
+    regressions = []
+    for name in results:
+        for size in results[name]:
+            if size not in baseline.get(name, {}):
+                continue
+            old_rate = baseline[name][size]['records_per_sec']
+            new_rate = results[name][size]['records_per_sec']
+            if new_rate < (1.0 - tolerance) * old_rate:
+                regressions.append('%s (%s): %.0f records/s, baseline '
+                                   '%.0f records/s'
+                                   % (name, size, new_rate, old_rate))
+    return regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Times the parsing and '
+                                     'benchmark creation hot paths.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help='Numbers of t1 annotation lines')
+    parser.add_argument('--cases', nargs='+',
+                        default=[name for name, case in CASES],
+                        choices=[name for name, case in CASES],
+                        help='Cases to time')
+    parser.add_argument('--data-dir', default='',
+                        help='Directory for the generated inputs')
+    parser.add_argument('--seed', type=int, default=sd.SEED,
+                        help='Seed of the input generator')
+    parser.add_argument('--baseline', default='',
+                        help='JSON file with baseline results')
+    parser.add_argument('--save', action='store_true', default=False,
+                        help='Write the results to the baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown against the baseline')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    data_dir = args.data_dir
+    if not data_dir:
+        data_dir = tempfile.mkdtemp(prefix='throughput-')
+    elif not os.path.exists(data_dir):
+        os.makedirs(data_dir)
+    try:
+        results = run_suite(args.sizes, set(args.cases), data_dir, args.seed)
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir)
+    exit_code = 0
+    if args.baseline and os.path.exists(args.baseline) and not args.save:
+        with open(args.baseline, 'r') as fh:
+            baseline = json.load(fh)
+        if baseline.get('machine') != machine_info():
+            print('Warning: ' + args.baseline + ' was saved on another '
+                  'machine; its numbers may not be comparable')
+        regressions = compare(results, baseline['results'], args.tolerance)
+        for regression in regressions:
+            print('Regression: ' + regression)
+        if regressions:
+            exit_code = 1
+        else:
+            print('No regression against ' + args.baseline)
+    if args.baseline and args.save:
+        with open(args.baseline, 'w') as fh:
+            json.dump({'machine': machine_info(),
+                       'seed': args.seed,
+                       'results': results}, fh, indent=2, sort_keys=True)
+        print('Results saved in ' + args.baseline)
+    sys.exit(exit_code)
@@ -1,19 +1,34 @@
 import argparse
 from typeguard import typechecked
 
-from Bio.UniProt.GOA import gafiterator, record_has
+from Bio.UniProt.GOA import gafiterator
+
+from CompressedIO import open_input
+from GOAParser import compile_matcher
+from ParallelGAF import parallel_gaf
 
 
 DEFAULT_EXPERIMENTAL_CODES = ["EXP", "IDA", "IPI", "IMP", "IGI", "IEP", "TAS", "IC"]
 
 @typechecked
-def create_annotation_file(uniprot_goa_path: str, exp_evidence_code: list, output_file_name:str):
+def create_annotation_file(uniprot_goa_path: str, exp_evidence_code: list, output_file_name:str, jobs: int = 1):
 
     exp_evidence = {'Evidence': set(exp_evidence_code)}
     with open(output_file_name, "w") as annotation_file:
-        with open(uniprot_goa_path, 'r') as goa_db:
+        if jobs > 1:
+            # The worker processes send back only the two output columns:
+            evidence = exp_evidence['Evidence']
+            for line in parallel_gaf(uniprot_goa_path,
+                                     None,
+                                     lambda rec: rec["DB_Object_ID"] + "\t" + rec["GO_ID"] + "\n",
+                                     jobs=jobs,
+                                     filters={"Evidence": evidence}):
+                annotation_file.write(line)
+            return
+        has_exp_evidence = compile_matcher(exp_evidence)
+        with open_input(uniprot_goa_path) as goa_db:
             for rec in gafiterator(goa_db):
-                if record_has(rec, exp_evidence):
+                if has_exp_evidence(rec):
                     annotation_file.write(rec["DB_Object_ID"] + "\t" + rec["GO_ID"] + "\n")
 
 
@@ -22,7 +37,8 @@ if __name__ == "__main__":
     parser.add_argument(
         "-i",
         "--uniprot-goa-db",
-        help="Path to the UniProt-GOA database (.gaf) to get annotations from",
+        help="Path to the UniProt-GOA database (.gaf, optionally compressed: " \
+            ".gz, .bz2, .xz) to get annotations from",
         required=True,
     )
 
@@ -43,7 +59,16 @@ if __name__ == "__main__":
             "IGI, IEP, TAS, IC.",
     )
 
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes that parse an uncompressed UniProt-GOA " \
+            "database in parallel. Default is 1.",
+    )
+
     args = parser.parse_args()
 
 
-    create_annotation_file(args.uniprot_goa_db, args.evidence, args.output)
+    create_annotation_file(args.uniprot_goa_db, args.evidence, args.output, args.jobs)
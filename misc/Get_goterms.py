@@ -20,7 +20,10 @@ import sys
 import subprocess
 from collections import defaultdict
 
-from Bio import SwissProt as sp
+# SprotIndex is in the directory above misc:
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+import SprotIndex as si
 
 #import Config
 
@@ -36,34 +39,28 @@ class Get_goterms:
         self.tList_fname = self.work_dir + '/' + tList_fname
         self.sprot_fname = self.work_dir + '/' + sprot_fname
 
-    def obtain_taxons(self, protein_dict, fh_sprot): 
-        found = False
-        for rec in sp.parse(fh_sprot):
-            for ac in range(len(rec.accessions)): 
-                if rec.accessions[ac] in protein_dict.keys(): 
-                    # assign rec.taxonomy_id list to the protein 
-                    protein_dict[rec.accessions[ac]] = rec.taxonomy_id 
-                    found = True
-                    break
-            #if found: 
-            #    break 
+    def obtain_taxons(self, protein_dict, sprot_index): 
+        # Only the entries of the proteins are looked up in the
+        # accession index sprot_index:
+        for protName in protein_dict.keys():
+            taxon_ids = sprot_index.taxon_ids(protName)
+            if taxon_ids is not None:
+                # assign the taxonomy id list to the protein 
+                protein_dict[protName] = list(taxon_ids)
         return protein_dict
 
-    def obtain_goterms(self, goterm_dict, fh_sprot):
-        found = False
-        for rec in sp.parse(fh_sprot):
-            for ac in range(len(rec.accessions)):
-                goList = []
-                if rec.accessions[ac] in goterm_dict.keys():
-                    for crossRef in rec.cross_references:
-                        if crossRef[0] == 'GO':
-                           goDef = (crossRef[1], (crossRef[3].split(':'))[0], \
-                                     crossRef[2][0])
-                           goterm_dict[rec.accessions[ac]].add(goDef)
-                    found = True
-                    break
-            #if found: 
-                #break 
+    def obtain_goterms(self, goterm_dict, sprot_index):
+        # Only the entries of the proteins are read, with the accession
+        # index sprot_index:
+        for protName in goterm_dict.keys():
+            rec = sprot_index.record(protName)
+            if rec is None:
+                continue
+            for crossRef in rec.cross_references:
+                if crossRef[0] == 'GO':
+                   goDef = (crossRef[1], (crossRef[3].split(':'))[0], \
+                             crossRef[2][0])
+                   goterm_dict[protName].add(goDef)
         return goterm_dict
 
     def group_proteins_by_taxons(self, protein_dict):
@@ -125,8 +122,10 @@ class Get_goterms:
             goterm_dict[protName]= set()
         fh_tlist.close()
 
-        #self.obtain_taxons(protein_dict, open(self.sprot_fname, 'r'))
-        self.obtain_goterms(goterm_dict, open(self.sprot_fname, 'r'))
+        sprot_index = si.get_index(self.sprot_fname)
+        #self.obtain_taxons(protein_dict, sprot_index)
+        self.obtain_goterms(goterm_dict, sprot_index)
+        sprot_index.close()
 
         #taxon_dict = self.group_proteins_by_taxons(protein_dict)
         #self.print_protein_dict(protein_dict)
@@ -19,7 +19,10 @@ import sys
 import subprocess
 from collections import defaultdict
 
-from Bio import SwissProt as sp
+# SprotIndex is in the directory above misc:
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+import SprotIndex as si
 
 #import Config
 
@@ -35,17 +38,14 @@ class Get_taxons:
         self.tList_fname = self.work_dir + '/' + tList_fname
         self.sprot_fname = self.work_dir + '/' + sprot_fname
 
-    def obtain_taxons(self, protein_dict, fh_sprot): 
-        found = False
-        for rec in sp.parse(fh_sprot):
-            for ac in range(len(rec.accessions)): 
-                if rec.accessions[ac] in protein_dict.keys(): 
-                    # assign rec.taxonomy_id list to the protein 
-                    protein_dict[rec.accessions[ac]] = rec.taxonomy_id 
-                    found = True
-                    break
-            #if found: 
-            #    break 
+    def obtain_taxons(self, protein_dict, sprot_index): 
+        # Only the entries of the proteins are looked up in the
+        # accession index sprot_index:
+        for protName in protein_dict.keys():
+            taxon_ids = sprot_index.taxon_ids(protName)
+            if taxon_ids is not None:
+                # assign the taxonomy id list to the protein 
+                protein_dict[protName] = list(taxon_ids)
         return protein_dict
 
     def group_proteins_by_taxons(self, protein_dict):
@@ -84,7 +84,7 @@ class Get_taxons:
             protName = line.strip()
             protein_dict[protName] = []
         fh_tlist.close()
-        self.obtain_taxons(protein_dict, open(self.sprot_fname, 'r'))
+        self.obtain_taxons(protein_dict, si.get_index(self.sprot_fname))
         taxon_dict = self.group_proteins_by_taxons(protein_dict)
         #self.print_protein_dict(protein_dict)
         self.print_taxon_dict(taxon_dict)
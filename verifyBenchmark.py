@@ -63,6 +63,7 @@ import os.path
 import sys
 from collections import defaultdict
 import FormatChecker as fc
+import GOAParser as GOA
 
 def create_iea_ann_dict(goa_iea_handle):
     """
@@ -75,11 +76,8 @@ def create_iea_ann_dict(goa_iea_handle):
     # Populate the dictionary for t1_iea with <protein, GO terms> as
     # <key, values> pairs from the entries with NOn-Experimental Evidence
     # at time t1:
-    for lines in goa_iea_handle:
-        cols = lines.strip().split('\t')
-        if len(cols) < 15:
-            continue
-        dict_iea[cols[1]].add(cols[4])
+    for protName, goID in GOA.gaf_columns(goa_iea_handle, (1, 4)):
+        dict_iea[protName].add(goID)
         # Column 1: protein name, Column 4: GO ID
     return dict_iea
 
@@ -99,17 +97,14 @@ def create_exp_ann_dict(goa_exp_handle):
     # Populate the three dictionaries for t1_exp with <protein, GO terms>
     # as <key, values> pairs from the entries with Non-Experimental Evidence
     # at time t1:
-    for lines in goa_exp_handle:
-        cols = lines.strip().split('\t')
-        if len(cols) < 15:
-            continue
-        if cols[8] == 'F': # Column 8: Ontology group
-            dict_mfo[cols[1]].add(cols[4])
+    for protName, goID, aspect in GOA.gaf_columns(goa_exp_handle, (1, 4, 8)):
+        if aspect == 'F': # Column 8: Ontology group
+            dict_mfo[protName].add(goID)
             # Column 1: protein name, Column 4: GO ID 
-        elif cols[8] == 'P':
-            dict_bpo[cols[1]].add(cols[4])
-        elif cols[8] == 'C':
-            dict_cco[cols[1]].add(cols[4])
+        elif aspect == 'P':
+            dict_bpo[protName].add(goID)
+        elif aspect == 'C':
+            dict_cco[protName].add(goID)
     return (dict_bpo, dict_cco, dict_mfo)
 
 def check_LK_benchmark_creation(t1_iea_dict,